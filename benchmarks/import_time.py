@@ -0,0 +1,45 @@
+"""
+Measure the time needed to import the modules of Sismic, and compare the import of *sismic.io*
+with the import of its dependencies that are lazily imported. Requires Python 3.8 or later.
+
+Bytecode is written to a temporary directory, so that compilation is not measured.
+
+Usage: python benchmarks/import_time.py
+"""
+import os
+import subprocess
+import sys
+import tempfile
+
+
+def import_times(statement: str, env: dict) -> dict:
+    """Return the smallest cumulative import time of each imported module, in microseconds."""
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    times = {}
+    for _ in range(5):
+        output = subprocess.run(
+            [sys.executable, '-X', 'importtime', '-c', statement],
+            cwd=root, env=env, stdout=subprocess.PIPE, stderr=subprocess.PIPE,
+            universal_newlines=True, check=True,
+        ).stderr
+        for line in output.splitlines()[1:]:
+            _, cumulative, name = line.split('|')
+            name = name.strip()
+            times[name] = min(times.get(name, float('inf')), int(cumulative))
+    return times
+
+
+def main():
+    with tempfile.TemporaryDirectory() as directory:
+        env = dict(os.environ, PYTHONPYCACHEPREFIX=directory)
+        env.pop('PYTHONDONTWRITEBYTECODE', None)
+
+        for module in ['sismic', 'sismic.model', 'sismic.interpreter', 'sismic.io', 'sismic.bdd']:
+            print('{:<20} {:>8}us'.format(module, import_times('import ' + module, env)[module]))
+
+        dependencies = import_times('import ruamel.yaml, schema', env)
+        print('{:<20} {:>8}us'.format('ruamel.yaml + schema', dependencies['ruamel.yaml'] + dependencies['schema']))
+
+
+if __name__ == '__main__':
+    main()
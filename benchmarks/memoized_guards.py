@@ -0,0 +1,46 @@
+"""
+Compare idle steps of an interpreter whose eventless guards are memoized with idle steps
+of an interpreter that evaluates them each time.
+
+Usage: python benchmarks/memoized_guards.py
+"""
+import timeit
+
+from functools import partial
+
+from sismic.code import PythonEvaluator
+from sismic.interpreter import Interpreter
+from sismic.model import Statechart, BasicState, CompoundState, OrthogonalState, Transition
+
+
+N = 100
+
+
+def create_interpreter(memoize_guards: bool) -> Interpreter:
+    statechart = Statechart('idle')
+    statechart.add_state(OrthogonalState('root'), None)
+    for i in range(N):
+        statechart.add_state(CompoundState('r{}'.format(i), initial='a{}'.format(i)), 'root')
+        statechart.add_state(BasicState('a{}'.format(i)), 'r{}'.format(i))
+        statechart.add_state(BasicState('b{}'.format(i)), 'r{}'.format(i))
+        statechart.add_transition(Transition('a{}'.format(i), 'b{}'.format(i), guard='sum(values) > {}'.format(i)))
+
+    evaluator_klass = partial(PythonEvaluator, memoize_guards=memoize_guards)
+    interpreter = Interpreter(statechart, evaluator_klass=evaluator_klass,
+                              initial_context={'values': list(range(-1000, 1000))})
+    interpreter.execute()
+    return interpreter
+
+
+def measure(interpreter: Interpreter) -> float:
+    return min(timeit.repeat(interpreter.execute_once, number=20, repeat=5)) / 20
+
+
+def main():
+    print('Idle step with {} eventless guards, best of 5'.format(N))
+    print('not memoized: {:.0f}us'.format(measure(create_interpreter(False)) * 10 ** 6))
+    print('memoized:     {:.0f}us'.format(measure(create_interpreter(True)) * 10 ** 6))
+
+
+if __name__ == '__main__':
+    main()
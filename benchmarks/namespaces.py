@@ -0,0 +1,70 @@
+"""
+Compare the evaluation of guards and invariants in the reusable namespaces of a *PythonEvaluator*
+with their evaluation in a new context, as done by *Evaluator*.
+
+Usage: python benchmarks/namespaces.py
+"""
+import timeit
+
+from functools import partial
+
+from sismic.interpreter import Interpreter
+from sismic.model import Statechart, BasicState, CompoundState, Transition
+
+
+N = 10 ** 4
+
+
+def create_interpreter() -> Interpreter:
+    statechart = Statechart('guards')
+    statechart.add_state(CompoundState('root', initial='s'), None)
+    statechart.add_state(BasicState('s'), 'root')
+    statechart.add_transition(Transition('s', 's', event='e', guard='x > 0 and active("s") and not after(10)'))
+    statechart.state_for('s').invariants.append('x > 0 and not idle(10)')
+
+    interpreter = Interpreter(statechart, initial_context={'x': 1})
+    interpreter.execute_once()
+    return interpreter
+
+
+def measure(function) -> float:
+    return min(timeit.repeat(function, number=N, repeat=5))
+
+
+def main():
+    interpreter = create_interpreter()
+    evaluator = interpreter._evaluator
+    transition = interpreter.statechart.transitions[0]
+    state = interpreter.statechart.state_for('s')
+
+    def guard_reference():
+        return evaluator._evaluate_code(transition.guard, additional_context={
+            'after': partial(evaluator._time_provider.after, transition.source),
+            'idle': partial(evaluator._time_provider.idle, transition.source),
+            'event': None,
+        })
+
+    def invariants_reference():
+        additional_context = {
+            '__old__': None,
+            'after': partial(evaluator._time_provider.after, state.name),
+            'idle': partial(evaluator._time_provider.idle, state.name),
+            'received': evaluator._event_provider.received,
+            'sent': evaluator._event_provider.sent,
+            'event': None,
+        }
+        return [c for c in state.invariants if not evaluator._evaluate_code(c, additional_context=additional_context)]
+
+    assert guard_reference() and evaluator.evaluate_guard(transition)
+    assert invariants_reference() == list(evaluator.evaluate_invariants(state)) == []
+
+    print('{} evaluations, best of 5'.format(N))
+    print('guard, new context:              {:.3f}s'.format(measure(guard_reference)))
+    print('guard, reusable namespace:       {:.3f}s'.format(measure(lambda: evaluator.evaluate_guard(transition))))
+    print('invariants, new context:         {:.3f}s'.format(measure(invariants_reference)))
+    print('invariants, reusable namespace:  {:.3f}s'.format(
+        measure(lambda: list(evaluator.evaluate_invariants(state)))))
+
+
+if __name__ == '__main__':
+    main()
@@ -1,4 +1,15 @@
-from .wrappers import map_action, map_assertion, execute_bdd
+import sys
 
 __all__ = ['execute_bdd', 'map_action', 'map_assertion']
 
+
+# behave is slow to import, and is only imported when one of these functions is needed,
+# if the version of Python allows it.
+if sys.version_info >= (3, 7):
+    def __getattr__(name):
+        if name in __all__:
+            from . import wrappers
+            return getattr(wrappers, name)
+        raise AttributeError('module {!r} has no attribute {!r}'.format(__name__, name))
+else:
+    from .wrappers import map_action, map_assertion, execute_bdd
@@ -1,11 +1,17 @@
+import io
+import multiprocessing
 import os
 import shutil
+import sys
 import tempfile
 
-from typing import Union, List, Callable
+from collections import namedtuple
+from contextlib import redirect_stdout
+from typing import Any, Callable, Dict, List, Optional, Tuple, Union
 from behave import given, when, then
 from behave.__main__ import run_behave
 from behave.configuration import Configuration
+from behave.reporter.summary import SummaryReporter
 
 from ..interpreter import Interpreter
 from ..model import Statechart
@@ -67,10 +73,16 @@ def execute_bdd(statechart: Statechart,
                 property_statecharts: List[Statechart]=None,
                 interpreter_klass: Callable[[Statechart], Interpreter]=Interpreter,
                 debug_on_error: bool=False,
-                behave_parameters: List[str]=None) -> int:
+                behave_parameters: List[str]=None,
+                jobs: int=1) -> int:
     """
     Execute BDD tests for a statechart.
 
+    If *jobs* is greater than 1, feature files are distributed over a pool of *jobs* processes.
+    The statechart and the property statecharts are sent once to each process, the output of each
+    feature is printed in the order of the feature files, and a single summary is printed at the end.
+    Debugging on error, and Behave's options that do not run features (e.g. *--steps*) imply a serial execution.
+
     :param statechart: statechart to test
     :param feature_filepaths: list of filepaths to feature files.
     :param step_filepaths: list of filepaths to step definitions.
@@ -78,6 +90,7 @@ def execute_bdd(statechart: Statechart,
     :param interpreter_klass: a callable that accepts a statechart and an optional clock and returns an Interpreter
     :param debug_on_error: set to True to drop to (i)pdb in case of error.
     :param behave_parameters: additional CLI parameters used by Behave (see http://behave.readthedocs.io/en/latest/behave.html#command-line-arguments)
+    :param jobs: number of processes to use.
     :return: exit code of behave CLI.
     """
     # Default values
@@ -91,19 +104,10 @@ def execute_bdd(statechart: Statechart,
 
     # Create temporary directory to put everything inside
     with tempfile.TemporaryDirectory() as tempdir:
-        # Create configuration for Behave
-        config = Configuration(behave_parameters)
-
-        # Paths to features
-        config.paths = feature_filepaths
-
         # Copy environment
         with open(os.path.join(tempdir, 'environment.py'), 'w') as environment:
             environment.write('from sismic.bdd.environment import *')
 
-        # Path to environment
-        config.environment_file = os.path.join(tempdir, 'environment.py')
-
         # Add predefined steps
         os.mkdir(os.path.join(tempdir, 'steps'))
         with open(os.path.join(tempdir, 'steps', '__steps.py'), 'w') as step:
@@ -113,16 +117,165 @@ def execute_bdd(statechart: Statechart,
         for step_filepath in step_filepaths:
             shutil.copy(step_filepath, os.path.join(tempdir, 'steps', os.path.split(step_filepath)[-1]))
 
-        # Path to steps
-        config.steps_dir = os.path.join(tempdir, 'steps')
-
-        # Put statechart and properties in user data
-        config.update_userdata({
+        # Statechart and properties, put in user data
+        userdata = {
             'statechart': statechart,
             'interpreter_klass': interpreter_klass,
             'property_statecharts': property_statecharts,
             'debug_on_error': debug_on_error,
-        })
+        }
+
+        config = _configure(tempdir, feature_filepaths, behave_parameters, userdata)
+
+        if jobs > 1 and not debug_on_error and not _is_informative(config):
+            filepaths = _collect_feature_files(feature_filepaths)
+            if len(filepaths) > 1:
+                return _execute_parallel(config, tempdir, filepaths, behave_parameters, userdata, jobs)
 
         # Run behave
         return run_behave(config)
+
+
+def _configure(tempdir: str, feature_filepaths: List[str], behave_parameters: List[str], userdata: Dict[str, Any]) -> Configuration:
+    """
+    Create a Behave configuration for given features, relying on the environment and
+    the steps that were put in given directory.
+
+    :param tempdir: directory containing the environment and the steps
+    :param feature_filepaths: list of filepaths to feature files.
+    :param behave_parameters: CLI parameters used by Behave
+    :param userdata: user data for Behave
+    :return: a Behave configuration
+    """
+    # Create configuration for Behave
+    config = Configuration(list(behave_parameters))
+
+    # Paths to features
+    config.paths = feature_filepaths
+
+    # Path to environment
+    config.environment_file = os.path.join(tempdir, 'environment.py')
+
+    # Path to steps
+    config.steps_dir = os.path.join(tempdir, 'steps')
+
+    # Put statechart and properties in user data
+    config.update_userdata(userdata)
+    return config
+
+
+def _is_informative(config: Configuration) -> bool:
+    """
+    Return True if given configuration asks Behave to display some information instead of running features.
+    """
+    return any([config.version, config.tags_help, config.lang_list, config.lang_help, config.steps_catalog,
+                'help' in (config.format or [])])
+
+
+def _collect_feature_files(paths: List[str]) -> List[str]:
+    """
+    Return the feature files designated by given paths. Directories are recursively
+    searched for feature files, in alphabetical order.
+
+    :param paths: list of paths to feature files or directories
+    :return: list of paths to feature files
+    """
+    filepaths = []
+    for path in paths:
+        if os.path.isdir(path):
+            for dirpath, dirnames, filenames in os.walk(path):
+                dirnames.sort()
+                filepaths.extend(os.path.join(dirpath, f) for f in sorted(filenames) if f.endswith('.feature'))
+        else:
+            filepaths.append(path)
+    return filepaths
+
+
+# Location and name of a failed scenario, collected by _SummaryCollector
+_FailedScenario = namedtuple('_FailedScenario', ['location', 'name'])
+
+
+class _SummaryCollector(SummaryReporter):
+    """
+    A summary reporter that collects the results of a Behave run instead of printing them,
+    so that they can be merged with the ones of other runs.
+    """
+    def end(self):
+        pass
+
+    def results(self) -> Dict[str, Any]:
+        return {
+            'feature': self.feature_summary,
+            'scenario': self.scenario_summary,
+            'step': self.step_summary,
+            'duration': self.duration,
+            'failed': [_FailedScenario(str(s.location), s.name) for s in self.failed_scenarios],
+        }
+
+
+# Parameters of Behave runs in current worker process, see _init_worker
+_worker_parameters = None  # type: Optional[Tuple[str, List[str], Dict[str, Any]]]
+
+
+def _init_worker(tempdir: str, behave_parameters: List[str], userdata: Dict[str, Any]) -> None:
+    global _worker_parameters
+    _worker_parameters = (tempdir, behave_parameters, userdata)
+
+
+def _execute_feature(feature_filepath: str) -> Tuple[int, str, Optional[Dict[str, Any]]]:
+    """
+    Execute given feature file in current worker process.
+
+    :param feature_filepath: path to a feature file
+    :return: exit code of Behave, its output, and the collected results (or None if the summary is disabled)
+    """
+    tempdir, behave_parameters, userdata = _worker_parameters  # type: ignore
+
+    output = io.StringIO()
+    with redirect_stdout(output):
+        config = _configure(tempdir, [feature_filepath], behave_parameters, userdata)
+
+        collector = None
+        if config.summary:
+            collector = _SummaryCollector(config)
+            config.reporters = [r for r in config.reporters if not isinstance(r, SummaryReporter)] + [collector]
+
+        code = run_behave(config)
+
+    return code, output.getvalue(), collector.results() if collector else None
+
+
+def _execute_parallel(config: Configuration, tempdir: str, feature_filepaths: List[str],
+                      behave_parameters: List[str], userdata: Dict[str, Any], jobs: int) -> int:
+    """
+    Execute given feature files using a pool of processes, and merge their results.
+
+    :param config: Behave configuration for the whole run
+    :param tempdir: directory containing the environment and the steps
+    :param feature_filepaths: list of paths to feature files
+    :param behave_parameters: CLI parameters used by Behave
+    :param userdata: user data for Behave
+    :param jobs: number of processes
+    :return: exit code of behave CLI.
+    """
+    summary = SummaryReporter(config) if config.summary else None
+    code = 0
+
+    with multiprocessing.Pool(min(jobs, len(feature_filepaths)), _init_worker,
+                              (tempdir, behave_parameters, userdata)) as pool:
+        for feature_code, output, results in pool.imap(_execute_feature, feature_filepaths):
+            code = code or feature_code
+            sys.stdout.write(output)
+
+            if summary is not None and results is not None:
+                for name in ['feature', 'scenario', 'step']:
+                    counts = getattr(summary, name + '_summary')
+                    for status, count in results[name].items():
+                        counts[status] = counts.get(status, 0) + count
+                summary.duration += results['duration']
+                summary.failed_scenarios.extend(results['failed'])
+
+    if summary is not None:
+        summary.end()
+
+    return code
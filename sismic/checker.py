@@ -0,0 +1,235 @@
+import multiprocessing
+
+from typing import Iterable, FrozenSet, List, Optional, Set, Tuple
+
+from .code import DummyEvaluator
+from .exceptions import ExecutionError
+from .interpreter import Interpreter
+from .model import MetaEvent, Statechart
+
+__all__ = ['explore', 'Exploration']
+
+
+# A state of the exploration, made of the active configuration and of the (sorted) memory of history states
+ExplorationState = Tuple[FrozenSet[str], Tuple[Tuple[str, Optional[Tuple[str, ...]]], ...]]
+
+# Successor of an exploration state for a given event: (event, next state, error, whether a transition was processed)
+Successor = Tuple[str, Optional[ExplorationState], Optional[Exception], bool]
+
+
+class Exploration:
+    """
+    The result of the exploration of a statechart, see *explore*.
+
+    The following attributes are available:
+
+     - *statechart*: the explored statechart.
+     - *events*: the names of the events that were considered.
+     - *states*: the set of reachable exploration states. An exploration state is a pair made of a (frozen) set of
+       active states and of a tuple of (history state, memory) pairs.
+     - *entered_states*: the set of names of the states that were entered at least once.
+     - *deadlocks*: a list of exploration states from which no transition can be processed, except final ones.
+     - *errors*: a list of (exploration state, event, exception) triples, for each *ExecutionError* (e.g.
+       *NonDeterminismError* or *ConflictingTransitionsError*) that occurred while processing an event.
+       The exploration state and the event are None if the error occurred during the initialization.
+     - *depth*: the number of events that were sent, at most, to reach an exploration state.
+     - *complete*: True if every reachable exploration state was visited, False if *max_depth* was reached.
+
+    :param statechart: the explored statechart.
+    :param events: the names of the events that were considered.
+    """
+    def __init__(self, statechart: Statechart, events: List[str]) -> None:
+        self.statechart = statechart
+        self.events = events
+        self.states = set()  # type: Set[ExplorationState]
+        self.entered_states = set()  # type: Set[str]
+        self.deadlocks = []  # type: List[ExplorationState]
+        self.errors = []  # type: List[Tuple[Optional[ExplorationState], Optional[str], Exception]]
+        self.depth = 0
+        self.complete = True
+
+    @property
+    def unreachable_states(self) -> List[str]:
+        """
+        Sorted names of the states that were never entered.
+        """
+        return sorted(set(self.statechart.states).difference(self.entered_states))
+
+    def __repr__(self):
+        return '{}({!r}, states={}, deadlocks={}, errors={})'.format(
+            self.__class__.__name__, self.statechart, len(self.states), len(self.deadlocks), len(self.errors))
+
+
+class _Explorer:
+    """
+    Compute the successors of exploration states, using an interpreter whose runtime
+    state is replaced each time an event is sent.
+
+    :param statechart: statechart to explore
+    :param events: names of the events to consider
+    :param max_steps: maximal number of steps to process an event
+    """
+    def __init__(self, statechart: Statechart, events: List[str], max_steps: int) -> None:
+        self._events = events
+        self._max_steps = max_steps
+        self._interpreter = Interpreter(statechart, evaluator_klass=DummyEvaluator, ignore_contract=True)
+        self._interpreter.attach(self._on_transition_processed, names=['transition processed'])
+        self._interpreter.attach(self._on_state_entered, names=['state entered'])
+        self._transitions = 0
+        self.entered_states = set()  # type: Set[str]
+
+    def _on_transition_processed(self, event: MetaEvent) -> None:
+        self._transitions += 1
+
+    def _on_state_entered(self, event: MetaEvent) -> None:
+        self.entered_states.add(event.state)
+
+    def _state(self) -> ExplorationState:
+        memory = tuple(sorted(
+            (name, None if names is None else tuple(sorted(names)))
+            for name, names in self._interpreter._memory.items()
+        ))
+        return self._interpreter.configuration_key, memory
+
+    def _load(self, state: ExplorationState) -> None:
+        interpreter = self._interpreter
+        configuration, memory = state
+
+        for name in list(interpreter._configuration):
+            interpreter._remove_from_configuration(name)
+        for name in configuration:
+            interpreter._add_to_configuration(name)
+        interpreter._memory = {name: None if names is None else list(names) for name, names in memory}
+
+        while interpreter._select_event(consume=True) is not None:
+            pass
+
+    def _execute(self) -> None:
+        steps = 0
+        while self._interpreter.execute_once_fast():
+            steps += 1
+            if steps >= self._max_steps:
+                raise ExecutionError('Execution did not stabilize after {} steps'.format(steps))
+
+    def initial(self) -> Tuple[Optional[ExplorationState], Optional[Exception]]:
+        """
+        Initialize the interpreter and return the initial exploration state, or the error that occurred.
+
+        :return: an (exploration state, exception) pair, one of them being None
+        """
+        try:
+            self._execute()
+        except ExecutionError as e:
+            return None, e
+        return self._state(), None
+
+    def expand(self, state: ExplorationState) -> Tuple[List[Successor], Set[str]]:
+        """
+        Return the successors of given exploration state, one for each event, and the names
+        of the states that were entered to reach them.
+
+        :param state: an exploration state
+        :return: a list of (event, next state, error, whether a transition was processed) tuples, and a set of names
+        """
+        successors = []  # type: List[Successor]
+        self.entered_states = set()
+        for event in self._events:
+            self._load(state)
+            self._transitions = 0
+            self._interpreter.queue(event)
+            try:
+                self._execute()
+            except ExecutionError as e:
+                successors.append((event, None, e, False))
+            else:
+                successors.append((event, self._state(), None, self._transitions > 0))
+        return successors, self.entered_states
+
+
+# Explorer of current worker process, see _init_worker
+_worker_explorer = None  # type: Optional[_Explorer]
+
+
+def _init_worker(statechart: Statechart, events: List[str], max_steps: int) -> None:
+    global _worker_explorer
+    _worker_explorer = _Explorer(statechart, events, max_steps)
+    _worker_explorer.initial()
+
+
+def _expand(state: ExplorationState) -> Tuple[List[Successor], Set[str]]:
+    return _worker_explorer.expand(state)  # type: ignore
+
+
+def explore(statechart: Statechart, events: Iterable[str]=None, *, max_depth: int=None,
+            processes: int=None, max_steps: int=100) -> Exploration:
+    """
+    Explore the exploration states that can be reached by sending given events to the statechart,
+    in a breadth-first way. An exploration state is made of the active configuration and of the
+    memory of history states. Each of them is visited once.
+
+    The statechart is executed with a *DummyEvaluator*: the context is not considered, guards always
+    hold and no event is sent from within the statechart. The exploration therefore over-approximates
+    the reachable configurations, and reports situations in which errors could occur.
+
+    Exploration states of each depth are expanded in parallel using a pool of processes, each of them
+    relying on its own interpreter.
+
+    :param statechart: statechart to explore
+    :param events: names of the events to consider, by default the ones returned by *statechart.events_for()*
+    :param max_depth: maximal number of events to send, by default there is no limit.
+    :param processes: number of processes to use, by default the number of CPUs. Set it to 1 to explore
+        the statechart in the current process only.
+    :param max_steps: maximal number of macro steps to process an event, to detect infinite executions.
+    :return: an *Exploration* instance
+    """
+    events = statechart.events_for() if events is None else list(events)
+    exploration = Exploration(statechart, events)
+
+    explorer = _Explorer(statechart, events, max_steps)
+    initial, error = explorer.initial()
+    exploration.entered_states.update(explorer.entered_states)
+    if initial is None:
+        exploration.errors.append((None, None, error))  # type: ignore
+        return exploration
+
+    exploration.states.add(initial)
+    frontier = [initial]
+
+    processes = multiprocessing.cpu_count() if processes is None else processes
+    pool = multiprocessing.Pool(processes, _init_worker, (statechart, events, max_steps)) if processes > 1 else None
+
+    try:
+        while len(frontier) > 0 and (max_depth is None or exploration.depth < max_depth):
+            # Small frontiers are not worth being sent to other processes
+            if pool is None or len(frontier) < 2 * processes:
+                results = list(map(explorer.expand, frontier))  # type: List[Tuple[List[Successor], Set[str]]]
+            else:
+                results = pool.map(_expand, frontier, chunksize=max(1, len(frontier) // (4 * processes)))
+
+            exploration.depth += 1
+            next_frontier = []
+            for state, (successors, entered_states) in zip(frontier, results):
+                exploration.entered_states.update(entered_states)
+                progress = False
+                for event, next_state, error, transitions in successors:
+                    if error is not None:
+                        exploration.errors.append((state, event, error))
+                        progress = True
+                        continue
+
+                    progress = progress or transitions
+                    if next_state not in exploration.states:
+                        exploration.states.add(next_state)  # type: ignore
+                        next_frontier.append(next_state)
+
+                configuration, _ = state
+                if not progress and len(configuration) > 0:
+                    exploration.deadlocks.append(state)
+
+            frontier = next_frontier  # type: ignore
+    finally:
+        if pool is not None:
+            pool.terminate()
+
+    exploration.complete = len(frontier) == 0
+    return exploration
@@ -1,5 +1,6 @@
 from .evaluator import Evaluator
 from .dummy import DummyEvaluator
-from .python import PythonEvaluator
+from .python import PythonEvaluator, set_bytecode_cache
+from .cache import BytecodeCache
 
-__all__ = ['Evaluator', 'DummyEvaluator', 'PythonEvaluator']
+__all__ = ['Evaluator', 'DummyEvaluator', 'PythonEvaluator', 'BytecodeCache', 'set_bytecode_cache']
@@ -0,0 +1,107 @@
+import marshal
+import os
+import sys
+
+from types import CodeType
+from typing import Dict, Iterable, Optional, Set, Tuple
+
+__all__ = ['BytecodeCache']
+
+# hashlib, importlib.util and tempfile are only imported when they are needed,
+# as this module is imported by sismic.interpreter.
+
+
+class BytecodeCache:
+    """
+    An on-disk cache of compiled pieces of code, to be shared by several processes.
+
+    Pieces of code are compiled and stored by packs, usually one for each statechart, so that
+    loading them only requires to read a single file. A pack is a file written with *marshal*, whose
+    name is a hash of the pieces of code, of their compilation mode, and of the version of the Python
+    interpreter and of its bytecode. Files are written atomically, and unreadable files are ignored.
+
+    Once loaded, compiled code is kept in memory and is available through *get*.
+
+    :param directory: path to the directory containing the cached files, created if needed.
+    """
+    def __init__(self, directory: str) -> None:
+        self.directory = directory
+        os.makedirs(directory, exist_ok=True)
+
+        # Identify the interpreter and the bytecode format
+        import importlib.util
+        self._version = '{}\0{}'.format(sys.implementation.cache_tag, importlib.util.MAGIC_NUMBER.hex())
+
+        # Loaded code, indexed by (code, mode) pairs, and the packs they come from
+        self._codes = {}  # type: Dict[Tuple[str, str], CodeType]
+        self._packs = set()  # type: Set[Tuple[Tuple[str, str], ...]]
+
+    def _path_for(self, pack: Tuple[Tuple[str, str], ...]) -> str:
+        import hashlib
+
+        digest = hashlib.sha256(self._version.encode('utf-8'))
+        for code, mode in pack:
+            digest.update('\0{}\0{}'.format(mode, code).encode('utf-8'))
+        return os.path.join(self.directory, digest.hexdigest() + '.bin')
+
+    def get(self, code: str, mode: str) -> Optional[CodeType]:
+        """
+        Return the compiled code for given piece of code and mode, if it was loaded.
+
+        :param code: a piece of code
+        :param mode: either "eval" or "exec"
+        :return: a code object or None
+        """
+        return self._codes.get((code, mode), None)
+
+    def load(self, pieces: Iterable[Tuple[str, str]]) -> None:
+        """
+        Load the compiled code of given (code, mode) pairs. If they were not yet compiled and
+        stored together, they are compiled and stored. Pieces of code that cannot be compiled
+        are ignored.
+
+        :param pieces: (code, mode) pairs
+        """
+        pack = tuple(sorted(set(pieces)))
+        if pack in self._packs:
+            return
+
+        path = self._path_for(pack)
+        codes = self._read(path)
+        if codes is None:
+            codes = {}
+            for code, mode in pack:
+                try:
+                    codes[(code, mode)] = compile(code, '<string>', mode)
+                except SyntaxError:
+                    pass
+            self._write(path, codes)
+
+        self._codes.update(codes)
+        self._packs.add(pack)
+
+    def _read(self, path: str) -> Optional[Dict[Tuple[str, str], CodeType]]:
+        try:
+            with open(path, 'rb') as f:
+                codes = marshal.load(f)
+        except (OSError, EOFError, ValueError, TypeError):
+            return None
+        return codes if isinstance(codes, dict) else None
+
+    def _write(self, path: str, codes: Dict[Tuple[str, str], CodeType]) -> None:
+        import tempfile
+
+        try:
+            fd, temp_path = tempfile.mkstemp(dir=self.directory, suffix='.tmp')
+            try:
+                with os.fdopen(fd, 'wb') as f:
+                    marshal.dump(codes, f)
+                os.replace(temp_path, path)
+            except BaseException:
+                os.remove(temp_path)
+                raise
+        except OSError:
+            pass
+
+    def __repr__(self):
+        return '{}({!r})'.format(self.__class__.__name__, self.directory)
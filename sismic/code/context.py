@@ -1,6 +1,7 @@
 import collections
 import copy
-from typing import Optional, Union, List, Dict
+import types
+from typing import Any, Callable, Optional, Union, List, Dict, Mapping
 
 from ..model import Event, InternalEvent, MetaEvent
 
@@ -15,7 +16,8 @@ class TimeContextProvider:
     This context exposes time, after, idle, and active.
     Look at their respective documentation for more information.
 
-    This provider needs to be attached to an interpreter.
+    This provider needs to be attached to an interpreter, either as a whole or
+    by attaching each of its ``handlers`` to the meta-events they handle.
     """
     def __init__(self) -> None:
         self._entry_time = dict()  # type: Dict[str, float]
@@ -23,6 +25,14 @@ class TimeContextProvider:
         self._time = 0  # type: float
         self._configuration = []  # type: List[str]
 
+        # Meta-event handlers, indexed by meta-event name
+        self.handlers = {
+            'step started': self._on_step_started,
+            'state entered': self._on_state_entered,
+            'state exited': self._on_state_exited,
+            'transition processed': self._on_transition_processed,
+        }  # type: Dict[str, Callable[[MetaEvent], None]]
+
     @property
     def time(self) -> float:
         """
@@ -52,6 +62,27 @@ class TimeContextProvider:
         """
         return self.time - seconds >= self._idle_time[name]
 
+    def after_deadline(self, name: str, seconds: float) -> float:
+        """
+        Return the time from which *after(name, seconds)* holds.
+
+        :param name: name of the state.
+        :param seconds: elapsed time to use for comparison.
+        :return: a time value.
+        """
+        return self._entry_time[name] + seconds
+
+    def idle_deadline(self, name: str, seconds: float) -> float:
+        """
+        Return the time from which *idle(name, seconds)* holds, unless
+        a transition is fired from given state.
+
+        :param name: name of the state.
+        :param seconds: elapsed time to use for comparison.
+        :return: a time value.
+        """
+        return self._idle_time[name] + seconds
+
     def active(self, name: str) -> bool:
         """
         Return True if and only if given state is active.
@@ -61,17 +92,24 @@ class TimeContextProvider:
         """
         return name in self._configuration
 
+    def _on_step_started(self, event: MetaEvent) -> None:
+        self._time = event.time
+
+    def _on_state_entered(self, event: MetaEvent) -> None:
+        self._configuration.append(event.state)
+        self._entry_time[event.state] = self._time
+        self._idle_time[event.state] = self._time
+
+    def _on_state_exited(self, event: MetaEvent) -> None:
+        self._configuration.remove(event.state)
+
+    def _on_transition_processed(self, event: MetaEvent) -> None:
+        self._idle_time[event.source] = self._time
+
     def __call__(self, event: MetaEvent):
-        if event.name == 'step started':
-            self._time = event.time
-        elif event.name == 'state entered':
-            self._configuration.append(event.state)
-            self._entry_time[event.state] = self._time
-            self._idle_time[event.state] = self._time
-        elif event.name == 'state exited':
-            self._configuration.remove(event.state)
-        elif event.name == 'transition processed':
-            self._idle_time[event.source] = self._time
+        handler = self.handlers.get(event.name)
+        if handler is not None:
+            handler(event)
 
 
 class EventContextProvider:
@@ -85,13 +123,21 @@ class EventContextProvider:
     available through the ``pending`` attribute. This list should be returned
     by the evaluator on code execution for the events to be effectively sent.
 
-    This provider needs to be attached to an interpreter.
+    This provider needs to be attached to an interpreter, either as a whole or
+    by attaching each of its ``handlers`` to the meta-events they handle.
     """
     def __init__(self) -> None:
         self.pending = []  # type: List[Event]
         self._sent = []  # type: List[Event]
         self._consumed = None  # type: Optional[Event]
 
+        # Meta-event handlers, indexed by meta-event name
+        self.handlers = {
+            'event consumed': self._on_event_consumed,
+            'event sent': self._on_event_sent,
+            'step started': self._on_step_started,
+        }  # type: Dict[str, Callable[[MetaEvent], None]]
+
     def send(self, name: str, **kwargs) -> None:
         """
         Create an internal event and store it for further sending.
@@ -131,16 +177,22 @@ class EventContextProvider:
         """
         return getattr(self._consumed, 'name', None) == name
     
+    def _on_event_consumed(self, event: MetaEvent) -> None:
+        self._consumed = event.event
+
+    def _on_event_sent(self, event: MetaEvent) -> None:
+        self._sent.append(event.event)
+
+    def _on_step_started(self, event: MetaEvent) -> None:
+        self._consumed = None
+        self._sent = []
+        self.pending = []
+
     def __call__(self, event: MetaEvent) -> None:
-        if event.name == 'event consumed':
-            self._consumed = event.event
-        elif event.name == 'event sent':
-            self._sent.append(event.event)
-        elif event.name == 'step started':
-            self._consumed = None
-            self._sent = []
-            self.pending = []
-        
+        handler = self.handlers.get(event.name)
+        if handler is not None:
+            handler(event)
+
 
 class FrozenContext(collections.Mapping):
     """
@@ -172,3 +224,34 @@ class FrozenContext(collections.Mapping):
 
     def __iter__(self):
         return iter(self.__frozencontext)
+
+
+# Types whose instances can be shared by contexts, see _copy_context
+_IMMUTABLE_TYPES = (type(None), bool, int, float, complex, str, bytes, type,
+                    types.ModuleType, types.FunctionType, types.BuiltinFunctionType)
+
+
+def _is_immutable(value: Any) -> bool:
+    if isinstance(value, _IMMUTABLE_TYPES):
+        return True
+    elif isinstance(value, (tuple, frozenset)):
+        return all(_is_immutable(v) for v in value)
+    else:
+        return False
+
+
+def _copy_context(context: Mapping[str, Any]) -> Dict[str, Any]:
+    """
+    Return a copy of given context that does not share any mutable value with it.
+
+    Immutable values (e.g. numbers and strings), functions, classes and modules are shared.
+    Other values are deep-copied at once, so that a value referenced by several variables
+    is still referenced by all of them in the copy.
+
+    :param context: a context
+    :return: a new context
+    """
+    copied = dict(context)
+    mutable = {key: value for key, value in copied.items() if not _is_immutable(value)}
+    copied.update(copy.deepcopy(mutable))
+    return copied
@@ -18,6 +18,12 @@ class DummyEvaluator(Evaluator):
     def context(self):
         return dict()
 
+    def snapshot(self):
+        return dict()
+
+    def restore(self, snapshot):
+        pass
+
     def _evaluate_code(self, code: str, *, additional_context: Mapping=None) -> bool:
         return True
 
@@ -1,5 +1,6 @@
 import abc
-from typing import Any, Optional, Iterable, List, Mapping
+import copy
+from typing import Any, Dict, Optional, Iterable, List, Mapping
 
 from ..model import Statechart, StateMixin, Transition, Event
 from ..exceptions import CodeEvaluationError
@@ -60,6 +61,42 @@ class Evaluator(metaclass=abc.ABCMeta):
         """
         raise NotImplementedError()
 
+    def snapshot(self) -> Dict[str, Any]:
+        """
+        Return the runtime state of this evaluator (e.g. its context), as a dictionary
+        that can be provided to *restore*. This method is used by *Interpreter.snapshot*,
+        and is only called between two steps.
+
+        :return: a dictionary
+        """
+        raise NotImplementedError('{} does not support snapshots'.format(self.__class__.__name__))
+
+    def restore(self, snapshot: Mapping[str, Any]) -> None:
+        """
+        Restore the runtime state of this evaluator from a dictionary returned by *snapshot*.
+        This method is used by *Interpreter.restore*, once the statechart preamble has been executed.
+
+        :param snapshot: a dictionary returned by *snapshot*
+        """
+        raise NotImplementedError('{} does not support snapshots'.format(self.__class__.__name__))
+
+    def fork(self, interpreter, *, shallow: bool=False) -> 'Evaluator':
+        """
+        Return a new evaluator for given interpreter, whose runtime state is a copy of the one of
+        this evaluator. This method is used by *Interpreter.fork*.
+
+        By default, a new instance is created and restored from a deep copy of the snapshot
+        of this evaluator, or from the snapshot itself if *shallow* is True.
+
+        :param interpreter: the interpreter that will use the new evaluator
+        :param shallow: set to True to share the values of the context instead of copying them,
+            if supported by the evaluator.
+        :return: an evaluator
+        """
+        evaluator = self.__class__(interpreter)
+        evaluator.restore(self.snapshot() if shallow else copy.deepcopy(self.snapshot()))
+        return evaluator
+
     def execute_statechart(self, statechart: Statechart):
         """
         Execute the initial code of a statechart.
@@ -84,6 +121,20 @@ class Evaluator(metaclass=abc.ABCMeta):
             return self._evaluate_code(transition.guard, additional_context={'event': event})
         return None
 
+    def guard_deadline(self, transition: Transition) -> Optional[float]:
+        """
+        Return the earliest time at which the evaluation of the guard of given transition may change
+        due to the passage of time, or None if this evaluation does not depend on time.
+
+        This method is used to determine when an eventless transition may be triggered, and is only
+        called for transitions that have a guard and whose source state is active.
+        By default, guards are considered not to depend on time.
+
+        :param transition: the considered transition
+        :return: a time value or None
+        """
+        return None
+
     def execute_action(self, transition: Transition, event: Optional[Event]=None) -> List[Event]:
         """
         Execute the action for given transition.
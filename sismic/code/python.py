@@ -1,13 +1,124 @@
-from functools import partial
+import ast
+
+from functools import lru_cache
+from itertools import chain
 from types import CodeType
-from typing import Any, Dict, List, Optional, Mapping, Iterator
+from typing import Any, Dict, FrozenSet, List, Optional, Mapping, Iterator, Set, Tuple
 
 from . import Evaluator
-from .context import FrozenContext, EventContextProvider, TimeContextProvider
+from .cache import BytecodeCache
+from .context import FrozenContext, EventContextProvider, TimeContextProvider, _copy_context
 from ..exceptions import CodeEvaluationError
-from ..model import Event, Statechart, Transition
+from ..model import Event, MetaEvent, Statechart, Transition
+
+__all__ = ['PythonEvaluator', 'set_bytecode_cache']
+
+
+# Optional on-disk cache used by _compile, see set_bytecode_cache
+_bytecode_cache = None  # type: Optional[BytecodeCache]
+
+
+def set_bytecode_cache(directory: Optional[str]) -> Optional[BytecodeCache]:
+    """
+    Enable or disable the on-disk cache of the code compiled by *PythonEvaluator*.
+
+    When enabled, the code of a statechart is loaded from the cache (or compiled and stored
+    in the cache) as soon as the statechart is executed by an interpreter. This lowers the latency
+    of the first steps of an interpreter, especially when many processes execute the same
+    statecharts. The cache is disabled by default. See *BytecodeCache* for more information.
+
+    :param directory: path to the directory of the cache, or None to disable the cache
+    :return: the *BytecodeCache* instance that is used, if any
+    """
+    global _bytecode_cache
+    _bytecode_cache = None if directory is None else BytecodeCache(directory)
+    _compile.cache_clear()
+    return _bytecode_cache
+
+
+@lru_cache(maxsize=4096)
+def _compile(code: str, mode: str) -> CodeType:
+    """
+    Compile given piece of code. Compiled code is shared by all evaluators, so that code
+    is compiled only once even if a statechart is used by many interpreters.
+    If the on-disk cache is enabled (see *set_bytecode_cache*), code it contains is not compiled again.
+
+    :param code: code to compile
+    :param mode: either "eval" or "exec"
+    :return: a code object
+    """
+    compiled = None if _bytecode_cache is None else _bytecode_cache.get(code, mode)
+    return compile(code, '<string>', mode) if compiled is None else compiled
+
+
+@lru_cache(maxsize=4096)
+def _old_names(condition: str) -> Optional[FrozenSet[str]]:
+    """
+    Return the names of the attributes of *__old__* that are read by given condition, or None
+    if *__old__* is used in another way (e.g. as a mapping), in which case every name is required.
+
+    :param condition: code of a condition
+    :return: a frozen set of names, or None
+    """
+    try:
+        tree = ast.parse(condition, mode='eval')
+    except SyntaxError:
+        # The error will be raised when the condition is evaluated
+        return None
+
+    names = set()
+    old_nodes = set()
+    for node in ast.walk(tree):
+        if isinstance(node, ast.Attribute) and isinstance(node.value, ast.Name) and node.value.id == '__old__':
+            names.add(node.attr)
+            old_nodes.add(node.value)
+
+    for node in ast.walk(tree):
+        if isinstance(node, ast.Name) and node.id == '__old__' and node not in old_nodes:
+            return None
 
-__all__ = ['PythonEvaluator']
+    return frozenset(names)
+
+
+# Functions without side effects that can be called by memoized guards, see _guard_dependencies
+_PURE_FUNCTIONS = frozenset(['abs', 'all', 'any', 'bool', 'float', 'int', 'isinstance', 'len',
+                             'max', 'min', 'round', 'sorted', 'str', 'sum', 'tuple'])
+
+
+@lru_cache(maxsize=4096)
+def _guard_dependencies(guard: str) -> Optional[Tuple[bool, bool]]:
+    """
+    Return whether given guard reads variables of the context, and whether it depends on the
+    active configuration (through *active*, *after* or *idle*). Return None if the evaluation of
+    the guard cannot be memoized, because it relies on *time* or on *event*, assigns a variable,
+    or calls functions other than *active*, *after*, *idle* and some builtins without side effects.
+
+    :param guard: code of a guard
+    :return: a pair of Boolean values, or None
+    """
+    try:
+        tree = ast.parse(guard, mode='eval')
+    except SyntaxError:
+        return None
+
+    uses_context = uses_configuration = False
+    for node in ast.walk(tree):
+        if type(node).__name__ == 'NamedExpr':
+            return None
+        elif isinstance(node, ast.Call):
+            if not isinstance(node.func, ast.Name):
+                return None
+            if node.func.id not in _PURE_FUNCTIONS and node.func.id not in ('active', 'after', 'idle'):
+                return None
+        elif isinstance(node, ast.Name):
+            if node.id in ('time', 'event'):
+                return None
+            elif node.id in ('active', 'after', 'idle'):
+                uses_configuration = True
+            elif node.id not in _PURE_FUNCTIONS:
+                uses_context = True
+
+    return uses_context, uses_configuration
 
 
 class PythonEvaluator(Evaluator):
@@ -41,6 +152,8 @@ class PythonEvaluator(Evaluator):
         - A variable *__old__* that has an attribute *x* for every *x* in the context when either the state
           was entered (if the condition involves a state) or the transition was processed (if the condition
           involves a transition). The value of *__old__.x* is a shallow copy of *x* at that time.
+          Only the variables that are read as attributes of *__old__* in the contract of a state or a transition
+          are copied, unless *__old__* is used in another way (e.g. as a mapping).
     - On contract evaluation:
         - A *sent(name: str) -> bool* function that takes an event name and return True if an event with the same name
           was sent during the current step.
@@ -50,11 +163,21 @@ class PythonEvaluator(Evaluator):
     If an exception occurred while executing or evaluating a piece of code, it is propagated by the
     evaluator.
 
+    If *memoize_guards* is set, the result of the guard of an eventless transition is reused until
+    something it depends on changes: the context (any code is executed), the active configuration
+    (if it uses *active*, *after* or *idle*), or the time reaches a deadline of *after* or *idle*.
+    Only guards without side effects are memoized, see *_guard_dependencies*. Values in the context
+    should not be changed in place by code that is not executed by the evaluator. This reduces the cost
+    of executions in which nothing happens, e.g. when an *AsyncRunner* polls an idle interpreter.
+    An evaluator with memoization can be created with ``functools.partial(PythonEvaluator, memoize_guards=True)``.
+
     :param interpreter: the interpreter that will use this evaluator,
         is expected to be an *Interpreter* instance
     :param initial_context: a dictionary that will be used as *__locals__*
+    :param memoize_guards: set to True to memoize the results of the guards of eventless transitions.
     """
-    def __init__(self, interpreter=None, *, initial_context: Mapping[str, Any]=None) -> None:
+    def __init__(self, interpreter=None, *, initial_context: Mapping[str, Any]=None,
+                 memoize_guards: bool=False) -> None:
         super().__init__(interpreter, initial_context=initial_context)
 
         self._context = {}  # type: Dict[str, Any]
@@ -65,20 +188,103 @@ class PythonEvaluator(Evaluator):
         self._event_provider = EventContextProvider()
         self._time_provider = TimeContextProvider()
 
-        self._interpreter.attach(self._event_provider)
-        self._interpreter.attach(self._time_provider)
+        for provider in (self._event_provider, self._time_provider):
+            for name, handler in provider.handlers.items():
+                self._interpreter.attach(handler, names=[name])
+
+        # Frozen contexts for __old__ are discarded once they can no longer be used
+        self._interpreter.attach(self._on_state_entered, names=['state entered'])
+        self._interpreter.attach(self._on_state_exited, names=['state exited'])
+        self._interpreter.attach(self._on_transition_processed, names=['transition processed'])
 
         # Precompiled code
         self._evaluable_code = {}  # type: Dict[str, CodeType]
         self._executable_code = {}  # type: Dict[str, CodeType]
 
-        # Frozen context for __old__
+        # Frozen context for __old__, for active states and the transition being processed
         self._memory = {}  # type: Dict[int, FrozenContext]
+        # Key in _memory of the transition being processed, if any
+        self._transition_memory = None  # type: Optional[int]
+
+        # Time predicates used in guards, see _time_predicates_for
+        self._time_predicates = {}  # type: Dict[str, Optional[List[Tuple[str, float]]]]
+
+        # Reusable namespaces for guards and contracts, see _create_namespaces
+        self._create_namespaces()
+
+        # Memoized guards, indexed by the id of their transition, see _evaluate_memoized_guard. Versions are
+        # incremented each time code is executed, and each time a state is entered or exited or a transition
+        # is processed.
+        self._guard_cache = {} if memoize_guards else None  # type: Optional[Dict[int, Tuple]]
+        self._context_version = 0
+        self._configuration_version = 0
+
+    def _create_namespaces(self) -> None:
+        """
+        Create the namespaces in which guards and contracts are evaluated. They are reused by all the
+        evaluations, so that no dictionary has to be built each time a condition is evaluated.
+        Values that depend on the evaluated condition are set before its evaluation, see *_evaluate_condition*.
+        """
+        # Name of the state used by after and idle
+        self._source = None  # type: Optional[str]
+
+        self._guard_namespace = {
+            'active': self._time_provider.active,
+            'after': self._after,
+            'idle': self._idle,
+        }  # type: Dict[str, Any]
+        self._precondition_namespace = {
+            'active': self._time_provider.active,
+            'received': self._event_provider.received,
+            'sent': self._event_provider.sent,
+        }  # type: Dict[str, Any]
+        self._condition_namespace = {
+            'active': self._time_provider.active,
+            'after': self._after,
+            'idle': self._idle,
+            'received': self._event_provider.received,
+            'sent': self._event_provider.sent,
+        }  # type: Dict[str, Any]
+
+    def _after(self, seconds: float) -> bool:
+        return self._time_provider.after(self._source, seconds)  # type: ignore
+
+    def _idle(self, seconds: float) -> bool:
+        return self._time_provider.idle(self._source, seconds)  # type: ignore
 
     @property
     def context(self) -> Mapping:
         return self._context
 
+    def _on_state_entered(self, event: MetaEvent) -> None:
+        self._configuration_version += 1
+
+    def _on_state_exited(self, event: MetaEvent) -> None:
+        self._configuration_version += 1
+        self._memory.pop(id(self._interpreter.statechart.state_for(event.state)), None)
+
+    def _on_transition_processed(self, event: MetaEvent) -> None:
+        self._configuration_version += 1
+        if self._transition_memory is not None:
+            self._memory.pop(self._transition_memory, None)
+            self._transition_memory = None
+
+    def _old_names_for(self, obj) -> Optional[Set[str]]:
+        """
+        Return the names of the variables that have to be copied for *__old__* when given
+        object is entered or processed, or None if the whole context has to be copied.
+
+        :param obj: a state or a transition
+        :return: a set of names, or None
+        """
+        names = set()  # type: Set[str]
+        for condition in chain(getattr(obj, 'invariants', []), getattr(obj, 'postconditions', [])):
+            condition_names = _old_names(condition)
+            if condition_names is None:
+                return None
+            names.update(condition_names)
+        return names
+
     def _setdefault(self, name: str, value: Any) -> Any:
         """
         Define and return variable "name".
@@ -102,7 +308,7 @@ class PythonEvaluator(Evaluator):
 
         compiled_code = self._evaluable_code.get(code, None)
         if compiled_code is None:
-            compiled_code = self._evaluable_code.setdefault(code, compile(code, '<string>', 'eval'))
+            compiled_code = self._evaluable_code.setdefault(code, _compile(code, 'eval'))
 
         exposed_context = {
             'active': self._time_provider.active,
@@ -115,6 +321,53 @@ class PythonEvaluator(Evaluator):
         except Exception as e:
             raise CodeEvaluationError('"{}" occurred while evaluating "{}"'.format(e, code)) from e
 
+    def _evaluate_condition(self, code: str, namespace: Dict[str, Any], source: Optional[str],
+                            event: Optional[Event]) -> bool:
+        """
+        Evaluate given condition in given reusable namespace. This is equivalent to *_evaluate_code*
+        with an additional context, without building a new context for each evaluation.
+
+        :param code: code to evaluate
+        :param namespace: one of the namespaces created by *_create_namespaces*
+        :param source: name of the state used by *after* and *idle*
+        :param event: value for *event*
+        :return: truth value of *code*
+        """
+        compiled_code = self._evaluable_code.get(code, None)
+        if compiled_code is None:
+            compiled_code = self._evaluable_code.setdefault(code, _compile(code, 'eval'))
+
+        namespace['time'] = self._time_provider.time
+        namespace['event'] = event
+        self._source = source
+
+        try:
+            return eval(compiled_code, namespace, self._context)  # type: ignore
+        except Exception as e:
+            raise CodeEvaluationError('"{}" occurred while evaluating "{}"'.format(e, code)) from e
+
+    def _unsatisfied_conditions(self, obj, cond_type: str, namespace: Dict[str, Any],
+                                event: Optional[Event]) -> Iterator[str]:
+        """
+        Lazily evaluate the conditions of given type for given object, and yield the unsatisfied ones.
+
+        :param obj: the considered state or transition
+        :param cond_type: either "preconditions", "postconditions" or "invariants"
+        :param namespace: one of the namespaces created by *_create_namespaces*
+        :param event: an optional *Event* instance, in the case of a transition
+        :return: an iterator over unsatisfied conditions
+        """
+        if isinstance(obj, Transition):
+            source = obj.source
+        else:
+            source, event = obj.name, None
+
+        for condition in getattr(obj, cond_type, []):
+            if namespace is self._condition_namespace:
+                namespace['__old__'] = self._memory.get(id(obj), None)
+            if not self._evaluate_condition(condition, namespace, source, event):
+                yield condition
+
 
     def _execute_code(self, code: Optional[str], *, additional_context: Mapping[str, Any]=None) -> List[Event]:
         """
@@ -129,7 +382,7 @@ class PythonEvaluator(Evaluator):
 
         compiled_code = self._executable_code.get(code, None)
         if compiled_code is None:
-            compiled_code = self._executable_code.setdefault(code, compile(code, '<string>', 'exec'))
+            compiled_code = self._executable_code.setdefault(code, _compile(code, 'exec'))
 
         exposed_context = {
             'active': self._time_provider.active,
@@ -140,12 +393,63 @@ class PythonEvaluator(Evaluator):
         }
         exposed_context.update(additional_context if additional_context is not None else {})
 
+        # Code can change any value of the context
+        self._context_version += 1
+
         try:
             exec(compiled_code, exposed_context, self._context)  # type: ignore
             return self._event_provider.pending
         except Exception as e:
             raise CodeEvaluationError('"{}" occurred while executing "{}"'.format(e, code)) from e
 
+    def execute_statechart(self, statechart: Statechart):
+        """
+        Execute the initial code of a statechart.
+        This method is called at the very beginning of the execution.
+
+        Contracts are analyzed at this time, to find the variables that are read through *__old__*.
+        If the on-disk cache is enabled (see *set_bytecode_cache*), the code of the statechart is compiled as well.
+
+        :param statechart: statechart to consider
+        """
+        for name in statechart.states:
+            self._old_names_for(statechart.state_for(name))
+        for transition in statechart.transitions:
+            self._old_names_for(transition)
+
+        if _bytecode_cache is not None:
+            self._precompile(statechart)
+
+        super().execute_statechart(statechart)
+
+    def _precompile(self, statechart: Statechart) -> None:
+        """
+        Load the compiled code of given statechart from the on-disk cache. Code that cannot
+        be compiled is ignored, the error being raised when the code is evaluated or executed.
+
+        :param statechart: statechart to consider
+        """
+        elements = [statechart.state_for(name) for name in statechart.states]  # type: List[Any]
+        elements.extend(statechart.transitions)
+
+        pieces = [(statechart.preamble, 'exec')]
+        for element in elements:
+            for attribute in ('on_entry', 'on_exit', 'action'):
+                pieces.append((getattr(element, attribute, None), 'exec'))
+            pieces.append((getattr(element, 'guard', None), 'eval'))
+            for cond_type in ('preconditions', 'postconditions', 'invariants'):
+                pieces.extend((condition, 'eval') for condition in getattr(element, cond_type, []))
+        pieces = [(code, mode) for code, mode in pieces if code]
+
+        _bytecode_cache.load(pieces)  # type: ignore
+
+        for code, mode in pieces:
+            compiled_codes = self._executable_code if mode == 'exec' else self._evaluable_code
+            if code not in compiled_codes:
+                compiled = _bytecode_cache.get(code, mode)  # type: ignore
+                if compiled is not None:
+                    compiled_codes[code] = compiled
+
     def evaluate_guard(self, transition: Transition, event: Optional[Event]=None) -> bool:
         """
         Evaluate the guard for given transition.
@@ -154,12 +458,110 @@ class PythonEvaluator(Evaluator):
         :param event: instance of *Event* if any
         :return: truth value of *code*
         """
-        additional_context = {
-            'after': partial(self._time_provider.after, transition.source),
-            'idle': partial(self._time_provider.idle, transition.source),
-            'event': event,
-        }
-        return self._evaluate_code(getattr(transition, 'guard', None), additional_context=additional_context)
+        guard = getattr(transition, 'guard', None)
+        if guard is None:
+            return True
+        if self._guard_cache is not None and event is None:
+            return self._evaluate_memoized_guard(transition, guard)
+        return self._evaluate_condition(guard, self._guard_namespace, transition.source, event)
+
+    def _evaluate_memoized_guard(self, transition: Transition, guard: str) -> bool:
+        """
+        Evaluate the guard of given eventless transition, or return its memoized result if
+        nothing it depends on changed since its last evaluation.
+
+        :param transition: the considered transition
+        :param guard: the guard of the transition
+        :return: truth value of the guard
+        """
+        entry = self._guard_cache.get(id(transition), None)  # type: ignore
+        if entry is not None and entry[0] is guard:
+            _, uses_context, uses_configuration, context_version, configuration_version, expiration, result = entry
+            if (uses_context is not None
+                    and (not uses_context or context_version == self._context_version)
+                    and (not uses_configuration or configuration_version == self._configuration_version)
+                    and self._time_provider._time < expiration):
+                return result
+        else:
+            dependencies = _guard_dependencies(guard)
+            if dependencies is None or (dependencies[1] and self._time_predicates_for(guard) is None):
+                uses_context, uses_configuration = None, None
+            else:
+                uses_context, uses_configuration = dependencies
+
+        result = self._evaluate_condition(guard, self._guard_namespace, transition.source, None)
+
+        if uses_context is not None:
+            deadline = self.guard_deadline(transition) if uses_configuration else None
+            expiration = float('inf') if deadline is None else deadline
+        else:
+            expiration = float('-inf')
+
+        self._guard_cache[id(transition)] = (  # type: ignore
+            guard, uses_context, uses_configuration,
+            self._context_version, self._configuration_version, expiration, result
+        )
+        return result
+
+    def guard_deadline(self, transition: Transition) -> Optional[float]:
+        """
+        Return the earliest time at which the evaluation of the guard of given transition may change
+        due to the passage of time, or None if this evaluation does not depend on time.
+
+        Only the calls to *after* and *idle* with a constant parameter are precisely taken into account.
+        If the guard relies on time in another way, current time is returned.
+
+        :param transition: the considered transition
+        :return: a time value or None
+        """
+        predicates = self._time_predicates_for(transition.guard)
+        if predicates is None:
+            return self._time_provider.time
+
+        deadlines = []
+        for name, seconds in predicates:
+            if name == 'after':
+                deadline = self._time_provider.after_deadline(transition.source, seconds)
+            else:
+                deadline = self._time_provider.idle_deadline(transition.source, seconds)
+            if deadline > self._time_provider.time:
+                deadlines.append(deadline)
+        return min(deadlines) if deadlines else None
+
+    def _time_predicates_for(self, code: str) -> Optional[List[Tuple[str, float]]]:
+        """
+        Return the (name, seconds) pairs corresponding to the calls to *after* and *idle* in given code,
+        or None if the code depends on time in another way (e.g. using *time*, or calling *after* or *idle*
+        with a non-constant parameter).
+
+        :param code: code to analyse
+        :return: a possibly empty list of pairs, or None
+        """
+        if code in self._time_predicates:
+            return self._time_predicates[code]
+
+        predicates = []  # type: Optional[List[Tuple[str, float]]]
+        calls = set()
+        tree = ast.parse(code, mode='eval')
+
+        for node in ast.walk(tree):
+            if isinstance(node, ast.Call) and isinstance(node.func, ast.Name) and node.func.id in ('after', 'idle'):
+                calls.add(node.func)
+                try:
+                    seconds = ast.literal_eval(node.args[0]) if len(node.args) == 1 and not node.keywords else None
+                except ValueError:
+                    seconds = None
+                if isinstance(seconds, (int, float)) and not isinstance(seconds, bool):
+                    predicates.append((node.func.id, seconds))
+                else:
+                    predicates = None
+                    break
+            elif isinstance(node, ast.Name) and node.id in ('time', 'after', 'idle') and node not in calls:
+                predicates = None
+                break
+
+        self._time_predicates[code] = predicates
+        return predicates
 
     def evaluate_preconditions(self, obj, event: Optional[Event]=None) -> Iterator[str]:
         """
@@ -170,20 +572,15 @@ class PythonEvaluator(Evaluator):
         :param event: an optional *Event* instance, in the case of a transition
         :return: list of unsatisfied conditions
         """
-        additional_context = {
-            'received': self._event_provider.received,
-            'sent': self._event_provider.sent,
-            'event': event if isinstance(obj, Transition) else None,
-        }
-
-        # Deal with __old__ in contracts, only required if there is an invariant or a postcondition
-        if len(getattr(obj, 'invariants', [])) > 0 or len(getattr(obj, 'postconditions', [])) > 0:
-            self._memory[id(obj)] = FrozenContext(self._context)
+        # Deal with __old__ in contracts, only for the variables read by invariants and postconditions
+        names = self._old_names_for(obj)
+        if names is None or len(names) > 0:
+            values = self._context if names is None else {name: self._context[name] for name in names if name in self._context}
+            self._memory[id(obj)] = FrozenContext(values)
+            if isinstance(obj, Transition):
+                self._transition_memory = id(obj)
 
-        return filter(
-            lambda c: not self._evaluate_code(c, additional_context=additional_context),
-            getattr(obj, 'preconditions', [])
-        )
+        return self._unsatisfied_conditions(obj, 'preconditions', self._precondition_namespace, event)
 
     def evaluate_invariants(self, obj, event: Optional[Event]=None) -> Iterator[str]:
         """
@@ -194,21 +591,7 @@ class PythonEvaluator(Evaluator):
         :param event: an optional *Event* instance, in the case of a transition
         :return: list of unsatisfied conditions
         """
-        state_name = obj.source if isinstance(obj, Transition) else obj.name
-
-        additional_context = {
-            '__old__': self._memory.get(id(obj), None),
-            'after': partial(self._time_provider.after, state_name),
-            'idle': partial(self._time_provider.idle, state_name),
-            'received': self._event_provider.received,
-            'sent': self._event_provider.sent,
-            'event': event if isinstance(obj, Transition) else None,
-        }
-
-        return filter(
-            lambda c: not self._evaluate_code(c, additional_context=additional_context),
-            getattr(obj, 'invariants', [])
-        )
+        return self._unsatisfied_conditions(obj, 'invariants', self._condition_namespace, event)
 
     def evaluate_postconditions(self, obj, event: Optional[Event]=None) -> Iterator[str]:
         """
@@ -219,24 +602,91 @@ class PythonEvaluator(Evaluator):
         :param event: an optional *Event* instance, in the case of a transition
         :return: list of unsatisfied conditions
         """
-        state_name = obj.source if isinstance(obj, Transition) else obj.name
-        
-        additional_context = {
-            '__old__': self._memory.get(id(obj), None),
-            'after': partial(self._time_provider.after, state_name),
-            'idle': partial(self._time_provider.idle, state_name),
-            'received': self._event_provider.received,
-            'sent': self._event_provider.sent,
-            'event': event if isinstance(obj, Transition) else None,
+        return self._unsatisfied_conditions(obj, 'postconditions', self._condition_namespace, event)
+
+    def snapshot(self) -> Dict[str, Any]:
+        """
+        Return the context, the time related data used by *after*, *idle* and *active*,
+        and the frozen contexts used by *__old__* for active states.
+        Mutable values are copied (see *fork*), so that the snapshot is not affected by the
+        subsequent execution.
+
+        :return: a dictionary
+        """
+        old = {}
+        for name in self._time_provider._configuration:
+            frozen_context = self._memory.get(id(self._interpreter.statechart.state_for(name)), None)
+            if frozen_context is not None:
+                old[name] = _copy_context(frozen_context)
+
+        return {
+            'context': _copy_context(self._context),
+            'time': self._time_provider._time,
+            'active': list(self._time_provider._configuration),
+            'entry_time': dict(self._time_provider._entry_time),
+            'idle_time': dict(self._time_provider._idle_time),
+            'old': old,
         }
 
-        return filter(
-            lambda c: not self._evaluate_code(c, additional_context=additional_context),
-            getattr(obj, 'postconditions', [])
-        )
+    def restore(self, snapshot: Mapping[str, Any]) -> None:
+        """
+        Restore the context and the time related data from given snapshot.
+        Values in the snapshot take precedence over the ones defined by the preamble.
+        Mutable values are copied, so that the snapshot can be restored several times.
+
+        :param snapshot: a dictionary returned by *snapshot*
+        """
+        self._context.update(_copy_context(snapshot['context']))
+        self._time_provider._time = snapshot['time']
+        self._time_provider._configuration = list(snapshot['active'])
+        self._time_provider._entry_time = dict(snapshot['entry_time'])
+        self._time_provider._idle_time = dict(snapshot['idle_time'])
+
+        for name, context in snapshot['old'].items():
+            self._memory[id(self._interpreter.statechart.state_for(name))] = FrozenContext(_copy_context(context))
+
+        self._context_version += 1
+        self._configuration_version += 1
+
+    def fork(self, interpreter, *, shallow: bool=False) -> 'PythonEvaluator':
+        """
+        Return a new evaluator for given interpreter, whose runtime state is a copy of the one of
+        this evaluator. Compiled code is shared by both evaluators. Immutable values of the context
+        are shared as well, and the other ones are deep-copied: the cost of a fork is proportional
+        to the size of the mutable values of the context.
+
+        If *shallow* is True, only the context itself is copied, and all its values are shared.
+        Assigning a variable does not affect the other evaluator, but changing a value in place
+        (e.g. appending an item to a list) does.
+
+        :param interpreter: the interpreter that will use the new evaluator
+        :param shallow: set to True to share the values of the context instead of copying them.
+        :return: an evaluator
+        """
+        evaluator = self.__class__(interpreter)
+
+        evaluator._context = dict(self._context) if shallow else _copy_context(self._context)
+        evaluator._evaluable_code = self._evaluable_code
+        evaluator._executable_code = self._executable_code
+        evaluator._time_predicates = self._time_predicates
+        evaluator._memory = self._memory.copy()
+        evaluator._guard_cache = None if self._guard_cache is None else {}
+
+        evaluator._time_provider._time = self._time_provider._time
+        evaluator._time_provider._configuration = list(self._time_provider._configuration)
+        evaluator._time_provider._entry_time = self._time_provider._entry_time.copy()
+        evaluator._time_provider._idle_time = self._time_provider._idle_time.copy()
+
+        return evaluator
 
     def __getstate__(self):
         attributes = self.__dict__.copy()
         attributes['_executable_code'] = dict()  # Code fragment cannot be pickled
         attributes['_evaluable_code'] = dict()  # Code fragment cannot be pickled
+        for name in ['_guard_namespace', '_precondition_namespace', '_condition_namespace']:
+            del attributes[name]  # Namespaces refer to builtins once used
         return attributes
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._create_namespaces()
@@ -86,7 +86,8 @@ def run_in_background(interpreter: Interpreter,
     thread = threading.Thread(target=_task)
 
     def stop_thread():
-        interpreter._configuration = set()
+        for name in interpreter.configuration:
+            interpreter._remove_from_configuration(name)
 
     thread.stop = stop_thread  # type: ignore
 
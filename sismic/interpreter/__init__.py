@@ -1,4 +1,5 @@
 from .default import Interpreter
+from .contract import ContractPolicy
 from ..model.events import Event, InternalEvent, MetaEvent
 
-__all__ = ['Interpreter', 'Event', 'InternalEvent', 'MetaEvent']
+__all__ = ['Interpreter', 'ContractPolicy', 'Event', 'InternalEvent', 'MetaEvent']
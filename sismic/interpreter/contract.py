@@ -0,0 +1,140 @@
+import copy
+import random
+import time
+
+from typing import Callable, Iterable, Union
+
+from ..model import StateMixin, Transition
+
+__all__ = ['ContractPolicy']
+
+
+class ContractPolicy:
+    """
+    A policy that decides which contract conditions are checked by an interpreter, in order to
+    lower the cost of contract checking while keeping some of its safety.
+
+    By default, every condition is checked. The following (cumulative) restrictions can be specified:
+
+     - *every*: conditions are only checked during one macro step out of *every*.
+     - *probability*: each check is done with given probability.
+     - *states* and *transitions*: only the conditions of given states and transitions are checked.
+       If one of them is not provided, the conditions of all states (resp. transitions) are checked.
+     - *max_rate*: at most *max_rate* checks are done per second (wall-clock time), the remaining ones
+       are skipped.
+
+    Only the checks of states and transitions having conditions of the considered kind are counted.
+    The number of checks that were done and skipped are respectively available through the *checked*
+    and *skipped* attributes. If a policy is shared by several interpreters, these counters are shared as well.
+    A forked interpreter uses a copy of the policy (see *fork*).
+
+    :param every: check conditions during one macro step out of *every*.
+    :param probability: probability with which each check is done.
+    :param states: optional names of the states whose conditions are checked.
+    :param transitions: optional transitions whose conditions are checked.
+    :param max_rate: optional maximal number of checks per second.
+    :param seed: optional seed for the random number generator used with *probability*.
+    :param timer: function returning the current wall-clock time in seconds, used with *max_rate*.
+    """
+
+    def __init__(self, *,
+                 every: int=1,
+                 probability: float=1.0,
+                 states: Iterable[str]=None,
+                 transitions: Iterable[Transition]=None,
+                 max_rate: float=None,
+                 seed: int=None,
+                 timer: Callable[[], float]=time.monotonic) -> None:
+        if every < 1:
+            raise ValueError('every must be greater than or equal to 1, not {}'.format(every))
+        if not 0 <= probability <= 1:
+            raise ValueError('probability must be between 0 and 1, not {}'.format(probability))
+        if max_rate is not None and max_rate <= 0:
+            raise ValueError('max_rate must be positive, not {}'.format(max_rate))
+
+        self._every = every
+        self._probability = probability
+        self._states = None if states is None else frozenset(states)
+        self._transitions = None if transitions is None else frozenset(transitions)
+        self._max_rate = max_rate
+        self._random = random.Random(seed)
+        self._timer = timer
+
+        # Number of macro steps that were started
+        self._steps = 0
+
+        # Available checks for max_rate, and the time at which they were computed
+        self._tokens = max_rate
+        self._last_time = None  # type: float
+
+        self.checked = 0
+        self.skipped = 0
+
+    def start_step(self) -> None:
+        """
+        Called by the interpreter each time a macro step starts.
+        """
+        self._steps += 1
+
+    def check(self, obj: Union[Transition, StateMixin], cond_type: str) -> bool:
+        """
+        Return True if the conditions of given type must be checked for given object,
+        and update the counters accordingly.
+
+        :param obj: a state or a transition
+        :param cond_type: either "preconditions", "postconditions" or "invariants"
+        :return: True if the conditions must be checked
+        """
+        if self._selects(obj) and self._samples() and self._consume():
+            self.checked += 1
+            return True
+        else:
+            self.skipped += 1
+            return False
+
+    def reset_counters(self) -> None:
+        """
+        Reset the number of checks that were done and skipped.
+        """
+        self.checked = 0
+        self.skipped = 0
+
+    def fork(self) -> 'ContractPolicy':
+        """
+        Return a copy of this policy, with its own counters and random number generator.
+        This method is used by *Interpreter.fork*.
+
+        :return: a *ContractPolicy* instance
+        """
+        policy = copy.copy(self)
+        policy._random = random.Random()
+        policy._random.setstate(self._random.getstate())
+        return policy
+
+    def _selects(self, obj: Union[Transition, StateMixin]) -> bool:
+        if isinstance(obj, Transition):
+            return self._transitions is None or obj in self._transitions
+        else:
+            return self._states is None or obj.name in self._states
+
+    def _samples(self) -> bool:
+        if self._every > 1 and (self._steps - 1) % self._every != 0:
+            return False
+        return self._probability >= 1 or self._random.random() < self._probability
+
+    def _consume(self) -> bool:
+        if self._max_rate is None:
+            return True
+
+        now = self._timer()
+        if self._last_time is not None:
+            self._tokens = min(self._max_rate, self._tokens + (now - self._last_time) * self._max_rate)
+        self._last_time = now
+
+        if self._tokens >= 1:
+            self._tokens -= 1
+            return True
+        return False
+
+    def __repr__(self):
+        return '{}(checked={}, skipped={})'.format(self.__class__.__name__, self.checked, self.skipped)
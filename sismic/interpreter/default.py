@@ -1,14 +1,20 @@
 import bisect
+import copy
+import heapq
 import warnings
 
+from collections import OrderedDict
 from itertools import combinations
-from typing import (Any, Callable, Dict, Iterable, List, Mapping, Optional,
-                    Set, Tuple, Union, cast)
+from time import monotonic
+from typing import (Any, Callable, Dict, FrozenSet, Iterable, Iterator, List,
+                    Mapping, Optional, Set, Tuple, Union, cast)
 
+from .contract import ContractPolicy
 from .listener import InternalEventListener, PropertyStatechartListener
 from ..utilities import sorted_groupby
 from ..clock import Clock, SimulatedClock, SynchronizedClock
 from ..code import Evaluator, PythonEvaluator
+from ..code.context import _copy_context
 from ..exceptions import (ConflictingTransitionsError, InvariantError,
                           NonDeterminismError, PostconditionError,
                           PreconditionError, PropertyStatechartError)
@@ -20,16 +26,88 @@ from ..model import (CompoundState, DeepHistoryState, Event,
 __all__ = ['Interpreter']
 
 
-class _KeyifyList():
-    def __init__(self, inner, key):
-        self.inner = inner
-        self.key = key
+# Event classes that can be stored in snapshots, see Interpreter.snapshot
+_EVENT_KINDS = {
+    'event': Event,
+    'internal': InternalEvent,
+    'meta': MetaEvent,
+}  # type: Dict[str, Callable[..., Event]]
+
+
+def _event_kind(event: Event) -> str:
+    """
+    Return the kind of given event, as stored in snapshots.
+
+    :param event: an *Event* instance
+    :return: a key of *_EVENT_KINDS*
+    """
+    if isinstance(event, InternalEvent):
+        return 'internal'
+    elif isinstance(event, MetaEvent):
+        return 'meta'
+    else:
+        return 'event'
+
+
+class _EventQueue:
+    """
+    A stable priority queue of events, based on a heap.
+
+    Events are ordered by time. Internal events come before external ones
+    if they share the same time, and ties are broken following insertion order.
+    Iterating over the queue yields (time, event) pairs in that order.
+    """
+    def __init__(self) -> None:
+        self._heap = []  # type: List[Tuple[float, bool, int, Event]]
+        self._counter = 0
+
+    def push(self, time: float, event: Event) -> None:
+        """
+        Add given event at given time.
+
+        :param time: time at which the event should be processed.
+        :param event: event to add.
+        """
+        heapq.heappush(self._heap, (time, not isinstance(event, InternalEvent), self._counter, event))
+        self._counter += 1
+
+    def copy(self) -> '_EventQueue':
+        """
+        Return a copy of this queue.
+
+        :return: an *_EventQueue* instance
+        """
+        queue = _EventQueue()
+        queue._heap = list(self._heap)
+        queue._counter = self._counter
+        return queue
+
+    def first(self) -> Tuple[float, Event]:
+        """
+        Return, without removing it, the first (time, event) pair of this queue.
+
+        :return: a (time, event) pair
+        :raise IndexError: if the queue is empty
+        """
+        time, _, _, event = self._heap[0]
+        return time, event
+
+    def pop(self) -> Tuple[float, Event]:
+        """
+        Remove and return the first (time, event) pair of this queue.
+
+        :return: a (time, event) pair
+        :raise IndexError: if the queue is empty
+        """
+        time, _, _, event = heapq.heappop(self._heap)
+        return time, event
 
     def __len__(self):
-        return len(self.inner)
+        return len(self._heap)
 
-    def __getitem__(self, k):
-        return self.key(self.inner[k])
+    def __iter__(self) -> Iterator[Tuple[float, Event]]:
+        for time, _, _, event in sorted(self._heap):
+            yield time, event
 
 
 class Interpreter:
@@ -46,15 +124,22 @@ class Interpreter:
     :param clock: A BaseClock instance that will be used to set this interpreter internal time.
         By default, a SimulatedClock is used.
     :param ignore_contract: set to True to ignore contract checking during the execution.
+    :param contract_policy: an optional *ContractPolicy* instance that decides which contract conditions are
+        checked during the execution. By default, all of them are checked, unless *ignore_contract* is set.
     """
 
+    #: Version of the format of snapshots, see *snapshot*
+    SNAPSHOT_VERSION = 1
+
     def __init__(self, statechart: Statechart, *,
                  evaluator_klass: Callable[..., Evaluator]=PythonEvaluator,
                  initial_context: Mapping[str, Any]=None,
                  clock: Clock=None,
-                 ignore_contract: bool=False) -> None:
+                 ignore_contract: bool=False,
+                 contract_policy: ContractPolicy=None) -> None:
         # Internal variables
         self._ignore_contract = ignore_contract
+        self._contract_policy = contract_policy
         self._statechart = statechart
 
         self._initialized = False
@@ -69,15 +154,33 @@ class Interpreter:
         # Set of active states
         self._configuration = set()  # type: Set[str]
 
+        # Active states as (depth, name) pairs, kept sorted, see _add_to_configuration
+        self._sorted_configuration = []  # type: List[Tuple[int, str]]
+        self._configuration_key = None  # type: Optional[FrozenSet[str]]
+
+        # Data computed from the structure of the statechart, see _check_statechart_version
+        self._statechart_version = statechart._version
+        self._selection_plans = OrderedDict()  # type: OrderedDict
+        self._preorder = {}  # type: Dict[str, int]
+        # Indexed by id, as transitions are hashed by their source only (see Transition.__hash__)
+        self._scope_depths = {}  # type: Dict[int, Optional[int]]
+        self._unstable_states = {}  # type: Dict[str, bool]
+
+        # States that could require stabilization as (-depth, name) pairs, see _next_unstable_leaf
+        self._stabilization_candidates = []  # type: List[Tuple[int, str]]
+
         # Event queues
-        self._internal_queue = []  # type: List[Tuple[float, InternalEvent]]
-        self._external_queue = []  # type: List[Tuple[float, Event]]
+        self._internal_queue = _EventQueue()
+        self._external_queue = _EventQueue()
 
-        # Bound listeners
+        # Bound listeners, and the names of the meta-events they subscribed to (None for all of them)
         self._listeners = []  # type: List[Callable[[MetaEvent], Any]]
+        self._listener_names = []  # type: List[Optional[FrozenSet[str]]]
+        self._dispatch = {}  # type: Dict[str, List[Callable[[MetaEvent], Any]]]
 
-        # Evaluator
+        # Evaluator, and the listeners it attached
         self._evaluator = evaluator_klass(self, initial_context=initial_context)
+        self._evaluator_listeners = list(self._listeners)
         self._evaluator.execute_statechart(statechart)
 
     @property
@@ -98,7 +201,17 @@ class Interpreter:
         List of active states names, ordered by depth. Ties are broken according to the lexicographic order
         on the state name.
         """
-        return sorted(self._configuration, key=lambda s: (self._statechart.depth_for(s), s))
+        return [name for _, name in self._sorted_configuration]
+
+    @property
+    def configuration_key(self) -> FrozenSet[str]:
+        """
+        Frozen set of active states names. Being hashable, it can be used to identify a configuration, for
+        example as a key in a cache. The set is only computed once for each configuration.
+        """
+        if self._configuration_key is None:
+            self._configuration_key = frozenset(self._configuration)
+        return self._configuration_key
 
     @property
     def context(self) -> Mapping[str, Any]:
@@ -121,11 +234,13 @@ class Interpreter:
         """
         return self._statechart
 
-    def attach(self, listener: Callable[[MetaEvent], Any]) -> None:
+    def attach(self, listener: Callable[[MetaEvent], Any], names: Iterable[str]=None) -> None:
         """
         Attach given listener to the current interpreter. 
 
         The listener is called each time a meta-event is emitted by current interpreter.
+        If *names* is provided, the listener is only called for meta-events having one of these names.
+        Meta-events for which there is no listener are not created at all.
         Emitted meta-events are:
         
          - *step started*: when a (possibly empty) macro step starts. The current time of the step is available through the ``time`` attribute.
@@ -143,8 +258,11 @@ class Interpreter:
         Consult ``sismic.interpreter.listener`` for common listeners/wrappers.
 
         :param listener: A callable that accepts meta-event instances.
+        :param names: An optional list of meta-event names the listener subscribes to.
         """
         self._listeners.append(listener)
+        self._listener_names.append(None if names is None else frozenset(names))
+        self._dispatch = {}
 
     def detach(self, listener: Callable[[MetaEvent], Any]) -> None:
         """
@@ -152,7 +270,10 @@ class Interpreter:
         
         :param listener: A previously attached listener.
         """
-        self._listeners.remove(listener)
+        index = self._listeners.index(listener)
+        del self._listeners[index]
+        del self._listener_names[index]
+        self._dispatch = {}
 
     def bind(self, interpreter_or_callable: Union['Interpreter', Callable[[Event], Any]]) -> Callable[[MetaEvent], Any]:
         """
@@ -174,7 +295,7 @@ class Interpreter:
         else:
             listener = InternalEventListener(interpreter_or_callable)
 
-        self.attach(listener)
+        self.attach(listener, names=['event sent'])
         
         return listener
 
@@ -214,6 +335,133 @@ class Interpreter:
 
         return listener
 
+    def snapshot(self) -> Dict[str, Any]:
+        """
+        Return the runtime state of this interpreter, i.e. its active configuration, the memory of its
+        history states, its event queues, its current time, and the state of its evaluator (see *Evaluator.snapshot*).
+
+        The snapshot is a dictionary made of lists, dictionaries, strings, numbers and Booleans, in addition
+        to the parameters of the queued events and the values in the context of the evaluator.
+        It does not contain the statechart, the clock, the bound listeners and property statecharts.
+        Mutable parameters of the events are copied, and so are the mutable values of the context
+        with a *PythonEvaluator*: the snapshot is not affected by the subsequent execution.
+        This method should not be called during the execution of a step.
+
+        :return: a dictionary that can be provided to *restore*
+        """
+        return {
+            'version': self.SNAPSHOT_VERSION,
+            'statechart': self._statechart.name,
+            'initialized': self._initialized,
+            'time': self._time,
+            'configuration': self.configuration,
+            'memory': {name: None if memory is None else list(memory) for name, memory in self._memory.items()},
+            'internal queue': [[time, _event_kind(event), event.name, _copy_context(event.data)]
+                               for time, event in self._internal_queue],
+            'external queue': [[time, _event_kind(event), event.name, _copy_context(event.data)]
+                               for time, event in self._external_queue],
+            'evaluator': self._evaluator.snapshot(),
+        }
+
+    @classmethod
+    def restore(cls, statechart: Statechart, snapshot: Mapping[str, Any], **kwargs) -> 'Interpreter':
+        """
+        Create an interpreter for given statechart, and restore its runtime state from given snapshot.
+
+        The statechart must be (a copy of) the one for which the snapshot was created.
+        Unless a clock is provided, the interpreter uses a *SimulatedClock* set to the time of the snapshot.
+        The preamble of the statechart is executed before the state of the evaluator is restored.
+        Listeners and property statecharts have to be bound again.
+        Mutable values of the snapshot are copied: the restored interpreter is independent of the
+        interpreter that created the snapshot, and the snapshot can be restored several times.
+
+        :param statechart: statechart to interpret
+        :param snapshot: a dictionary returned by *snapshot*
+        :param kwargs: additional parameters for the constructor, e.g. *evaluator_klass*.
+        :return: an interpreter
+        :raise ValueError: if the snapshot is not supported or if it was created for another statechart
+        """
+        if snapshot.get('version') != cls.SNAPSHOT_VERSION:
+            raise ValueError('Unsupported snapshot version: {}'.format(snapshot.get('version')))
+        if snapshot['statechart'] != statechart.name:
+            raise ValueError('Snapshot was created for statechart {}, not {}'.format(snapshot['statechart'], statechart.name))
+
+        if kwargs.get('clock', None) is None:
+            kwargs['clock'] = SimulatedClock()
+            kwargs['clock'].time = snapshot['time']
+
+        interpreter = cls(statechart, **kwargs)
+        interpreter._initialized = snapshot['initialized']
+        interpreter._time = snapshot['time']
+
+        for name in snapshot['configuration']:
+            interpreter._add_to_configuration(name)
+        interpreter._memory = {
+            name: None if memory is None else list(memory) for name, memory in snapshot['memory'].items()
+        }
+
+        for queue, key in [(interpreter._internal_queue, 'internal queue'), (interpreter._external_queue, 'external queue')]:
+            for time, kind, name, data in snapshot[key]:
+                queue.push(time, _EVENT_KINDS[kind](name, **_copy_context(data)))
+
+        interpreter._evaluator.restore(snapshot['evaluator'])
+
+        return interpreter
+
+    def fork(self, *, clock: Clock=None, bind: bool=False, shallow: bool=False) -> 'Interpreter':
+        """
+        Return a new interpreter that continues the execution from the current one, e.g. to
+        explore what would happen if some event is sent. Both interpreters can then be executed
+        independently.
+
+        The statechart and the compiled code are shared. The active configuration, the memory of
+        history states, the event queues, the data computed from the statechart and the contract
+        policy are copied. The context is copied by the evaluator (see *Evaluator.fork*):
+        immutable values are shared, and the other ones are deep-copied. The cost of a fork
+        therefore grows with the size of the mutable values of the context, unless *shallow* is True.
+
+        :param clock: A clock for the new interpreter. By default, a (shallow) copy of current clock is used.
+        :param bind: set to True to attach the listeners of the current interpreter to the new one.
+            Property statecharts are forked as well, and bound to the new interpreter.
+        :param shallow: set to True to share the values of the context instead of copying them.
+            Values changed in place (e.g. a list to which an item is appended) are then changed
+            for both interpreters.
+        :return: a new interpreter
+        """
+        fork = self.__class__.__new__(self.__class__)
+
+        # Start from a shallow copy, then copy the runtime state
+        fork.__dict__.update(self.__dict__)
+        fork.clock = copy.copy(self.clock) if clock is None else clock
+        fork._configuration = set(self._configuration)
+        fork._sorted_configuration = list(self._sorted_configuration)
+        fork._stabilization_candidates = list(self._stabilization_candidates)
+        fork._memory = {name: None if memory is None else list(memory) for name, memory in self._memory.items()}
+        fork._internal_queue = self._internal_queue.copy()
+        fork._external_queue = self._external_queue.copy()
+        fork._selection_plans = OrderedDict(self._selection_plans)
+        fork._preorder = self._preorder.copy()
+        fork._scope_depths = self._scope_depths.copy()
+        fork._unstable_states = self._unstable_states.copy()
+        fork._contract_policy = None if self._contract_policy is None else self._contract_policy.fork()
+        fork._listeners = []
+        fork._listener_names = []
+        fork._dispatch = {}
+
+        fork._evaluator = self._evaluator.fork(fork, shallow=shallow)
+        fork._evaluator_listeners = list(fork._listeners)
+
+        if bind:
+            for listener, names in zip(self._listeners, self._listener_names):
+                if any(listener is evaluator_listener for evaluator_listener in self._evaluator_listeners):
+                    continue
+                if isinstance(listener, PropertyStatechartListener):
+                    property_interpreter = listener._interpreter.fork(clock=SynchronizedClock(fork))
+                    listener = PropertyStatechartListener(property_interpreter)
+                fork.attach(listener, names=names)
+
+        return fork
+
     def queue(self, event_or_name:Union[str, Event], *event_or_names:Union[str, Event], **parameters) -> 'Interpreter':
         """
         Create and queue given events to the external event queue.
@@ -234,29 +482,80 @@ class Interpreter:
             self._queue_event(event)
         return self
 
+    def next_deadline(self) -> Optional[float]:
+        """
+        Return the earliest time at which something may happen in this interpreter, assuming
+        no new event is queued. This is the time of the next (possibly delayed) queued event, or
+        the time at which the evaluation of a guard of an eventless transition may change (e.g.
+        when it relies on *after* or *idle*). A returned value lower than or equal to the current
+        time means that a call to *execute_once* may already process something.
+
+        The returned value is only relevant if the last call to *execute_once* returned None, as guards
+        that do not depend on time are not evaluated by this method. This allows to wait until something
+        may happen instead of repeatedly calling *execute_once*.
+
+        :return: a time value, or None if nothing can happen without a new event.
+        """
+        if not self._initialized:
+            return self.time
+        if self.final:
+            return None
+
+        deadlines = []
+        for queue in (self._internal_queue, self._external_queue):
+            if len(queue) > 0:
+                deadlines.append(queue.first()[0])
+
+        for state in self._configuration:
+            for transition in self._statechart._transitions_for(state, None):
+                if transition.guard:
+                    deadline = self._evaluator.guard_deadline(transition)
+                    if deadline is not None:
+                        deadlines.append(deadline)
+
+        return min(deadlines) if deadlines else None
+
     def execute(self, max_steps: int = -1) -> List[MacroStep]:
         """
         Repeatedly calls *execute_once* and return a list containing
         the returned values of *execute_once*.
 
         Notice that this does NOT return an iterator but computes the whole list first
-        before returning it.
+        before returning it. See *iter_execute* for an iterator.
 
         :param max_steps: An upper bound on the number steps that are computed and returned.
             Default is -1, no limit. Set to a positive integer to avoid infinite loops
             in the statechart execution.
         :return: A list of *MacroStep* instances
         """
-        returned_steps = []
+        return list(self.iter_execute(max_steps=max_steps))
+
+    def iter_execute(self, max_steps: int = -1, max_time: float = None) -> Iterator[MacroStep]:
+        """
+        Repeatedly calls *execute_once* and yield the returned values of *execute_once*,
+        until it returns None.
+
+        Steps are computed lazily: each step is executed only when it is requested, and the execution
+        can be stopped at any time by no longer requesting steps.
+
+        :param max_steps: An upper bound on the number steps that are computed and yielded.
+            Default is -1, no limit. Set to a positive integer to avoid infinite loops
+            in the statechart execution.
+        :param max_time: An optional upper bound, in (wall-clock) seconds, on the duration of the execution.
+            No new step is computed once this duration is exceeded, but the step being computed is not interrupted.
+        :return: An iterator over *MacroStep* instances
+        """
+        deadline = None if max_time is None else monotonic() + max_time
+
         i = 0
-        macro_step = self.execute_once()
-        while macro_step:
-            returned_steps.append(macro_step)
+        while deadline is None or monotonic() < deadline:
+            macro_step = self.execute_once()
+            if not macro_step:
+                break
+            yield macro_step
             i += 1
             if 0 < max_steps == i:
                 break
-            macro_step = self.execute_once()
-        return returned_steps
 
     def execute_once(self) -> Optional[MacroStep]:
         """
@@ -267,11 +566,35 @@ class Interpreter:
 
         :return: a macro step or *None* if nothing happened
         """
+        return cast(Optional[MacroStep], self._execute_once(record=True))
+
+    def execute_once_fast(self) -> bool:
+        """
+        Same as *execute_once*, except that the micro steps are not completed with the events they sent,
+        and that no macro step is created (unless an invariant is not satisfied, for its report). This is useful when returned steps are not used.
+
+        :return: True if a macro step was executed, False if nothing happened
+        """
+        return cast(bool, self._execute_once(record=False))
+
+    def _execute_once(self, record: bool) -> Union[Optional[MacroStep], bool]:
+        """
+        Execute a macro step, see *execute_once*.
+
+        :param record: set to False to neither complete the applied micro steps with the events they
+            sent (see *_apply_step*) nor create a macro step. In that case, a macro step made of the
+            computed steps is only created if it is needed to report an unsatisfied invariant.
+        :return: a macro step or *None* if nothing happened, or a Boolean indicating whether
+            something happened if *record* is False.
+        """
         # Store time to have a consistent time value during this step
         self._time = self.clock.time
 
+        if self._contract_policy is not None:
+            self._contract_policy.start_step()
+
         # Notify listeners
-        self._raise_event(MetaEvent('step started', time=self.time))
+        self._notify('step started', time=self.time)
         
         # Compute steps
         computed_steps = self._compute_steps()
@@ -280,7 +603,7 @@ class Interpreter:
             # Consume event if it triggered a transition
             if computed_steps[0].event is not None:
                 event = self._select_event(consume=True)
-                self._raise_event(MetaEvent('event consumed', event=event))
+                self._notify('event consumed', event=event)
             else:
                 event = None
 
@@ -289,24 +612,36 @@ class Interpreter:
                 warnings.warn('Evaluator.on_step_starts is deprecated since 1.4.0.', DeprecationWarning)
                 self._evaluator.on_step_starts(event)
 
-            executed_steps = []
-            for step in computed_steps:
-                executed_steps.append(self._apply_step(step))
-                executed_steps.extend(self._stabilize())
-
-            macro_step = MacroStep(time=self.time, steps=executed_steps)  # type: Optional[MacroStep]
+            if record:
+                executed_steps = []
+                for step in computed_steps:
+                    executed_steps.append(self._apply_step(step))
+                    executed_steps.extend(self._stabilize())
+                macro_step = MacroStep(time=self.time, steps=executed_steps)  # type: Optional[MacroStep]
+            else:
+                for step in computed_steps:
+                    self._apply_step(step, record=False)
+                    self._stabilize(record=False)
+                macro_step = None
         else:  # No step
             macro_step = None
 
-        # Check state invariants
-        configuration = self.configuration  # Use self.configuration to benefit from the sorting by depth
-        for name in configuration:
-            state = self._statechart.state_for(name)
-            self._evaluate_contract_conditions(state, 'invariants', macro_step)
+        # Check state invariants, sorted by depth. Without records, the first computed step
+        # provides the event, and a macro step is only created for the report of an error.
+        checked_step = macro_step if record or len(computed_steps) == 0 else computed_steps[0]
+        try:
+            for _, name in self._sorted_configuration:
+                state = self._statechart.state_for(name)
+                self._evaluate_contract_conditions(state, 'invariants', checked_step)
+        except InvariantError as e:
+            if checked_step is macro_step:
+                raise
+            raise InvariantError(configuration=e.configuration, step=MacroStep(time=self.time, steps=computed_steps),
+                                 obj=e.obj, assertion=e.condition, context=e.context) from None
 
-        self._raise_event(MetaEvent('step ended'))
+        self._notify('step ended')
 
-        return macro_step
+        return macro_step if record else len(computed_steps) > 0
 
     def _queue_event(self, event: Event):
         """
@@ -314,17 +649,8 @@ class Interpreter:
 
         :param event: Event to queue.
         """
-        if isinstance(event, InternalEvent):
-            queue = cast(List[Tuple[float, Event]], self._internal_queue)
-        else:
-            queue = self._external_queue
-
-        time = self.time + getattr(event, 'delay', 0)
-        position = bisect.bisect_right(  # type: ignore
-            _KeyifyList(queue, lambda t: (t[0], not isinstance(t[1], InternalEvent))),
-            (time, not isinstance(event, InternalEvent))
-        )
-        queue.insert(position, (time, event))
+        queue = self._internal_queue if isinstance(event, InternalEvent) else self._external_queue
+        queue.push(self.time + getattr(event, 'delay', 0), event)
 
     def _raise_event(self, event: Union[InternalEvent, MetaEvent]) -> None:
         """
@@ -336,16 +662,46 @@ class Interpreter:
         """
         if isinstance(event, InternalEvent):
             self._queue_event(event)
-            self._raise_event(MetaEvent('event sent', event=event))
+            self._notify('event sent', event=event)
             if hasattr(event, 'delay'):
                 # Deprecated since 1.4.0
-                self._raise_event(MetaEvent('delayed event sent', event=event))
+                self._notify('delayed event sent', event=event)
         elif isinstance(event, MetaEvent):
-            for listener in self._listeners:
+            for listener in self._listeners_for(event.name):
                 listener(event)
         else:
             raise ValueError('Only InternalEvent and MetaEvent can be sent by a statechart, not {}'.format(type(event)))
 
+    def _listeners_for(self, name: str) -> List[Callable[[MetaEvent], Any]]:
+        """
+        Return the listeners that subscribed to meta-events having given name,
+        in the order they were attached.
+
+        :param name: name of a meta-event.
+        :return: a (possibly empty) list of listeners.
+        """
+        try:
+            return self._dispatch[name]
+        except KeyError:
+            listeners = [
+                listener for listener, names in zip(self._listeners, self._listener_names)
+                if names is None or name in names
+            ]
+            return self._dispatch.setdefault(name, listeners)
+
+    def _notify(self, name: str, **kwargs) -> None:
+        """
+        Create and raise a meta-event, unless no listener subscribed to it.
+
+        :param name: name of the meta-event.
+        :param kwargs: additional parameters of the meta-event.
+        """
+        listeners = self._listeners_for(name)
+        if len(listeners) > 0:
+            event = MetaEvent(name, **kwargs)
+            for listener in listeners:
+                listener(event)
+
     def _select_event(self, *, consume: bool=False) -> Optional[Event]:
         """
         Return the next event to process.
@@ -354,57 +710,107 @@ class Interpreter:
         :param consume: Indicates whether event should be consumed, default to False.
         :return: An instance of Event or None if no event is available
         """
-        for queue in cast(Tuple[List[Tuple[float, Event]]], (self._internal_queue, self._external_queue)):
+        for queue in (self._internal_queue, self._external_queue):
             if len(queue) > 0:
-                time, event = queue[0]
+                time, event = queue.first()
                 if time <= self.time:
                     if consume:
-                        queue.pop(0)
+                        queue.pop()
                     return event
         return None
 
-    def _select_transitions(self, event: Optional[Event], states: Iterable[str], *,
-                            eventless_first=True, inner_first=True) -> List[Transition]:
+    def _check_statechart_version(self) -> None:
         """
-        Select and return the transitions that are triggered, based on given event
-        (or None if no event can be consumed) and given list of states.
+        Clear the data that were computed from the structure of the statechart (e.g. selection plans),
+        if the statechart has been modified since they were computed.
+        """
+        self._statechart._check_attributes()
+        if self._statechart_version != self._statechart._version:
+            self._statechart_version = self._statechart._version
+            self._selection_plans.clear()
+            self._preorder = {}
+            self._scope_depths = {}
+            self._unstable_states = {}
+            self._stabilization_candidates = [(-depth, name) for depth, name in self._sorted_configuration]
+            heapq.heapify(self._stabilization_candidates)
+
+    # Maximal number of selection plans kept by each interpreter, see _selection_plan_for
+    _selection_plans_size = 1024
+
+    def _selection_plan_for(self, event_name: Optional[str], states: Iterable[str], *,
+                            eventless_first=True, inner_first=True) -> Tuple:
+        """
+        Return the selection plan for given event name and states, w.r.t. given semantics.
 
-        By default, this function prioritizes eventless transitions and follows
-        inner-first/source state semantics.
+        Plans only depend on the structure of the statechart, and are kept in a bounded
+        LRU cache indexed by the set of states, the event name and the semantics.
+        The cache is cleared each time the statechart is modified.
 
-        :param event: event to consider, possibly None.
+        :param event_name: name of the event to consider, possibly None.
         :param states: state names to consider.
         :param eventless_first: True to prioritize eventless transitions.
         :param inner_first: True to follow inner-first/source state semantics.
-        :return: list of triggered transitions.
+        :return: a selection plan, see *_compile_selection_plan*.
+        """
+        self._check_statechart_version()
+
+        states = self.configuration_key if states is self._configuration else frozenset(states)
+        key = (states, event_name, eventless_first, inner_first)
+
+        try:
+            plan = self._selection_plans[key]
+        except KeyError:
+            plan = self._compile_selection_plan(event_name, states, eventless_first=eventless_first, inner_first=inner_first)
+            self._selection_plans[key] = plan
+            while len(self._selection_plans) > self._selection_plans_size:
+                self._selection_plans.popitem(last=False)
+        else:
+            self._selection_plans.move_to_end(key)
+
+        return plan
+
+    def _compile_selection_plan(self, event_name: Optional[str], states: Iterable[str], *,
+                                eventless_first=True, inner_first=True) -> Tuple:
+        """
+        Compute the candidate transitions for given event name and states, in the order they
+        have to be considered by *_select_transitions*.
+
+        A plan is a tuple of (has_event, candidates) pairs, where eventless transitions come
+        first if *eventless_first* is set. Candidates are (source, priority_groups, ignored_states)
+        triples, ordered by source state depth (deepest first if *inner_first* is set) then by
+        source state name. Priority groups contain the transitions of the source state, grouped and
+        sorted by decreasing priority. Ignored states are the states that have to be ignored once
+        a transition has been selected for this source state.
+
+        :param event_name: name of the event to consider, possibly None.
+        :param states: state names to consider.
+        :param eventless_first: True to prioritize eventless transitions.
+        :param inner_first: True to follow inner-first/source state semantics.
+        :return: a selection plan.
         """
-        selected_transitions = []  # type: List[Transition]
         considered_transitions = []  # type: List[Transition]
         _state_depth_cache = dict()  # type: Dict[str, int]
 
         # Select triggerable (based on event) transitions for considered states
-        for transition in self._statechart.transitions:
-            if transition.source in states:
-                if transition.event is None or transition.event == getattr(event, 'name', None):
-                    # Compute order based on depth
-                    if transition.source not in _state_depth_cache:
-                        _state_depth_cache[transition.source] = self._statechart.depth_for(transition.source)
+        for state in states:
+            eventless_transitions = self._statechart._transitions_for(state, None)
+            event_transitions = self._statechart._transitions_for(state, event_name) if event_name is not None else []
 
-                    considered_transitions.append(transition)
+            if eventless_transitions or event_transitions:
+                # Compute order based on depth
+                _state_depth_cache[state] = self._statechart.depth_for(state)
 
-        # Which states should be selected to satisfy depth ordering?
+                considered_transitions.extend(eventless_transitions)
+                considered_transitions.extend(event_transitions)
+
+        # Which states should be ignored to satisfy depth ordering?
         ignored_state_selector = self._statechart.ancestors_for if inner_first else self._statechart.descendants_for
-        ignored_states = set()  # type: Set[str]
 
+        plan = []
         # Group and sort transitions based on the event
         eventless_first_order = lambda t: t.event is not None
         for has_event, transitions in sorted_groupby(considered_transitions, key=eventless_first_order, reverse=not eventless_first):
-            # If there are selected transitions (from previous group), ignore new ones
-            if len(selected_transitions) > 0:
-                break
-
-            # Event shouldn't be exposed to guards if we're processing eventless transition
-            exposed_event = event if has_event else None
+            candidates = []
 
             # Group and sort transitions based on the source state depth
             depth_order = lambda t: _state_depth_cache[t.source]
@@ -412,27 +818,66 @@ class Interpreter:
                 # Group and sort transitions based on the source state
                 state_order = lambda t: t.source  # we just want states to be grouped here
                 for source, transitions in sorted_groupby(transitions, key=state_order):
-                    # Do not considered ignored states
-                    if source in ignored_states:
-                        continue
-
-                    has_found_transitions = False
                     # Group and sort transitions based on their priority
                     priority_order = lambda t: t.priority
-                    for _, transitions in sorted_groupby(transitions, key=priority_order, reverse=True):
-                        for transition in transitions:
-                            if transition.guard is None or self._evaluator.evaluate_guard(transition, exposed_event):
-                                # Add transition to the list of selected ones
-                                selected_transitions.append(transition)
-                                has_found_transitions = True
-
-                        # Ignore ancestors/descendants w.r.t. inner-first/source state
-                        if has_found_transitions:
-                            for state in ignored_state_selector(source):
-                                ignored_states.add(state)
-                            # Also ignore current state, as we found transitions in a higher priority class
-                            ignored_states.add(source)
-                            break
+                    priority_groups = tuple(
+                        tuple(transitions) for _, transitions
+                        in sorted_groupby(transitions, key=priority_order, reverse=True)
+                    )
+                    ignored_states = frozenset(ignored_state_selector(source)).union([source])
+                    candidates.append((source, priority_groups, ignored_states))
+
+            plan.append((has_event, tuple(candidates)))
+
+        return tuple(plan)
+
+    def _select_transitions(self, event: Optional[Event], states: Iterable[str], *,
+                            eventless_first=True, inner_first=True) -> List[Transition]:
+        """
+        Select and return the transitions that are triggered, based on given event
+        (or None if no event can be consumed) and given list of states.
+
+        By default, this function prioritizes eventless transitions and follows
+        inner-first/source state semantics. Candidate transitions are obtained from a
+        selection plan (see *_compile_selection_plan*), only guards are evaluated here.
+
+        :param event: event to consider, possibly None.
+        :param states: state names to consider.
+        :param eventless_first: True to prioritize eventless transitions.
+        :param inner_first: True to follow inner-first/source state semantics.
+        :return: list of triggered transitions.
+        """
+        selected_transitions = []  # type: List[Transition]
+        ignored_states = set()  # type: Set[str]
+
+        plan = self._selection_plan_for(getattr(event, 'name', None), states,
+                                        eventless_first=eventless_first, inner_first=inner_first)
+
+        for has_event, candidates in plan:
+            # If there are selected transitions (from previous group), ignore new ones
+            if len(selected_transitions) > 0:
+                break
+
+            # Event shouldn't be exposed to guards if we're processing eventless transition
+            exposed_event = event if has_event else None
+
+            for source, priority_groups, ignored_by_source in candidates:
+                # Do not considered ignored states
+                if source in ignored_states:
+                    continue
+
+                has_found_transitions = False
+                for transitions in priority_groups:
+                    for transition in transitions:
+                        if transition.guard is None or self._evaluator.evaluate_guard(transition, exposed_event):
+                            # Add transition to the list of selected ones
+                            selected_transitions.append(transition)
+                            has_found_transitions = True
+
+                    # Ignore ancestors/descendants w.r.t. inner-first/source state, and current state
+                    if has_found_transitions:
+                        ignored_states.update(ignored_by_source)
+                        break
 
         return selected_transitions
 
@@ -449,43 +894,125 @@ class Interpreter:
         if len(transitions) > 1:
             # If more than one transition, we check (1) they are from separate regions and (2) they do not conflict
             # Two transitions conflict if one of them leaves the parallel state
-            for t1, t2 in combinations(transitions, 2):
-                # Check (1)
-                lca = cast(str, self._statechart.least_common_ancestor(t1.source, t2.source))
-                lca_state = self._statechart.state_for(lca)
-
-                # Their LCA must be an orthogonal state!
-                if not isinstance(lca_state, OrthogonalState):
-                    raise NonDeterminismError(
-                        'Non-determinist choice between transitions {t1} and {t2}'
-                        '\nConfiguration is {c}\nEvent is {e}\nTransitions are:{t}\n'
-                        .format(c=self.configuration, e=t1.event, t=transitions, t1=t1, t2=t2)
-                    )
-
-                # Check (2)
-                # This check must be done wrt. to LCA, as the combination of from_states could
-                # come from nested parallel regions!
-                for transition in [t1, t2]:
-                    last_before_lca = transition.source
-                    for state in self._statechart.ancestors_for(transition.source):
-                        if state == lca:
-                            break
-                        last_before_lca = state
-                    # Target must be a descendant (or self) of this state
-                    if (transition.target and
-                            (transition.target not in
-                             [last_before_lca] + self._statechart.descendants_for(last_before_lca))):
-                        raise ConflictingTransitionsError(
-                            'Conflicting transitions: {t1} and {t2}'
+            # Pairs of transitions are only considered to identify the culprits, see _are_independent
+            if not self._are_independent(transitions):
+                for t1, t2 in combinations(transitions, 2):
+                    # Check (1)
+                    lca = cast(str, self._statechart.least_common_ancestor(t1.source, t2.source))
+                    lca_state = self._statechart.state_for(lca)
+
+                    # Their LCA must be an orthogonal state!
+                    if not isinstance(lca_state, OrthogonalState):
+                        raise NonDeterminismError(
+                            'Non-determinist choice between transitions {t1} and {t2}'
                             '\nConfiguration is {c}\nEvent is {e}\nTransitions are:{t}\n'
                             .format(c=self.configuration, e=t1.event, t=transitions, t1=t1, t2=t2)
                         )
 
+                    # Check (2)
+                    # This check must be done wrt. to LCA, as the combination of from_states could
+                    # come from nested parallel regions!
+                    for transition in [t1, t2]:
+                        last_before_lca = transition.source
+                        for state in self._statechart.ancestors_for(transition.source):
+                            if state == lca:
+                                break
+                            last_before_lca = state
+                        # Target must be a descendant (or self) of this state
+                        if (transition.target and
+                                (transition.target not in
+                                 [last_before_lca] + self._statechart.descendants_for(last_before_lca))):
+                            raise ConflictingTransitionsError(
+                                'Conflicting transitions: {t1} and {t2}'
+                                '\nConfiguration is {c}\nEvent is {e}\nTransitions are:{t}\n'
+                                .format(c=self.configuration, e=t1.event, t=transitions, t1=t1, t2=t2)
+                            )
+
             # Define an arbitrary order based on the depth and the name of source states.
             transitions = sorted(transitions, key=lambda t: (-self._statechart.depth_for(t.source), t.source))
 
         return transitions
 
+    def _are_independent(self, transitions: List[Transition]) -> bool:
+        """
+        Return True if given transitions neither lead to non-determinism nor conflict, as defined
+        in *_sort_transitions*. This is done without considering every pair of transitions.
+
+        The deepest common ancestor of two source states is the deepest common ancestor (or self) of
+        their parents. Once transitions are sorted according to a preorder traversal of their
+        source states' parents, the set of common ancestors of all pairs of transitions is the set of
+        common ancestors of consecutive transitions, and the deepest common ancestor a transition has
+        with any other one is the one it has with one of its neighbours. A transition conflicts with
+        another one iff its target is not a descendant of the child of their common ancestor,
+        i.e., iff the depth of the deepest common ancestor (or self) of its source and target is not
+        greater than the depth of their common ancestor. This depth is computed once per transition.
+
+        :param transitions: a list of *Transition* instances
+        :return: True if transitions are independent, False if they are not or if this cannot be decided.
+        """
+        self._check_statechart_version()
+        statechart = self._statechart
+
+        if not self._preorder:
+            stack = [cast(str, statechart.root)]
+            while stack:
+                name = stack.pop()
+                self._preorder[name] = len(self._preorder)
+                stack.extend(reversed(statechart._children[name]))
+
+        parents = []
+        for transition in transitions:
+            parent = statechart._parent.get(transition.source)
+            if parent is None:
+                return False
+            parents.append((self._preorder[parent], parent, transition))
+        parents.sort(key=lambda p: p[0])
+
+        # Depth of the deepest common ancestor of each transition with its neighbours
+        lca_depths = [0] * len(parents)
+        for i in range(len(parents) - 1):
+            first, second = parents[i][1], parents[i + 1][1]
+            if first == second or first in statechart._ancestors(second):
+                lca = first
+            else:
+                lca = cast(str, statechart.least_common_ancestor(first, second))
+            if not isinstance(statechart.state_for(lca), OrthogonalState):
+                return False
+            depth = statechart.depth_for(lca)
+            lca_depths[i] = max(lca_depths[i], depth)
+            lca_depths[i + 1] = depth
+
+        for (_, _, transition), lca_depth in zip(parents, lca_depths):
+            scope_depth = self._scope_depth_for(transition)
+            if scope_depth is not None and scope_depth <= lca_depth:
+                return False
+
+        return True
+
+    def _scope_depth_for(self, transition: Transition) -> Optional[int]:
+        """
+        Return the depth of the deepest common ancestor (or self) of the source and the target of
+        given transition, or None if the transition is internal. Results are cached.
+
+        :param transition: a *Transition* instance
+        :return: a depth or None
+        """
+        try:
+            return self._scope_depths[id(transition)]
+        except KeyError:
+            pass
+
+        depth = None
+        if transition.target is not None:
+            source_ancestors = self._statechart._ancestors(transition.source)
+            for state in [transition.target] + self._statechart.ancestors_for(transition.target):
+                if state == transition.source or state in source_ancestors:
+                    depth = self._statechart.depth_for(state)
+                    break
+
+        self._scope_depths[id(transition)] = depth
+        return depth
+
     def _compute_steps(self) -> List[MicroStep]:
         """
         Compute and returns the next steps based on current configuration
@@ -586,9 +1113,13 @@ class Interpreter:
         :return: A *MicroStep* instance or *None* if this statechart can not be more stabilized
         """
         # Check if we are in a set of "stable" states
-        leaves_names = self._statechart.leaf_for(names)
-        leaves = sorted([self._statechart.state_for(name) for name in leaves_names],
-                        key=lambda s: (-self._statechart.depth_for(s.name), s.name))
+        if names is self._configuration:
+            leaf_name = self._next_unstable_leaf()
+            leaves = [] if leaf_name is None else [self._statechart.state_for(leaf_name)]
+        else:
+            leaves_names = self._statechart.leaf_for(names)
+            leaves = sorted([self._statechart.state_for(name) for name in leaves_names],
+                            key=lambda s: (-self._statechart.depth_for(s.name), s.name))
 
         for leaf in leaves:
             if isinstance(leaf, FinalState) and self._statechart.parent_for(leaf.name) == self._statechart.root:
@@ -604,13 +1135,73 @@ class Interpreter:
 
         return None
 
-    def _apply_step(self, step: MicroStep) -> MicroStep:
+    def _next_unstable_leaf(self) -> Optional[str]:
+        """
+        Return the first active leaf that is not stable, if any, according to the order
+        used by *_create_stabilization_step*.
+
+        Only the states that have been entered or whose children have been exited since this method
+        last returned None are considered, as the stability of other active leaves did not change.
+
+        :return: name of a state, or None
+        """
+        self._check_statechart_version()
+
+        candidates = self._stabilization_candidates
+        while len(candidates) > 0:
+            name = candidates[0][1]
+            if (name in self._configuration and self._is_unstable(name) and
+                    self._statechart._descendants_set(name).isdisjoint(self._configuration)):
+                return name
+            heapq.heappop(candidates)
+        return None
+
+    def _is_unstable(self, name: str) -> bool:
+        """
+        Return True if given state requires stabilization when it is an active leaf.
+        Results are cached.
+
+        :param name: name of a state
+        :return: True if given state is not stable
+        """
+        try:
+            return self._unstable_states[name]
+        except KeyError:
+            pass
+
+        state = self._statechart.state_for(name)
+        unstable = (
+            (isinstance(state, FinalState) and self._statechart.parent_for(name) == self._statechart.root) or
+            isinstance(state, (ShallowHistoryState, DeepHistoryState)) or
+            (isinstance(state, OrthogonalState) and len(self._statechart.children_for(name)) > 0) or
+            (isinstance(state, CompoundState) and state.initial is not None)
+        )
+        self._unstable_states[name] = unstable
+        return unstable
+
+    def _apply_step(self, step: MicroStep, *, record: bool=True) -> MicroStep:
         """
         Apply given *MicroStep* on this statechart
 
         :param step: *MicroStep* instance
+        :param record: set to False to return given step instead of a completed one
         :return: a new MicroStep, completed with sent events
         """
+        sent_events = self._execute_step(step)
+        if not record:
+            return step
+
+        return MicroStep(event=step.event, transition=step.transition,
+                         entered_states=step.entered_states, exited_states=step.exited_states,
+                         sent_events=sent_events)
+
+    def _execute_step(self, step: MicroStep) -> List[Event]:
+        """
+        Apply given *MicroStep* on this statechart, and return the events that were sent.
+
+        :param step: *MicroStep* instance
+        :return: list of sent events
+        """
         entered_states = list(map(self._statechart.state_for, step.entered_states))
         exited_states = list(map(self._statechart.state_for, step.exited_states))
 
@@ -640,13 +1231,13 @@ class Interpreter:
                         self._memory[child.name] = list(active)
 
             # Remove state from active configuration
-            self._configuration.remove(state.name)
+            self._remove_from_configuration(state.name)
 
             # Postconditions
             self._evaluate_contract_conditions(state, 'postconditions', step)
 
             # Notify properties
-            self._raise_event(MetaEvent('state exited', state=state.name))
+            self._notify('state exited', state=state.name)
 
         # Execute transition
         if step.transition:
@@ -661,12 +1252,12 @@ class Interpreter:
             self._evaluate_contract_conditions(step.transition, 'invariants', step)
 
             # Notify properties
-            self._raise_event(MetaEvent(
+            self._notify(
                 'transition processed',
                 source=step.transition.source,
                 target=step.transition.target,
                 event=step.event
-            ))
+            )
 
         # Enter states
         for state in entered_states:
@@ -677,30 +1268,69 @@ class Interpreter:
             sent_events.extend(self._evaluator.execute_on_entry(state))
 
             # Update configuration
-            self._configuration.add(state.name)
+            self._add_to_configuration(state.name)
 
             # Notify properties
-            self._raise_event(MetaEvent('state entered', state=state.name))
+            self._notify('state entered', state=state.name)
 
         # Send events
         for event in cast(Union[InternalEvent, MetaEvent], sent_events):
             self._raise_event(event)
 
-        return MicroStep(event=step.event, transition=step.transition,
-                         entered_states=step.entered_states, exited_states=step.exited_states,
-                         sent_events=sent_events)
+        return sent_events
+
+    def _add_to_configuration(self, name: str) -> None:
+        """
+        Add given state to the active configuration.
 
-    def _stabilize(self) -> List[MicroStep]:
+        :param name: name of the entered state
+        """
+        if name in self._configuration:
+            # An active state can be re-entered, e.g. by conflicting transitions in parallel states
+            return
+
+        self._configuration.add(name)
+        bisect.insort(self._sorted_configuration, (self._statechart.depth_for(name), name))
+        self._configuration_key = None
+        heapq.heappush(self._stabilization_candidates, (-self._statechart.depth_for(name), name))
+
+    def _remove_from_configuration(self, name: str) -> None:
+        """
+        Remove given state from the active configuration.
+
+        :param name: name of the exited state
+        """
+        self._configuration.remove(name)
+        item = (self._statechart.depth_for(name), name)
+        index = bisect.bisect_left(self._sorted_configuration, item)
+        if index < len(self._sorted_configuration) and self._sorted_configuration[index] == item:
+            del self._sorted_configuration[index]
+        else:
+            # The depth of the state changed since it was entered (e.g. the statechart was modified)
+            self._sorted_configuration = sorted(
+                (self._statechart.depth_for(state), state) for state in self._configuration
+            )
+        self._configuration_key = None
+
+        parent = self._statechart.parent_for(name)
+        if parent is not None:
+            heapq.heappush(self._stabilization_candidates, (-self._statechart.depth_for(parent), parent))
+
+    def _stabilize(self, *, record: bool=True) -> List[MicroStep]:
         """
         Compute, apply and return stabilization steps.
 
-        :return: A list of applied  *MicroStep* instances,
+        :param record: set to False to apply the steps without returning them
+        :return: A list of applied  *MicroStep* instances, empty if *record* is False
         """
         # Stabilization
-        steps = []
+        steps = []  # type: List[MicroStep]
         step = self._create_stabilization_step(self._configuration)
         while step is not None:
-            steps.append(self._apply_step(step))
+            if record:
+                steps.append(self._apply_step(step))
+            else:
+                self._apply_step(step, record=False)
             step = self._create_stabilization_step(self._configuration)
         return steps
 
@@ -718,6 +1348,14 @@ class Interpreter:
         if self._ignore_contract:
             return
 
+        policy = self._contract_policy
+        if policy is not None and len(getattr(obj, cond_type, [])) > 0 and not policy.check(obj, cond_type):
+            if cond_type == 'preconditions':
+                # The evaluator records the values for __old__ when preconditions are evaluated.
+                # Unsatisfied conditions are lazily computed, and are not even considered.
+                self._evaluator.evaluate_preconditions(obj, getattr(step, 'event', None))
+            return
+
         exception_klass = cast(Callable[..., Exception], {'preconditions': PreconditionError,
                                                           'postconditions': PostconditionError,
                                                           'invariants': InvariantError}[cond_type])
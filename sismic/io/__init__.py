@@ -1,7 +1,13 @@
-from .yaml import import_from_yaml, export_to_yaml
+from .yaml import import_from_yaml, export_to_yaml, set_yaml_cache
+from .json import import_from_json, export_to_json
+from .binary import import_from_binary, export_to_binary
 from .plantuml import export_to_plantuml
+from .cache import StatechartCache
 
 __all__ = [
     'import_from_yaml', 'export_to_yaml',
+    'import_from_json', 'export_to_json',
+    'import_from_binary', 'export_to_binary',
     'export_to_plantuml',
+    'StatechartCache', 'set_yaml_cache',
 ]
@@ -0,0 +1,38 @@
+import schema
+
+__all__ = ['SCHEMA']
+
+
+class SCHEMA:
+    contract = {schema.Or('before', 'after', 'always'): schema.Use(str)}
+
+    transition = {
+        schema.Optional('target'): schema.Use(str),
+        schema.Optional('event'): schema.Use(str),
+        schema.Optional('guard'): schema.Use(str),
+        schema.Optional('action'): schema.Use(str),
+        schema.Optional('contract'): [contract],
+        schema.Optional('priority'): schema.Or(schema.Use(int), 'high', 'low'),
+    }
+
+    state = dict()  # type: ignore
+    state.update({
+        'name': schema.Use(str),
+        schema.Optional('type'): schema.Or('final', 'shallow history', 'deep history'),
+        schema.Optional('on entry'): schema.Use(str),
+        schema.Optional('on exit'): schema.Use(str),
+        schema.Optional('transitions'): [transition],
+        schema.Optional('contract'): [contract],
+        schema.Optional('initial'): schema.Use(str),
+        schema.Optional('parallel states'): [state],
+        schema.Optional('states'): [state],
+    })
+
+    statechart = {
+        'statechart': {
+            'name': schema.Use(str),
+            schema.Optional('description'): schema.Use(str),
+            schema.Optional('preamble'): schema.Use(str),
+            'root state': state,
+        }
+    }
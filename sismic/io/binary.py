@@ -0,0 +1,242 @@
+import mmap
+import struct
+
+from itertools import accumulate
+from typing import Any, Dict, List, Optional
+
+from ..exceptions import StatechartError
+from ..model import (BasicState, CompoundState, DeepHistoryState, FinalState, OrthogonalState,
+                     ShallowHistoryState, Statechart, StatechartBuilder, StateMixin, Transition)
+
+__all__ = ['import_from_binary', 'export_to_binary']
+
+
+MAGIC = b'SISMIC\x00B'
+VERSION = 1
+
+# Magic number, version, and number of strings, of bytes of strings, of states, of transitions and of conditions
+_HEADER = struct.Struct('<8sIIIIII')
+# Name, description and preamble of the statechart
+_STATECHART = struct.Struct('<III')
+# Name, parent, kind, initial, on entry, on exit and memory of a state
+_STATE_FIELDS = 7
+# Source, target, event, guard, action and priority of a transition
+_TRANSITION_FIELDS = 6
+# Range of priorities, that are stored as signed 32-bit integers
+_PRIORITIES = range(-2 ** 31, 2 ** 31)
+# Owner, kind and code of a condition
+_CONDITION_FIELDS = 3
+
+# Kinds of states, in the order of their identifier
+_STATE_CLASSES = (BasicState, CompoundState, OrthogonalState, FinalState, ShallowHistoryState, DeepHistoryState)
+# First kind of history states
+_HISTORY = 4
+
+# Kinds of conditions, in the order of their identifier
+_CONDITIONS = ('preconditions', 'postconditions', 'invariants')
+
+
+def export_to_binary(statechart: Statechart, filepath: str=None) -> bytes:
+    """
+    Export given *Statechart* instance to a compact binary representation, that is returned by this
+    function. Automatically save the output to filepath, if provided.
+
+    Each string (e.g. a state name, an event name or a piece of code) is stored once, and is referred
+    to by its index. States are stored in a depth-first order, so that each state comes after its parent,
+    and refer to their parent by its index. Transitions are stored in their order in the statechart,
+    and refer to their source state by its index.
+
+    :param statechart: statechart to export
+    :param filepath: save output to given filepath, if provided
+    :return: the binary representation
+    :raise StatechartError: if the statechart cannot be represented (e.g. a priority is not a 32-bit integer)
+    """
+    strings = []  # type: List[str]
+    indexes = {}  # type: Dict[str, int]
+
+    def ref(value: Optional[str]) -> int:
+        # Index of given string, 0 being used for None
+        if value is None:
+            return 0
+        index = indexes.get(value, None)
+        if index is None:
+            strings.append(value)
+            index = indexes[value] = len(strings)
+        return index
+
+    header = _STATECHART.pack(ref(statechart.name), ref(statechart.description), ref(statechart.preamble))
+
+    # States, in a depth-first order
+    states = []  # type: List[StateMixin]
+    positions = {}  # type: Dict[str, int]
+    state_fields = []  # type: List[int]
+    names = [statechart.root] if statechart.root is not None else []
+    while names:
+        name = names.pop()
+        state = statechart.state_for(name)  # type: Any
+        parent = statechart.parent_for(name)
+
+        for kind, klass in enumerate(_STATE_CLASSES):
+            if isinstance(state, klass):
+                break
+        else:
+            raise StatechartError('Cannot export {}'.format(state))
+
+        positions[name] = len(states)
+        states.append(state)
+        state_fields.extend((
+            ref(name),
+            0 if parent is None else positions[parent] + 1,
+            kind,
+            ref(getattr(state, 'initial', None)),
+            ref(state.on_entry),
+            ref(state.on_exit),
+            ref(getattr(state, 'memory', None)),
+        ))
+        names.extend(reversed(statechart.children_for(name)))
+
+    # Transitions, in their order in the statechart
+    transitions = statechart.transitions
+    transition_fields = []  # type: List[int]
+    for transition in transitions:
+        if not isinstance(transition.priority, int) or transition.priority not in _PRIORITIES:
+            raise StatechartError('Cannot export {}: its priority must be an integer between {} and {}'.format(
+                transition, _PRIORITIES[0], _PRIORITIES[-1]))
+
+        transition_fields.extend((
+            positions[transition.source],
+            ref(transition.target),
+            ref(transition.event),
+            ref(transition.guard),
+            ref(transition.action),
+            transition.priority,
+        ))
+
+    # Contracts, their owner being either a state or a transition
+    condition_fields = []  # type: List[int]
+    for owner, element in enumerate(states + transitions):  # type: ignore
+        for kind, cond_type in enumerate(_CONDITIONS):
+            for condition in getattr(element, cond_type, []):
+                condition_fields.extend((owner, kind, ref(condition)))
+
+    encoded = [string.encode('utf-8') for string in strings]
+    lengths = [len(string) for string in strings]
+    blob = b''.join(encoded)
+
+    output = b''.join([
+        _HEADER.pack(MAGIC, VERSION, len(strings), len(blob), len(states), len(transitions),
+                     len(condition_fields) // _CONDITION_FIELDS),
+        header,
+        struct.pack('<{}I'.format(len(lengths)), *lengths),
+        blob,
+        struct.pack('<{}I'.format(len(state_fields)), *state_fields),
+        struct.pack('<' + 'IIIIIi' * len(transitions), *transition_fields),
+        struct.pack('<{}I'.format(len(condition_fields)), *condition_fields),
+    ])
+
+    if filepath:
+        with open(filepath, 'wb') as f:
+            f.write(output)
+
+    return output
+
+
+def import_from_binary(data: bytes=None, filepath: str=None, *, ignore_validation: bool=False) -> Statechart:
+    """
+    Import a statechart from a binary representation (first argument) or a binary file (filepath argument),
+    as produced by *export_to_binary*. Files are loaded using *mmap*.
+
+    Unless specified, the resulting statechart is validated using its *validate()* method.
+
+    :param data: A binary representation. If not provided, filepath argument has to be provided.
+    :param filepath: A path to a binary file.
+    :param ignore_validation: set to *True* to disable statechart validation.
+    :return: a *Statechart* instance
+    """
+    if not data and not filepath:
+        raise TypeError('A binary representation must be provided, either using first argument or filepath argument.')
+    elif data and filepath:
+        raise TypeError('Either provide first argument or filepath argument, not both.')
+
+    try:
+        if filepath:
+            with open(filepath, 'rb') as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as buffer:
+                sc = _load(buffer)
+        else:
+            sc = _load(data)  # type: ignore
+    except (struct.error, ValueError, IndexError) as e:
+        raise StatechartError('Unable to load given binary statechart') from e
+
+    if not ignore_validation:
+        sc.validate()
+    return sc
+
+
+def _load(buffer: Any) -> Statechart:
+    """
+    Build a statechart from given buffer.
+
+    :param buffer: an object supporting the buffer protocol, e.g. *bytes* or *mmap*
+    :return: a *Statechart* instance
+    """
+    magic, version, nb_strings, nb_bytes, nb_states, nb_transitions, nb_conditions = _HEADER.unpack_from(buffer, 0)
+    if magic != MAGIC:
+        raise ValueError('Not a binary statechart')
+    if version != VERSION:
+        raise ValueError('Unsupported version {}'.format(version))
+    offset = _HEADER.size
+
+    name, description, preamble = _STATECHART.unpack_from(buffer, offset)
+    offset += _STATECHART.size
+
+    # Strings are decoded at once, and sliced according to their lengths
+    lengths = struct.unpack_from('<{}I'.format(nb_strings), buffer, offset)
+    offset += 4 * nb_strings
+    text = bytes(buffer[offset:offset + nb_bytes]).decode('utf-8')
+    offset += nb_bytes
+
+    strings = [None]  # type: List[Optional[str]]
+    start = 0
+    for end in accumulate(lengths):
+        strings.append(text[start:end])
+        start = end
+    if start != len(text):
+        raise ValueError('Invalid strings')
+
+    state_fields = struct.unpack_from('<{}I'.format(nb_states * _STATE_FIELDS), buffer, offset)
+    offset += 4 * nb_states * _STATE_FIELDS
+    transition_fields = struct.unpack_from('<' + 'IIIIIi' * nb_transitions, buffer, offset)
+    offset += 4 * nb_transitions * _TRANSITION_FIELDS
+    condition_fields = struct.unpack_from('<{}I'.format(nb_conditions * _CONDITION_FIELDS), buffer, offset)
+
+    builder = StatechartBuilder(strings[name], strings[description], strings[preamble])  # type: ignore
+    elements = []  # type: List[Any]
+    names = []  # type: List[str]
+
+    # States come after their parent
+    fields = iter(state_fields)
+    for name, parent, kind, initial, on_entry, on_exit, memory in zip(*[fields] * _STATE_FIELDS):
+        name = strings[name]
+        klass = _STATE_CLASSES[kind]
+        if klass is CompoundState:
+            state = klass(name, initial=strings[initial], on_entry=strings[on_entry], on_exit=strings[on_exit])
+        elif kind >= _HISTORY:
+            state = klass(name, on_entry=strings[on_entry], on_exit=strings[on_exit], memory=strings[memory])
+        else:
+            state = klass(name, on_entry=strings[on_entry], on_exit=strings[on_exit])
+        builder.add_state(state, names[parent - 1] if parent else None)
+        elements.append(state)
+        names.append(name)
+
+    fields = iter(transition_fields)
+    for source, target, event, guard, action, priority in zip(*[fields] * _TRANSITION_FIELDS):
+        transition = Transition(names[source], strings[target], strings[event], strings[guard],
+                                strings[action], priority)
+        builder.add_transition(transition)
+        elements.append(transition)
+
+    fields = iter(condition_fields)
+    for owner, kind, code in zip(*[fields] * _CONDITION_FIELDS):
+        getattr(elements[owner], _CONDITIONS[kind]).append(strings[code])
+
+    return builder.build(frozen=False)
@@ -0,0 +1,153 @@
+import os
+
+from collections import OrderedDict
+from typing import Optional
+
+from .. import __version__
+from ..model import Statechart
+
+__all__ = ['StatechartCache']
+
+# hashlib, pickle and tempfile are only imported when they are needed, as a cache
+# is created as soon as sismic.io is imported.
+
+
+class StatechartCache:
+    """
+    A cache of imported statecharts, indexed by a hash of their textual representation.
+
+    Statecharts are stored in a pickled form, and each call to *get* returns a new, independent
+    copy of the cached statechart. Unpickling a statechart is much faster than parsing, validating
+    and building it again.
+
+    Statecharts are kept in memory, up to *maxsize* of them, the least recently used ones being
+    discarded first. If a *directory* is provided, statecharts are also stored on disk, so that they
+    can be shared by several processes. As the files of this directory are unpickled, it must not be
+    writable by untrusted users. Files are written atomically, and unreadable files are ignored.
+
+    The number of statecharts that were found in and missing from the cache are respectively available
+    through the *hits* and *misses* attributes.
+
+    :param maxsize: maximal number of statecharts to keep in memory.
+    :param directory: optional path to a directory in which statecharts are stored, created if needed.
+    """
+    def __init__(self, maxsize: int=128, directory: str=None) -> None:
+        if maxsize < 0:
+            raise ValueError('maxsize must be positive, not {}'.format(maxsize))
+
+        self.maxsize = maxsize
+        self.directory = directory
+        if directory is not None:
+            os.makedirs(directory, exist_ok=True)
+
+        self._entries = OrderedDict()  # type: OrderedDict[str, bytes]
+
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def key_for(text: str, *options) -> str:
+        """
+        Return a key for given textual representation of a statechart, and for given options
+        used to import it. The version of Sismic is part of the key.
+
+        :param text: textual representation of a statechart
+        :param options: options used to import the statechart
+        :return: a key
+        """
+        import hashlib
+
+        digest = hashlib.sha256('{}\0{!r}\0'.format(__version__, options).encode('utf-8'))
+        digest.update(text.encode('utf-8'))
+        return digest.hexdigest()
+
+    def get(self, key: str) -> Optional[Statechart]:
+        """
+        Return a copy of the statechart stored for given key, or None if there is none.
+
+        :param key: a key, see *key_for*
+        :return: a *Statechart* instance or None
+        """
+        data = self._entries.get(key, None)
+        if data is None:
+            data = self._read(key)
+            if data is not None:
+                self._store(key, data)
+        else:
+            self._entries.move_to_end(key)
+
+        statechart = None
+        if data is not None:
+            import pickle
+            try:
+                statechart = pickle.loads(data)
+            except Exception:
+                self._entries.pop(key, None)
+
+        if statechart is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return statechart
+
+    def put(self, key: str, statechart: Statechart) -> None:
+        """
+        Store given statechart for given key. Later changes to the statechart are not reflected
+        in the cache.
+
+        :param key: a key, see *key_for*
+        :param statechart: a *Statechart* instance
+        """
+        import pickle
+
+        data = pickle.dumps(statechart, pickle.HIGHEST_PROTOCOL)
+        self._store(key, data)
+        self._write(key, data)
+
+    def clear(self) -> None:
+        """
+        Remove the statecharts that are kept in memory, and reset the counters.
+        Files stored on disk are kept.
+        """
+        self._entries.clear()
+        self.hits = 0
+        self.misses = 0
+
+    def _store(self, key: str, data: bytes) -> None:
+        self._entries[key] = data
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.maxsize:
+            self._entries.popitem(last=False)
+
+    def _read(self, key: str) -> Optional[bytes]:
+        if self.directory is None:
+            return None
+        try:
+            with open(os.path.join(self.directory, key + '.pickle'), 'rb') as f:
+                return f.read()
+        except OSError:
+            return None
+
+    def _write(self, key: str, data: bytes) -> None:
+        if self.directory is None:
+            return
+
+        import tempfile
+
+        try:
+            fd, temp_path = tempfile.mkstemp(dir=self.directory, suffix='.tmp')
+            try:
+                with os.fdopen(fd, 'wb') as f:
+                    f.write(data)
+                os.replace(temp_path, os.path.join(self.directory, key + '.pickle'))
+            except BaseException:
+                os.remove(temp_path)
+                raise
+        except OSError:
+            pass
+
+    def __len__(self):
+        return len(self._entries)
+
+    def __repr__(self):
+        return '{}(hits={}, misses={})'.format(self.__class__.__name__, self.hits, self.misses)
@@ -5,7 +5,7 @@ from ..exceptions import StatechartError
 from ..model import (ActionStateMixin, BasicState, CompositeStateMixin,
                      CompoundState, DeepHistoryState, FinalState,
                      OrthogonalState, ShallowHistoryState, Statechart,
-                     StateMixin, Transition, TransitionStateMixin)
+                     StatechartBuilder, StateMixin, Transition, TransitionStateMixin)
 
 __all__ = ['import_from_dict', 'export_to_dict']
 
@@ -13,9 +13,9 @@ __all__ = ['import_from_dict', 'export_to_dict']
 def import_from_dict(data: Mapping[str, Any]) -> Statechart:
     data = data['statechart']
 
-    statechart = Statechart(name=data['name'],
-                            description=data.get('description', None),
-                            preamble=data.get('preamble', None))
+    builder = StatechartBuilder(name=data['name'],
+                                description=data.get('description', None),
+                                preamble=data.get('preamble', None))
 
     states = []  # (StateMixin instance, parent name)
     transitions = []  # Transition instances
@@ -52,13 +52,10 @@ def import_from_dict(data: Mapping[str, Any]) -> Statechart:
                 raise StatechartError('Unable to load given YAML') from e
             transitions.append(transition)
 
-    # Register on statechart
-    for state, parent in states:
-        statechart.add_state(state, parent)
-    for transition in transitions:
-        statechart.add_transition(transition)
-
-    return statechart
+    # Register on statechart, all at once
+    builder.add_states(states)
+    builder.add_transitions(transitions)
+    return builder.build(frozen=False)
 
 
 def _import_transition_from_dict(state_name: str, transition_d: Mapping[str, Any]) -> Transition:
@@ -0,0 +1,69 @@
+import json
+
+from typing import Iterable
+
+from ..exceptions import StatechartError
+from ..model import Statechart
+
+from .datadict import export_to_dict, import_from_dict
+from .yaml import _check_schema
+
+__all__ = ['import_from_json', 'export_to_json']
+
+
+def import_from_json(text: Iterable[str]=None, filepath: str=None, *, ignore_schema: bool=False, ignore_validation: bool=False) -> Statechart:
+    """
+    Import a statechart from a JSON representation (first argument) or a JSON file (filepath argument).
+
+    The JSON representation of a statechart has the same structure than its YAML representation,
+    see *import_from_yaml*. Unless specified, this structure is validated against the same schema
+    (see *sismic.io.SCHEMA*), and the resulting statechart is validated using its *validate()* method.
+
+    :param text: A JSON text. If not provided, filepath argument has to be provided.
+    :param filepath: A path to a JSON file.
+    :param ignore_schema: set to *True* to disable json validation.
+    :param ignore_validation: set to *True* to disable statechart validation.
+    :return: a *Statechart* instance
+    """
+    if not text and not filepath:
+        raise TypeError('A JSON must be provided, either using first argument or filepath argument.')
+    elif text and filepath:
+        raise TypeError('Either provide first argument or filepath argument, not both.')
+    elif filepath:
+        with open(filepath, 'r', encoding='utf-8') as f:
+            text = f.read()
+    elif hasattr(text, 'read'):
+        text = text.read()  # type: ignore
+
+    try:
+        data = json.loads(text)  # type: ignore
+    except ValueError as e:
+        raise StatechartError('Unable to load given JSON') from e
+
+    if not ignore_schema:
+        data = _check_schema(data, 'JSON')
+
+    sc = import_from_dict(data)
+
+    if not ignore_validation:
+        sc.validate()
+    return sc
+
+
+def export_to_json(statechart: Statechart, filepath: str=None, *, indent: int=None) -> str:
+    """
+    Export given *Statechart* instance to JSON. Its JSON representation is returned by this function.
+    Automatically save the output to filepath, if provided.
+
+    :param statechart: statechart to export
+    :param filepath: save output to given filepath, if provided
+    :param indent: optional indentation level, by default the output is compact
+    :return: A textual JSON representation
+    """
+    output = json.dumps(export_to_dict(statechart), indent=indent, ensure_ascii=False)
+
+    if filepath:
+        with open(filepath, 'w', encoding='utf-8') as f:
+            f.write(output)
+
+    return output
@@ -1,49 +1,166 @@
-from typing import Iterable
+import sys
 
-import ruamel.yaml as yaml
-import schema
+from typing import Any, Callable, Iterable, List, Optional, Tuple
 
 from ..exceptions import StatechartError
 from ..model import Statechart
 
+from .cache import StatechartCache
 from .datadict import export_to_dict, import_from_dict
 
-__all__ = ['import_from_yaml', 'export_to_yaml']
-
-
-class SCHEMA:
-    contract = {schema.Or('before', 'after', 'always'): schema.Use(str)}
-
-    transition = {
-        schema.Optional('target'): schema.Use(str),
-        schema.Optional('event'): schema.Use(str),
-        schema.Optional('guard'): schema.Use(str),
-        schema.Optional('action'): schema.Use(str),
-        schema.Optional('contract'): [contract],
-        schema.Optional('priority'): schema.Or(schema.Use(int), 'high', 'low'),
-    }
-
-    state = dict()  # type: ignore
-    state.update({
-        'name': schema.Use(str),
-        schema.Optional('type'): schema.Or('final', 'shallow history', 'deep history'),
-        schema.Optional('on entry'): schema.Use(str),
-        schema.Optional('on exit'): schema.Use(str),
-        schema.Optional('transitions'): [transition],
-        schema.Optional('contract'): [contract],
-        schema.Optional('initial'): schema.Use(str),
-        schema.Optional('parallel states'): [state],
-        schema.Optional('states'): [state],
-    })
-
-    statechart = {
-        'statechart': {
-            'name': schema.Use(str),
-            schema.Optional('description'): schema.Use(str),
-            schema.Optional('preamble'): schema.Use(str),
-            'root state': state,
-        }
-    }
+__all__ = ['import_from_yaml', 'export_to_yaml', 'set_yaml_cache']
+
+
+# ruamel.yaml and schema are only imported when they are needed, as they are slow to import.
+# SCHEMA is lazily imported as well, if the version of Python allows it.
+if sys.version_info >= (3, 7):
+    def __getattr__(name: str) -> Any:
+        if name == 'SCHEMA':
+            from ._schema import SCHEMA
+            return SCHEMA
+        raise AttributeError('module {!r} has no attribute {!r}'.format(__name__, name))
+else:
+    from ._schema import SCHEMA
+
+
+# Cache used by import_from_yaml, see set_yaml_cache
+_cache = StatechartCache()  # type: Optional[StatechartCache]
+
+
+def set_yaml_cache(cache: Optional[StatechartCache]) -> None:
+    """
+    Set the cache used by *import_from_yaml*. By default, an in-memory *StatechartCache*
+    is used. Provide a *StatechartCache* with a directory to share imported statecharts
+    between processes, or None to disable caching.
+
+    :param cache: a *StatechartCache* instance, or None
+    """
+    global _cache
+    _cache = cache
+
+
+# Keys allowed by SCHEMA, and the values allowed for some of them
+_CONTRACT_KEYS = frozenset(['before', 'after', 'always'])
+_TRANSITION_KEYS = frozenset(['target', 'event', 'guard', 'action', 'contract', 'priority'])
+_STATE_KEYS = frozenset(['name', 'type', 'on entry', 'on exit', 'transitions', 'contract', 'initial',
+                         'parallel states', 'states'])
+_STATECHART_KEYS = frozenset(['name', 'description', 'preamble', 'root state'])
+_STATE_TYPES = ('final', 'shallow history', 'deep history')
+_PRIORITIES = ('high', 'low')
+
+# Keys of a state whose value is converted to str
+_STATE_STR_KEYS = ('name', 'on entry', 'on exit', 'initial')
+_TRANSITION_STR_KEYS = ('target', 'event', 'guard', 'action')
+
+
+def _validate(data: Any) -> None:
+    """
+    Check that given data conform to *SCHEMA.statechart*, and convert their values the way
+    *SCHEMA.statechart* does. The document is walked once, and is only modified if it conforms
+    to the schema.
+
+    :param data: data structure of a statechart
+    :raise ValueError: if data do not conform to the schema
+    """
+    # (container, key) pairs whose value has to be converted, and the conversion
+    conversions = []  # type: List[Tuple[dict, str, Callable[[Any], Any]]]
+
+    def check_keys(obj, allowed, where):
+        if not isinstance(obj, dict):
+            raise ValueError('{} must be a mapping'.format(where))
+        for key in obj:
+            if key not in allowed:
+                raise ValueError('Unexpected key {!r} in {}'.format(key, where))
+
+    def check_str(obj, keys):
+        for key in keys:
+            if key in obj and type(obj[key]) is not str:
+                conversions.append((obj, key, str))
+
+    def check_contract(obj, where):
+        if not isinstance(obj, list):
+            raise ValueError('{} must be a list'.format(where))
+        for condition in obj:
+            check_keys(condition, _CONTRACT_KEYS, where)
+            if len(condition) == 0:
+                raise ValueError('Missing condition in {}'.format(where))
+            check_str(condition, condition.keys())
+
+    def check_transition(obj, where):
+        check_keys(obj, _TRANSITION_KEYS, where)
+        check_str(obj, _TRANSITION_STR_KEYS)
+        if 'contract' in obj:
+            check_contract(obj['contract'], where)
+        if 'priority' in obj:
+            priority = obj['priority']
+            try:
+                int(priority)
+            except Exception:
+                if priority not in _PRIORITIES:
+                    raise ValueError('Invalid priority {!r} in {}'.format(priority, where))
+            else:
+                if type(priority) is not int:
+                    conversions.append((obj, 'priority', int))
+
+    def check_state(obj, where):
+        check_keys(obj, _STATE_KEYS, where)
+        if 'name' not in obj:
+            raise ValueError('Missing name in {}'.format(where))
+        where = 'state {!r}'.format(obj['name'])
+        check_str(obj, _STATE_STR_KEYS)
+        if 'type' in obj and obj['type'] not in _STATE_TYPES:
+            raise ValueError('Invalid type {!r} in {}'.format(obj['type'], where))
+        if 'contract' in obj:
+            check_contract(obj['contract'], where)
+        if 'transitions' in obj:
+            if not isinstance(obj['transitions'], list):
+                raise ValueError('Transitions of {} must be a list'.format(where))
+            for transition in obj['transitions']:
+                check_transition(transition, where)
+        for key in ('states', 'parallel states'):
+            if key in obj:
+                if not isinstance(obj[key], list):
+                    raise ValueError('{} of {} must be a list'.format(key.capitalize(), where))
+                for child in obj[key]:
+                    check_state(child, where)
+
+    check_keys(data, ('statechart',), 'document')
+    if 'statechart' not in data:
+        raise ValueError('Missing statechart in document')
+    statechart = data['statechart']
+    check_keys(statechart, _STATECHART_KEYS, 'statechart')
+    for key in ('name', 'root state'):
+        if key not in statechart:
+            raise ValueError('Missing {} in statechart'.format(key))
+    check_str(statechart, ('name', 'description', 'preamble'))
+    check_state(statechart['root state'], 'statechart')
+
+    for obj, key, conversion in conversions:
+        obj[key] = conversion(obj[key])
+
+
+def _check_schema(data: Any, format_name: str) -> Any:
+    """
+    Validate given data structure against *SCHEMA.statechart*, using *_validate*.
+    If it fails, *schema* is used to report the error.
+
+    :param data: data structure of a statechart
+    :param format_name: name of the format the data structure comes from, used in error messages
+    :return: the validated data structure
+    :raise StatechartError: if data do not conform to the schema
+    """
+    try:
+        _validate(data)
+    except ValueError:
+        import schema
+        from ._schema import SCHEMA
+
+        # Rely on schema to report the error, and in case the data are valid after all
+        try:
+            data = schema.Schema(SCHEMA.statechart).validate(data)
+        except schema.SchemaError as e:
+            raise StatechartError('{} validation failed'.format(format_name)) from e
+    return data
 
 
 def import_from_yaml(text: Iterable[str]=None, filepath: str=None, *, ignore_schema: bool=False, ignore_validation: bool=False) -> Statechart:
@@ -53,6 +170,9 @@ def import_from_yaml(text: Iterable[str]=None, filepath: str=None, *, ignore_sch
     Unless specified, the structure contained in the YAML is validated against a predefined
     schema (see *sismic.io.SCHEMA*), and the resulting statechart is validated using its *validate()* method.
 
+    Imported statecharts are cached (see *set_yaml_cache*): importing the same YAML again returns
+    a copy of the cached statechart, without parsing and validating the YAML again.
+
     :param text: A YAML text. If not provided, filepath argument has to be provided.
     :param filepath: A path to a YAML file.
     :param ignore_schema: set to *True* to disable yaml validation.
@@ -66,6 +186,17 @@ def import_from_yaml(text: Iterable[str]=None, filepath: str=None, *, ignore_sch
     elif filepath:
         with open(filepath, 'r') as f:
             text = f.read()
+    elif hasattr(text, 'read'):
+        text = text.read()  # type: ignore
+
+    key = None
+    if _cache is not None and isinstance(text, str):
+        key = _cache.key_for(text, ignore_schema, ignore_validation)
+        sc = _cache.get(key)
+        if sc is not None:
+            return sc
+
+    import ruamel.yaml as yaml
 
     if yaml.version_info < (0, 15):
         data = yaml.safe_load(text)  # type: dict
@@ -74,15 +205,15 @@ def import_from_yaml(text: Iterable[str]=None, filepath: str=None, *, ignore_sch
         data = yml.load(text)
 
     if not ignore_schema:
-        try:
-            data = schema.Schema(SCHEMA.statechart).validate(data)
-        except schema.SchemaError as e:
-            raise StatechartError('YAML validation failed') from e
+        data = _check_schema(data, 'YAML')
 
     sc = import_from_dict(data)
 
     if not ignore_validation:
         sc.validate()
+
+    if key is not None:
+        _cache.put(key, sc)  # type: ignore
     return sc
 
 
@@ -95,6 +226,8 @@ def export_to_yaml(statechart: Statechart, filepath: str=None) -> str:
     :param filepath: save output to given filepath, if provided
     :return: A textual YAML representation
     """
+    import ruamel.yaml as yaml
+
     output = yaml.dump(export_to_dict(statechart, ordered=False),
                        width=1000, default_flow_style=False)
 
@@ -1,4 +1,5 @@
 from .elements import *
 from .statechart import *
+from .builder import *
 from .events import *
 from .steps import *
\ No newline at end of file
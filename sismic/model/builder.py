@@ -0,0 +1,134 @@
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from ..exceptions import StatechartError
+
+from .elements import CompoundState, StateMixin, Transition, _register
+from .statechart import Statechart, _check_state_name, _check_state_parent, _check_transition
+
+__all__ = ['StatechartBuilder']
+
+
+class StatechartBuilder:
+    """
+    Build a statechart from states and transitions that are provided in bulk.
+
+    Contrary to *Statechart.add_state* and *Statechart.add_transition*, nothing is checked
+    when states and transitions are added, and states can be added in any order (e.g. before
+    their parent). Everything is checked at once when the statechart is built, and the same
+    *StatechartError* are raised.
+
+    States and transitions are not copied: they should not be shared by several statecharts.
+
+    :param name: Name of the statechart
+    :param description: optional description
+    :param preamble: code to execute to bootstrap the statechart
+    """
+
+    def __init__(self, name: str, description: str=None, preamble: str=None) -> None:
+        self.name = name
+        self.description = description
+        self.preamble = preamble
+
+        self._states = []  # type: List[Tuple[StateMixin, Optional[str]]]
+        self._transitions = []  # type: List[Transition]
+
+    def __repr__(self):
+        return '{}({!r}, states={}, transitions={})'.format(
+            self.__class__.__name__, self.name, len(self._states), len(self._transitions))
+
+    def add_state(self, state: StateMixin, parent: Optional[str]) -> None:
+        """
+        Add given state on given parent (its name), or as the root state if *parent* is None.
+
+        :param state: state to add
+        :param parent: name of its parent, or None
+        """
+        self._states.append((state, parent))
+
+    def add_states(self, states: Iterable[Tuple[StateMixin, Optional[str]]]) -> None:
+        """
+        Add given (state, parent) pairs, see *add_state*.
+
+        :param states: an iterable of (state, name of its parent) pairs
+        """
+        self._states.extend(states)
+
+    def add_transition(self, transition: Transition) -> None:
+        """
+        Add given transition.
+
+        :param transition: transition to add
+        """
+        self._transitions.append(transition)
+
+    def add_transitions(self, transitions: Iterable[Transition]) -> None:
+        """
+        Add given transitions, see *add_transition*.
+
+        :param transitions: an iterable of *Transition* instances
+        """
+        self._transitions.extend(transitions)
+
+    def build(self, *, frozen: bool=True) -> Statechart:
+        """
+        Check the states and transitions that were added, and return the corresponding statechart.
+
+        The children of a state, and the transitions, are ordered as they were added.
+        The checks done by *Statechart.add_state* and *Statechart.add_transition* are performed,
+        and all the states must be descendants of the root state. The statechart is not validated
+        (see *Statechart.validate*).
+
+        :param frozen: set to False to get a statechart that can be modified (see *Statechart.freeze*).
+        :return: a *Statechart* instance
+        :raise StatechartError:
+        """
+        statechart = Statechart(self.name, self.description, self.preamble)
+        states = statechart._states
+        parents = statechart._parent
+        children = statechart._children
+
+        # isinstance is slow for the abstract classes of states, and is done once per class
+        subclasses = {}  # type: Dict[Tuple[type, type], bool]
+
+        def is_a(obj: Any, klass: type) -> bool:
+            key = (type(obj), klass)
+            try:
+                return subclasses[key]
+            except KeyError:
+                return subclasses.setdefault(key, isinstance(obj, klass))
+
+        # Names are registered first, as states can be added before their parent
+        for state, parent in self._states:
+            _check_state_name(state, states)
+            states[state.name] = state
+            children[state.name] = []
+            if is_a(state, CompoundState):
+                _register(state, statechart._element_changes)
+
+        # Children are ordered as states were added
+        for state, parent in self._states:
+            parent = parent if parent else None
+            _check_state_parent(state, parent, states, statechart._root, is_a)
+
+            parents[state.name] = parent
+            children[parent].append(state.name)
+            if parent is None:
+                statechart._root = state.name
+
+        # States whose ancestors form a cycle are not reachable from the root
+        if len(states) > 0 and len(statechart._descendants(statechart._root)) + 1 != len(states):  # type: ignore
+            reachable = set(statechart._descendants(statechart._root)).union([statechart._root])  # type: ignore
+            unreachable = sorted(set(states).difference(reachable))
+            raise StatechartError('States {} are not descendants of the root state'.format(', '.join(unreachable)))
+
+        for transition in self._transitions:
+            _check_transition(transition, states, is_a)
+            _register(transition, statechart._element_changes)
+
+        statechart._transitions = list(self._transitions)
+        statechart._rebuild_transition_index()
+        statechart._invalidate_hierarchy()
+
+        if frozen:
+            statechart.freeze()
+        return statechart
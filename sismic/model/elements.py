@@ -1,11 +1,38 @@
 from abc import ABCMeta
-from typing import List
+from typing import List, Optional, Tuple
 
 __all__ = ['ContractMixin', 'StateMixin', 'ActionStateMixin', 'TransitionStateMixin', 'CompositeStateMixin',
            'HistoryStateMixin', 'BasicState', 'CompoundState', 'OrthogonalState', 'ShallowHistoryState',
            'DeepHistoryState', 'FinalState', 'Transition']
 
 
+class _ChangeCounter:
+    """
+    Count the changes made to the attributes that a statechart indexes (e.g. the event of a transition).
+    Each statechart has its own counter, that is registered on its transitions and compound states.
+    See Statechart._check_attributes.
+    """
+
+    def __init__(self) -> None:
+        self.changes = 0
+
+
+def _register(element, counter: _ChangeCounter) -> None:
+    # Counters are kept in a tuple, so that copies of an element do not share them
+    element._counters = element._counters + (counter,)
+
+
+def _unregister(element, counter: _ChangeCounter) -> None:
+    counters = list(element._counters)
+    counters.remove(counter)
+    element._counters = tuple(counters)
+
+
+def _attribute_changed(element) -> None:
+    for counter in element._counters:
+        counter.changes += 1
+
+
 class ContractMixin(metaclass=ABCMeta):
     """
     Mixin with a contract: preconditions, postconditions and invariants.
@@ -154,7 +181,20 @@ class CompoundState(ContractMixin, StateMixin, ActionStateMixin, TransitionState
         ActionStateMixin.__init__(self, on_entry, on_exit)
         TransitionStateMixin.__init__(self)
         CompositeStateMixin.__init__(self)
-        self.initial = initial
+        self._initial = initial
+        self._counters = ()  # type: Tuple[_ChangeCounter, ...]
+
+    @property
+    def initial(self) -> Optional[str]:
+        """
+        Name of the initial state
+        """
+        return self._initial
+
+    @initial.setter
+    def initial(self, value: Optional[str]) -> None:
+        self._initial = value
+        _attribute_changed(self)
 
     def __eq__(self, other):
         if isinstance(other, CompoundState):
@@ -302,15 +342,34 @@ class Transition(ContractMixin):
         ContractMixin.__init__(self)
         self._source = source
         self._target = target
-        self.event = event
+        self._event = event
         self.guard = guard
         self.action = action
-        self.priority = 0 if priority is None else priority
+        self._priority = 0 if priority is None else priority
+        self._counters = ()  # type: Tuple[_ChangeCounter, ...]
 
     @property
     def source(self):
         return self._source
 
+    @property
+    def event(self) -> Optional[str]:
+        return self._event
+
+    @event.setter
+    def event(self, value: Optional[str]) -> None:
+        self._event = value
+        _attribute_changed(self)
+
+    @property
+    def priority(self):
+        return self._priority
+
+    @priority.setter
+    def priority(self, value) -> None:
+        self._priority = value
+        _attribute_changed(self)
+
     @property
     def target(self):
         return self._target
@@ -1,8 +1,11 @@
+from collections import deque
 from copy import deepcopy
-from typing import Callable, Dict, Iterable, List, Optional, Union, cast
+from itertools import chain
+from typing import Callable, Dict, Iterable, List, Optional, Set, Tuple, Union, cast
 
 from ..exceptions import StatechartError
 
+from . import elements
 from .elements import (CompositeStateMixin, CompoundState, HistoryStateMixin,
                        StateMixin, Transition, TransitionStateMixin)
 
@@ -28,17 +31,33 @@ class Statechart:
         self._children = {}  # type: Dict[Optional[str], List[str]]
         self._transitions = []  # type: List[Transition]
 
+        # Transitions indexed by source state and event name, eventless ones being apart
+        self._transitions_by_event = {}  # type: Dict[Tuple[str, str], List[Transition]]
+        self._eventless_transitions = {}  # type: Dict[str, List[Transition]]
+
         self._children[None] = []  # Root state
+        self._root = None  # type: Optional[str]
+
+        # Cached hierarchy queries, lazily populated and cleared on structural changes
+        self._ancestors_cache = {}  # type: Dict[str, Tuple[str, ...]]
+        self._descendants_cache = {}  # type: Dict[str, Tuple[str, ...]]
+        self._descendants_set_cache = {}  # type: Dict[str, Set[str]]
+
+        # Incremented each time the hierarchy or the transitions change, see _invalidate_hierarchy
+        self._version = 0
+        # Changes made to the attributes of the elements of this statechart, see _check_attributes
+        self._element_changes = elements._ChangeCounter()
+        self._indexed_changes = 0
+
+        # A frozen statechart cannot be modified anymore, see freeze
+        self._frozen = False
 
     @property
     def root(self) -> Optional[str]:
         """
         Root state name
         """
-        for name, parent in self._parent.items():
-            if parent is None:
-                return name
-        return None
+        return self._root
 
     @property
     def preamble(self):
@@ -50,6 +69,68 @@ class Statechart:
     def __repr__(self):
         return '{}({!r})'.format(self.__class__.__name__, self.name)
 
+    @property
+    def frozen(self) -> bool:
+        """
+        True if the statechart is frozen, see *freeze*.
+        """
+        return self._frozen
+
+    def freeze(self) -> None:
+        """
+        Freeze the statechart: its states and transitions cannot be added, removed, renamed,
+        moved or rotated anymore, and an attempt to do so raises a *StatechartError*.
+        Hierarchy queries of all states are precomputed, as they will never be invalidated.
+
+        The states and transitions themselves (e.g. their guard, action or contract) are not frozen.
+        A frozen statechart cannot be unfrozen, but *copy.deepcopy* can be used to get a modifiable copy
+        (see *thaw*).
+        """
+        # States in breadth-first order
+        order = list(self._children[None])
+        for name in order:
+            order.extend(self._children[name])
+
+        for name in order:
+            parent = self._parent[name]
+            self._ancestors_cache[name] = () if parent is None else (parent,) + self._ancestors_cache[parent]
+
+        # Descendants are computed bottom-up, level by level to preserve their order
+        levels = {}  # type: Dict[str, List[List[str]]]
+        for name in reversed(order):
+            children = self._children[name]
+            merged = [list(children)] if children else []
+            for child in children:
+                for depth, level in enumerate(levels.pop(child), 1):
+                    if depth < len(merged):
+                        merged[depth].extend(level)
+                    else:
+                        merged.append(level)
+            levels[name] = merged
+
+            descendants = tuple(chain.from_iterable(merged))
+            self._descendants_cache[name] = descendants
+            self._descendants_set_cache[name] = set(descendants)
+
+        self._frozen = True
+
+    def thaw(self) -> 'Statechart':
+        """
+        Return a modifiable copy of this statechart.
+
+        :return: a *Statechart* instance that is not frozen
+        """
+        statechart = deepcopy(self)
+        statechart._frozen = False
+        return statechart
+
+    def _check_not_frozen(self) -> None:
+        """
+        Raise a *StatechartError* if the statechart is frozen.
+        """
+        if self._frozen:
+            raise StatechartError('{} is frozen and cannot be modified'.format(self))
+
     # ######### STATES ##########
 
     @property
@@ -108,12 +189,7 @@ class Statechart:
         """
         self.state_for(name)  # Raise StatechartError if state does not exist
 
-        ancestors = []
-        parent = self._parent[name]
-        while parent:
-            ancestors.append(parent)
-            parent = self._parent[parent]
-        return ancestors
+        return list(self._ancestors(name))
 
     def descendants_for(self, name: str) -> List[str]:
         """
@@ -126,14 +202,7 @@ class Statechart:
         """
         self.state_for(name)  # Raise StatechartError if state does not exist
 
-        descendants = []
-        states_to_consider = [name]
-        while states_to_consider:
-            name = states_to_consider.pop(0)
-            for child in self.children_for(name):
-                states_to_consider.append(child)
-                descendants.append(child)
-        return descendants
+        return list(self._descendants(name))
 
     def depth_for(self, name: str) -> int:
         """
@@ -145,8 +214,7 @@ class Statechart:
         """
         self.state_for(name)  # Raise StatechartError if state does not exist
 
-        ancestors = self.ancestors_for(name)
-        return len(ancestors) + 1
+        return len(self._ancestors(name)) + 1
 
     def least_common_ancestor(self, name_first: str, name_second: str) -> Optional[str]:
         """
@@ -161,12 +229,16 @@ class Statechart:
         self.state_for(name_first)  # Raise StatechartError if state does not exist
         self.state_for(name_second)
 
-        s1_anc = self.ancestors_for(name_first)
-        s2_anc = self.ancestors_for(name_second)
-        for state in s1_anc:
-            if state in s2_anc:
-                return state
-        return None
+        s1_anc = self._ancestors(name_first)
+        s2_anc = self._ancestors(name_second)
+
+        # Both lists end with the root state, common ancestors are their common suffix
+        lca = None
+        for s1, s2 in zip(reversed(s1_anc), reversed(s2_anc)):
+            if s1 != s2:
+                break
+            lca = s1
+        return lca
 
     def leaf_for(self, names: Iterable[str]) -> List[str]:
         """
@@ -183,13 +255,67 @@ class Statechart:
         names = set(names)  # Lookups in set are more efficient
 
         for name in names:
-            for descendant in self.descendants_for(name):  # Raise a StatechartError if it does not exist!
-                if descendant in names:
-                    break
-            else:  # no break occurs
+            self.state_for(name)  # Raise StatechartError if state does not exist
+            if self._descendants_set(name).isdisjoint(names):
                 leaves.append(name)
         return leaves
 
+    def _ancestors(self, name: str) -> Tuple[str, ...]:
+        """
+        Cached version of *ancestors_for*. No check is done on the existence of the state.
+
+        :param name: name of the state
+        :return: state's ancestors, ordered by decreasing depth
+        """
+        try:
+            return self._ancestors_cache[name]
+        except KeyError:
+            parent = self._parent[name]
+            ancestors = () if parent is None else (parent,) + self._ancestors(parent)
+            self._ancestors_cache[name] = ancestors
+            return ancestors
+
+    def _descendants(self, name: str) -> Tuple[str, ...]:
+        """
+        Cached version of *descendants_for*. No check is done on the existence of the state.
+
+        :param name: name of the state
+        :return: state's descendants, ordered by increasing depth
+        """
+        try:
+            return self._descendants_cache[name]
+        except KeyError:
+            descendants = []  # type: List[str]
+            states_to_consider = deque([name])
+            while states_to_consider:
+                for child in self._children[states_to_consider.popleft()]:
+                    states_to_consider.append(child)
+                    descendants.append(child)
+            self._descendants_cache[name] = tuple(descendants)
+            return self._descendants_cache[name]
+
+    def _descendants_set(self, name: str) -> Set[str]:
+        """
+        Return the (cached) set of descendants of given state. No check is done on the existence of the state.
+        The returned set should not be modified.
+
+        :param name: name of the state
+        :return: state's descendants
+        """
+        try:
+            return self._descendants_set_cache[name]
+        except KeyError:
+            return self._descendants_set_cache.setdefault(name, set(self._descendants(name)))
+
+    def _invalidate_hierarchy(self) -> None:
+        """
+        Clear cached hierarchy queries. Must be called each time the hierarchy changes.
+        """
+        self._ancestors_cache = {}
+        self._descendants_cache = {}
+        self._descendants_set_cache = {}
+        self._version += 1
+
     # ######### TRANSITIONS ##########
 
     @property
@@ -199,6 +325,60 @@ class Statechart:
         """
         return list(self._transitions)
 
+    def _transitions_for(self, source: str, event: Optional[str]) -> List[Transition]:
+        """
+        Return the transitions whose source is given state and that can be triggered by given
+        event name, or the eventless ones if *event* is None. Transitions are returned in the
+        order they were added to the statechart.
+
+        This lookup relies on an index and does not check that given state exists.
+        The returned list should not be modified.
+
+        :param source: name of source state
+        :param event: name of the event, or None
+        :return: a list of *Transition* instances
+        """
+        self._check_attributes()
+        if event is None:
+            return self._eventless_transitions.get(source, [])
+        else:
+            return self._transitions_by_event.get((source, event), [])
+
+    def _check_attributes(self) -> None:
+        """
+        Rebuild the indexes used by *_transitions_for*, and increment the version of this statechart,
+        if the event or the priority of a transition, or the initial state of a compound state, changed
+        since the last call.
+        """
+        if self._indexed_changes != self._element_changes.changes:
+            self._indexed_changes = self._element_changes.changes
+            self._rebuild_transition_index()
+
+    def _index_transition(self, transition: Transition) -> None:
+        """
+        Register given transition in the indexes used by *_transitions_for*.
+
+        :param transition: transition to index
+        """
+        self._version += 1
+        if transition.event is None:
+            self._eventless_transitions.setdefault(transition.source, []).append(transition)
+        else:
+            self._transitions_by_event.setdefault((transition.source, transition.event), []).append(transition)
+
+    def _rebuild_transition_index(self) -> None:
+        """
+        Rebuild the indexes used by *_transitions_for* from the list of transitions.
+        """
+        by_event = self._transitions_by_event = {}  # type: Dict[Tuple[str, str], List[Transition]]
+        eventless = self._eventless_transitions = {}  # type: Dict[str, List[Transition]]
+        for transition in self._transitions:
+            if transition.event is None:
+                eventless.setdefault(transition._source, []).append(transition)
+            else:
+                by_event.setdefault((transition._source, transition.event), []).append(transition)
+        self._version += 1
+
     def add_transition(self, transition: Transition) -> None:
         """
         Register given transition and register it on the source state
@@ -206,21 +386,12 @@ class Statechart:
         :param transition: transition to add
         :raise StatechartError:
         """
-        # Check that source state is known
-        try:
-            from_state = self.state_for(transition.source)
-        except StatechartError as e:
-            raise StatechartError('Unknown source state for {}'.format(transition)) from e
-
-        # Check that source state is a TransactionStateMixin
-        if not isinstance(from_state, TransitionStateMixin):
-            raise StatechartError('Cannot add {} on {}'.format(transition, from_state))
-
-        # Check either internal OR target state is known
-        if transition.target is not None and transition.target not in self._states:
-            raise StatechartError('Unknown target state for {}'.format(transition))
+        self._check_not_frozen()
+        _check_transition(transition, self._states)
 
         self._transitions.append(transition)
+        self._index_transition(transition)
+        elements._register(transition, self._element_changes)
 
     def remove_transition(self, transition: Transition) -> None:
         """
@@ -229,11 +400,22 @@ class Statechart:
         :param transition: a *Transition* instance
         :raise StatechartError: if transition is not registered
         """
+        self._check_not_frozen()
+        self._check_attributes()
+
         try:
             self._transitions.remove(transition)
         except ValueError:
             raise StatechartError('Transition {} does not exist'.format(transition))
 
+        if transition.event is None:
+            bucket = self._eventless_transitions[transition.source]
+        else:
+            bucket = self._transitions_by_event[(transition.source, transition.event)]
+        bucket.remove(transition)
+        elements._unregister(transition, self._element_changes)
+        self._version += 1
+
     def rotate_transition(self, transition: Transition, new_source: str='', new_target: Optional[str]='') -> None:
         """
         Rotate given transition.
@@ -245,6 +427,8 @@ class Statechart:
         :param new_target: a state name or None
         :raise StatechartError: if given transition or a given state does not exist.
         """
+        self._check_not_frozen()
+
         # Check that either new_source or new_target is set
         if new_source == new_target == '':
             raise ValueError('You must at least specify the new source or new target')
@@ -269,6 +453,11 @@ class Statechart:
                 new_target_state = self.state_for(new_target)
                 transition._target = new_target_state.name
 
+        # Source may have changed, and transitions must be kept in order
+        if new_source != '':
+            self._rebuild_transition_index()
+        self._version += 1
+
     def transitions_from(self, source: str) -> List[Transition]:
         """
         Return the list of transitions whose source is given name.
@@ -354,38 +543,21 @@ class Statechart:
         :param parent: name of its parent, or None
         :raise StatechartError:
         """
-        # Check state has a name
-        if state.name is None:
-            raise StatechartError('State {} must have a name'.format(state))
-
-        # Check name unicity
-        if state.name in self._states.keys():
-            raise StatechartError('State {} already exists!'.format(state))
-
-        if not parent:
-            # Check root state
-            if self.root:
-                raise StatechartError('Root already defined, {} should declare an existing parent state'.format(state))
-        else:
-            parent_state = self.state_for(parent)
-
-            # Check that parent exists
-            if not parent_state:
-                raise StatechartError('Parent "{}" of {} does not exist!'.format(parent, state))
-
-            # Check that parent is a CompositeStateMixin.
-            if not isinstance(parent_state, CompositeStateMixin):
-                raise StatechartError('{} cannot be used as a parent for {}'.format(parent_state, state))
-
-            # If state is an HistoryState, its parent must be a CompoundState
-            if isinstance(state, HistoryStateMixin) and not isinstance(parent_state, CompoundState):
-                raise StatechartError('{} cannot be used as a parent for {}'.format(parent_state, state))
+        self._check_not_frozen()
+        _check_state_name(state, self._states)
+        _check_state_parent(state, parent, self._states, self._root)
 
         # Save state
         self._states[state.name] = state
         self._parent[state.name] = parent
         self._children[state.name] = []
         self._children[parent].append(state.name)
+        if isinstance(state, CompoundState):
+            elements._register(state, self._element_changes)
+
+        if not parent:
+            self._root = state.name
+        self._invalidate_hierarchy()
 
     def remove_state(self, name: str) -> None:
         """
@@ -398,6 +570,7 @@ class Statechart:
         :param name: name of a state
         :raise StatechartError:
         """
+        self._check_not_frozen()
         state = self.state_for(name)
 
         # Remove children
@@ -418,11 +591,17 @@ class Statechart:
 
         # Remove state
         self._states.pop(name)
+        if isinstance(state, CompoundState):
+            elements._unregister(state, self._element_changes)
         parent = self._parent.pop(name)
         self._children.pop(name)
 
         self._children[parent].remove(name)
 
+        if self._root == name:
+            self._root = None
+        self._invalidate_hierarchy()
+
     def rename_state(self, old_name: str, new_name: str) -> None:
         """
         Change state name, and adapt transitions, initial state, memory, etc.
@@ -430,6 +609,7 @@ class Statechart:
         :param old_name: old name of the state
         :param new_name: new name of the state
         """
+        self._check_not_frozen()
         if old_name == new_name:
             return
         if new_name in self._states:
@@ -475,6 +655,13 @@ class Statechart:
         # Rename state!
         state._name = new_name
 
+        if self._root == old_name:
+            self._root = new_name
+        self._invalidate_hierarchy()
+
+        # Sources of transitions may have changed
+        self._rebuild_transition_index()
+
     def move_state(self, name: str, new_parent: str) -> None:
         """
         Move given state (and its children) such that its new parent is *new_parent*.
@@ -486,6 +673,8 @@ class Statechart:
         :param name: name of the state to move
         :param new_parent: name of the new parent
         """
+        self._check_not_frozen()
+
         # Check that both states exist
         state = self.state_for(name)
         self.state_for(new_parent)
@@ -499,6 +688,7 @@ class Statechart:
         self._parent[name] = new_parent
         self._children[old_parent].remove(name)
         self._children.setdefault(new_parent, []).append(name)
+        self._invalidate_hierarchy()
 
         # Check memory property
         if isinstance(state, HistoryStateMixin):
@@ -535,15 +725,20 @@ class Statechart:
         :param replace: Name of the target state. Should refer to a StateMixin with no child.
         :param renaming_func: Optional callable to resolve conflicting names.
         """
+        self._check_not_frozen()
         if len(self.children_for(replace)) > 0:
             raise StatechartError('State {} cannot be replaced while it has children.'.format(replace))
 
-        statechart_copy = deepcopy(statechart)  # type: Statechart
+        statechart_copy = statechart.thaw()
 
         # Rename and copy states
         statechart_copy.rename_state(source, replace)
         source_name = replace  # For lisibility
+        if isinstance(self._states[replace], CompoundState):
+            elements._unregister(self._states[replace], self._element_changes)
         self._states[replace] = statechart_copy.state_for(source_name)
+        if isinstance(self._states[replace], CompoundState):
+            elements._register(self._states[replace], self._element_changes)
         for name in statechart_copy.descendants_for(source_name):
             new_name = renaming_func(name)
             # May raise a StatechartError if names collides in source statechart.
@@ -612,3 +807,76 @@ class Statechart:
         self._validate_historystate_memory()
 
         return True
+
+
+def _check_state_name(state: StateMixin, states: Dict[str, StateMixin]) -> None:
+    """
+    Check that given state has a name that is not used by given states.
+
+    :param state: state to add
+    :param states: existing states, indexed by their name
+    :raise StatechartError:
+    """
+    # Check state has a name
+    if state.name is None:
+        raise StatechartError('State {} must have a name'.format(state))
+
+    # Check name unicity
+    if state.name in states:
+        raise StatechartError('State {} already exists!'.format(state))
+
+
+def _check_state_parent(state: StateMixin, parent: Optional[str], states: Dict[str, StateMixin],
+                        root: Optional[str], is_a: Callable[[object, type], bool]=isinstance) -> None:
+    """
+    Check that given state can be added on given parent.
+
+    :param state: state to add
+    :param parent: name of its parent, or None for a root state
+    :param states: existing states, indexed by their name
+    :param root: name of the existing root state, or None
+    :param is_a: function used instead of *isinstance* to check the kind of states
+    :raise StatechartError:
+    """
+    if not parent:
+        # Check root state
+        if root:
+            raise StatechartError('Root already defined, {} should declare an existing parent state'.format(state))
+    else:
+        parent_state = states.get(parent, None)
+
+        # Check that parent exists
+        if not parent_state:
+            raise StatechartError('Parent "{}" of {} does not exist!'.format(parent, state))
+
+        # Check that parent is a CompositeStateMixin.
+        if not is_a(parent_state, CompositeStateMixin):
+            raise StatechartError('{} cannot be used as a parent for {}'.format(parent_state, state))
+
+        # If state is an HistoryState, its parent must be a CompoundState
+        if is_a(state, HistoryStateMixin) and not is_a(parent_state, CompoundState):
+            raise StatechartError('{} cannot be used as a parent for {}'.format(parent_state, state))
+
+
+def _check_transition(transition: Transition, states: Dict[str, StateMixin],
+                      is_a: Callable[[object, type], bool]=isinstance) -> None:
+    """
+    Check that given transition can be added among given states.
+
+    :param transition: transition to add
+    :param states: existing states, indexed by their name
+    :param is_a: function used instead of *isinstance* to check the kind of states
+    :raise StatechartError:
+    """
+    # Check that source state is known
+    from_state = states.get(transition.source, None)
+    if from_state is None:
+        raise StatechartError('Unknown source state for {}'.format(transition))
+
+    # Check that source state is a TransactionStateMixin
+    if not is_a(from_state, TransitionStateMixin):
+        raise StatechartError('Cannot add {} on {}'.format(transition, from_state))
+
+    # Check either internal OR target state is known
+    if transition.target is not None and transition.target not in states:
+        raise StatechartError('Unknown target state for {}'.format(transition))
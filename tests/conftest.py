@@ -94,6 +94,11 @@ def priority_statechart():
     return import_from_yaml(filepath='tests/yaml/priority.yaml')
 
 
+@pytest.fixture
+def timer_statechart():
+    return import_from_yaml(filepath='tests/yaml/timer.yaml')
+
+
 @pytest.fixture(params=['actions', 'composite', 'deep_history', 'final', 'infinite', 'internal', 'priority',
                         'nested_parallel', 'nondeterministic', 'parallel', 'simple', 'timer'])
 def example_from_tests(request):
@@ -67,6 +67,52 @@ def test_cli():
     ])
 
 
+class TestParallel:
+    @pytest.fixture
+    def features(self):
+        features = ['heating', 'cooking_human', 'lighting_human', 'safety_human']
+        return [os.path.join('docs', 'examples', 'microwave', f+'.feature') for f in features]
+
+    def test_jobs(self, microwave, features, capsys):
+        assert 0 == execute_bdd(
+            microwave.statechart,
+            features,
+            step_filepaths=[os.path.join('docs', 'examples', 'microwave', 'steps.py')],
+            jobs=2,
+        )
+
+        output = capsys.readouterr().out
+        assert output.count('scenarios passed') == 1
+        assert '4 features passed, 0 failed' in output
+
+    def test_jobs_with_failure(self, microwave, features, tmpdir, capsys):
+        feature = tmpdir.join('failure.feature')
+        feature.write('Feature: Failure\n'
+                      '  Scenario: Failure\n'
+                      '    When I send event door_opened\n'
+                      '    Then state doorOpened is not active\n')
+
+        assert 1 == execute_bdd(
+            microwave.statechart,
+            features + [str(feature)],
+            step_filepaths=[os.path.join('docs', 'examples', 'microwave', 'steps.py')],
+            jobs=2,
+        )
+
+        output = capsys.readouterr().out
+        assert '4 features passed, 1 failed' in output
+        assert 'Failing scenarios:' in output
+
+    def test_cli_jobs(self):
+        assert 0 == cli([
+            'docs/examples/microwave/microwave.yaml',
+            '--features', 'docs/examples/microwave/heating.feature', 'docs/examples/microwave/cooking_human.feature',
+            '--steps', 'docs/examples/microwave/steps.py',
+            '--properties', 'docs/examples/microwave/heating_on_property.yaml',
+            '--jobs', '2',
+        ])
+
+
 class TestSteps:
     @pytest.fixture
     def context(self, mocker):
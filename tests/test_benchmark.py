@@ -0,0 +1,99 @@
+import os
+import subprocess
+import sys
+import time
+
+import pytest
+
+import sismic
+
+from sismic.code import DummyEvaluator
+from sismic.interpreter import Interpreter, Event
+from sismic.model import Statechart, BasicState, CompoundState, OrthogonalState, Transition
+
+
+# These benchmarks check the behaviour of some critical parts of Sismic at scale.
+# Time bounds are very generous, and are only meant to detect quadratic behaviours.
+
+
+class TestEventQueueBenchmark:
+    N = 10 ** 5
+
+    @pytest.fixture()
+    def interpreter(self, simple_statechart):
+        interpreter = Interpreter(simple_statechart, evaluator_klass=DummyEvaluator)
+        interpreter.execute_once()
+        return interpreter
+
+    def test_pending_delayed_events(self, interpreter):
+        start = time.perf_counter()
+        for i in range(self.N):
+            interpreter.queue(Event('e', delay=(i * 7919) % self.N, i=i))
+        assert time.perf_counter() - start < 5
+
+        interpreter.clock.time = self.N
+        interpreter.execute_once()  # Update interpreter's time
+
+        start = time.perf_counter()
+        events = []
+        event = interpreter._select_event(consume=True)
+        while event is not None:
+            events.append(event)
+            event = interpreter._select_event(consume=True)
+        assert time.perf_counter() - start < 5
+
+        # One event has already been consumed by execute_once
+        assert len(events) == self.N - 1
+        delays = [e.delay for e in events]
+        assert delays == sorted(delays)
+
+
+class TestOrthogonalStatesBenchmark:
+    N = 500
+
+    @pytest.fixture()
+    def interpreter(self):
+        statechart = Statechart('wide')
+        statechart.add_state(OrthogonalState('root'), None)
+        for i in range(self.N):
+            statechart.add_state(CompoundState('r{}'.format(i), initial='a{}'.format(i)), 'root')
+            statechart.add_state(BasicState('a{}'.format(i)), 'r{}'.format(i))
+            statechart.add_state(BasicState('b{}'.format(i)), 'r{}'.format(i))
+            statechart.add_transition(Transition('a{}'.format(i), 'b{}'.format(i), event='go'))
+
+        interpreter = Interpreter(statechart, evaluator_klass=DummyEvaluator)
+        interpreter.execute_once()
+        return interpreter
+
+    def test_stabilization(self, interpreter):
+        interpreter = Interpreter(interpreter.statechart, evaluator_klass=DummyEvaluator)
+
+        start = time.perf_counter()
+        step = interpreter.execute_once()
+        assert time.perf_counter() - start < 5
+
+        assert len(step.steps) == self.N + 2
+        assert len(interpreter.configuration) == 2 * self.N + 1
+
+    def test_broadcast_event(self, interpreter):
+        start = time.perf_counter()
+        step = interpreter.queue('go').execute_once()
+        assert time.perf_counter() - start < 5
+
+        assert len(step.transitions) == self.N
+        assert 'b0' in interpreter.configuration
+
+
+@pytest.mark.skipif(sys.version_info < (3, 7), reason='Lazy imports rely on module __getattr__')
+@pytest.mark.parametrize('module', ['sismic.io', 'sismic.interpreter', 'sismic.bdd'])
+def test_lazy_imports(module):
+    # A new interpreter is needed, as these modules may have been imported by other tests
+    root = os.path.dirname(os.path.dirname(os.path.abspath(sismic.__file__)))
+    output = subprocess.run(
+        [sys.executable, '-c', 'import sys, {}; print("\\n".join(sys.modules))'.format(module)],
+        cwd=root, stdout=subprocess.PIPE, universal_newlines=True, check=True,
+    ).stdout
+    modules = set(output.splitlines())
+
+    assert module in modules
+    assert {'ruamel.yaml', 'schema', 'behave', 'tempfile'}.isdisjoint(modules)
@@ -0,0 +1,65 @@
+import pytest
+
+from sismic.checker import explore
+from sismic.exceptions import ConflictingTransitionsError, NonDeterminismError
+from sismic.io import import_from_yaml
+
+
+class TestExplore:
+    def test_history(self, history_statechart):
+        exploration = explore(history_statechart, processes=1)
+
+        assert exploration.complete
+        assert exploration.errors == []
+        assert exploration.deadlocks == []
+        assert exploration.unreachable_states == []
+        assert exploration.events == history_statechart.events_for()
+
+    def test_final(self, final_statechart):
+        exploration = explore(final_statechart, processes=1)
+
+        assert exploration.complete
+        assert exploration.errors == []
+        assert len(exploration.deadlocks) == 3
+        for configuration, memory in exploration.deadlocks:
+            assert len(configuration) > 0
+
+    def test_conflicting_transitions(self, parallel_statechart):
+        exploration = explore(parallel_statechart, processes=1)
+
+        assert any(isinstance(error, ConflictingTransitionsError) for _, _, error in exploration.errors)
+
+    def test_initialization_error(self, nondeterministic_statechart):
+        exploration = explore(nondeterministic_statechart, processes=1)
+
+        assert len(exploration.errors) == 1
+        state, event, error = exploration.errors[0]
+        assert state is None and event is None
+        assert isinstance(error, NonDeterminismError)
+        assert exploration.states == set()
+
+    def test_events(self, history_statechart):
+        exploration = explore(history_statechart, events=[], processes=1)
+
+        assert exploration.complete
+        assert len(exploration.states) == 1
+        assert exploration.depth == 1
+
+    def test_max_depth(self, history_statechart):
+        exploration = explore(history_statechart, max_depth=1, processes=1)
+
+        assert not exploration.complete
+        assert exploration.depth == 1
+        assert len(exploration.states) < len(explore(history_statechart, processes=1).states)
+
+    @pytest.mark.parametrize('name', ['history', 'deep_history', 'composite', 'nested_parallel'])
+    def test_processes(self, name):
+        statechart = import_from_yaml(filepath='tests/yaml/{}.yaml'.format(name))
+
+        sequential = explore(statechart, processes=1)
+        parallel = explore(statechart, processes=2)
+
+        assert parallel.states == sequential.states
+        assert parallel.entered_states == sequential.entered_states
+        assert set(parallel.deadlocks) == set(sequential.deadlocks)
+        assert parallel.depth == sequential.depth
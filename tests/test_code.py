@@ -1,9 +1,12 @@
 import pytest
 
+from functools import partial
+
 from sismic import code
 from sismic.code.python import FrozenContext
 from sismic.exceptions import CodeEvaluationError
-from sismic.interpreter import Event, InternalEvent, MetaEvent
+from sismic.interpreter import Event, Interpreter, InternalEvent, MetaEvent
+from sismic.model import BasicState, CompoundState, OrthogonalState, Statechart, Transition
 
 
 def test_dummy_evaluator(mocker):
@@ -110,3 +113,268 @@ class TestPythonEvaluator:
     @pytest.mark.xfail(reason='http://stackoverflow.com/questions/32894942/listcomp-unable-to-access-locals-defined-in-code-called-by-exec-if-nested-in-fun and possibly fixed with https://bugs.python.org/issue3692')
     def test_access_outer_scope(self, evaluator):
         evaluator._execute_code('d = [x for x in range(10) if x != a]', additional_context={'a': 1})
+
+
+def test_time_predicates(mocker):
+    evaluator = code.PythonEvaluator(mocker.MagicMock(name='interpreter'))
+
+    assert evaluator._time_predicates_for('x > 1') == []
+    assert evaluator._time_predicates_for('after(3) and not idle(2.5)') == [('after', 3), ('idle', 2.5)]
+    assert evaluator._time_predicates_for('after(x)') is None
+    assert evaluator._time_predicates_for('time > 3') is None
+    assert evaluator._time_predicates_for('f(after)') is None
+
+
+def test_context_providers():
+    time_provider = code.context.TimeContextProvider()
+    time_provider(MetaEvent('step started', time=2))
+    time_provider(MetaEvent('state entered', state='s'))
+    time_provider(MetaEvent('unknown'))
+    assert time_provider.time == 2
+    assert time_provider.active('s')
+    assert time_provider.after('s', 0) and not time_provider.after('s', 1)
+
+    event_provider = code.context.EventContextProvider()
+    event_provider.handlers['event sent'](MetaEvent('event sent', event=InternalEvent('e')))
+    assert event_provider.sent('e')
+    event_provider(MetaEvent('step started'))
+    assert not event_provider.sent('e')
+
+
+def test_copy_context():
+    items = [1]
+    source = {'x': 1, 'items': items, 'alias': items, 'code': code}
+    context = code.context._copy_context(source)
+
+    assert context == source
+    assert context['code'] is code
+    assert context['items'] == items and context['items'] is not items
+    assert context['alias'] is context['items']
+
+    items.append(2)
+    assert context['items'] == [1]
+
+
+def test_old_names():
+    assert code.python._old_names('x > 1') == frozenset()
+    assert code.python._old_names('x > __old__.x and __old__.y == y') == {'x', 'y'}
+    assert code.python._old_names('__old__["x"] == x') is None
+    assert code.python._old_names('len(__old__) > 0') is None
+    assert code.python._old_names('invalid code (') is None
+
+
+class TestOldMemory:
+    @pytest.fixture
+    def interpreter(self):
+        statechart = Statechart('old')
+        statechart.add_state(CompoundState('root', initial='s1'), None)
+        statechart.add_state(BasicState('s1'), 'root')
+        statechart.add_state(BasicState('s2'), 'root')
+        statechart.add_transition(Transition('s1', 's2', event='e', action='x = x + 1'))
+        statechart.add_transition(Transition('s2', 's1', event='e'))
+        statechart.state_for('s1').postconditions.append('x == __old__.x')
+        statechart.transitions_from('s1')[0].postconditions.append('x == __old__.x + 1')
+
+        return Interpreter(statechart, initial_context={'x': 1, 'items': list(range(100))})
+
+    def test_selected_names(self, interpreter):
+        interpreter.execute_once()
+
+        frozen_context = interpreter._evaluator._memory[id(interpreter.statechart.state_for('s1'))]
+        assert dict(frozen_context) == {'x': 1}
+
+    def test_unused_old(self, interpreter):
+        interpreter.statechart.state_for('s1').postconditions[:] = ['x > 0']
+        interpreter.execute_once()
+
+        assert interpreter._evaluator._memory == {}
+
+    def test_mapping_old(self, interpreter):
+        interpreter.statechart.state_for('s1').postconditions.append('"items" in __old__')
+        interpreter.execute_once()
+
+        frozen_context = interpreter._evaluator._memory[id(interpreter.statechart.state_for('s1'))]
+        assert set(frozen_context) == {'x', 'items'}
+
+    def test_cleared_memory(self, interpreter):
+        interpreter.execute_once()
+        interpreter.queue('e').execute_once()
+
+        # s1 was exited and the transition was processed
+        assert interpreter._evaluator._memory == {}
+        assert interpreter._evaluator._transition_memory is None
+        assert interpreter.context['x'] == 2
+
+        interpreter.queue('e', 'e').execute()
+        assert interpreter.context['x'] == 3
+
+
+def test_reusable_namespaces(mocker):
+    statechart = Statechart('namespaces')
+    statechart.add_state(OrthogonalState('root'), None)
+    statechart.add_state(BasicState('s1'), 'root')
+    statechart.add_state(BasicState('s2'), 'root')
+    statechart.add_transition(Transition('s1', 's1', event='e', guard='event.x == 1 and after(1)'))
+    statechart.state_for('s1').invariants.append('after(1)')
+    statechart.state_for('s2').invariants.append('not after(1)')
+    statechart.state_for('s2').preconditions.append('after(1)')
+
+    interpreter = Interpreter(statechart, ignore_contract=True)
+    interpreter.execute_once()
+    evaluator = interpreter._evaluator
+    evaluator._time_provider._time = 5
+    evaluator._time_provider._entry_time['s2'] = 10
+
+    guard_namespace, condition_namespace = evaluator._guard_namespace, evaluator._condition_namespace
+    spy = mocker.spy(evaluator, '_evaluate_code')
+
+    transition = statechart.transitions[0]
+    assert evaluator.evaluate_guard(transition, Event('e', x=1))
+    assert not evaluator.evaluate_guard(transition, Event('e', x=2))
+
+    # Interleaved evaluations rely on their own state
+    s1 = evaluator.evaluate_invariants(statechart.state_for('s1'))
+    s2 = evaluator.evaluate_invariants(statechart.state_for('s2'))
+    assert list(s2) == [] and list(s1) == []
+
+    # after is not exposed to preconditions
+    with pytest.raises(CodeEvaluationError):
+        list(evaluator.evaluate_preconditions(statechart.state_for('s2')))
+
+    # Conditions were not evaluated in new contexts
+    assert spy.call_count == 0
+    assert evaluator._guard_namespace is guard_namespace and evaluator._condition_namespace is condition_namespace
+
+
+def test_guard_dependencies():
+    dependencies = code.python._guard_dependencies
+
+    assert dependencies('x > 1') == (True, False)
+    assert dependencies('active("s") and after(2)') == (False, True)
+    assert dependencies('len(items) > x and idle(1)') == (True, True)
+    assert dependencies('1 < 2') == (False, False)
+    assert dependencies('time > 2') is None
+    assert dependencies('event is None') is None
+    assert dependencies('f(x)') is None
+    assert dependencies('items.pop()') is None
+    assert dependencies('invalid code (') is None
+
+
+class TestMemoizedGuards:
+    @pytest.fixture
+    def interpreter(self):
+        statechart = Statechart('memoized')
+        statechart.add_state(OrthogonalState('root'), None)
+        statechart.add_state(CompoundState('r1', initial='a1'), 'root')
+        statechart.add_state(BasicState('a1'), 'r1')
+        statechart.add_state(BasicState('b1'), 'r1')
+        statechart.add_state(CompoundState('r2', initial='a2'), 'root')
+        statechart.add_state(BasicState('a2'), 'r2')
+        statechart.add_state(BasicState('b2'), 'r2')
+        statechart.add_state(CompoundState('r3', initial='a3'), 'root')
+        statechart.add_state(BasicState('a3'), 'r3')
+        statechart.add_state(BasicState('b3'), 'r3')
+        statechart.add_transition(Transition('a1', 'b1', guard='x > 2'))
+        statechart.add_transition(Transition('a2', 'b2', guard='active("b1") or after(10)'))
+        statechart.add_transition(Transition('a3', 'b3', guard='time > 20'))
+        statechart.add_transition(Transition('a1', 'a1', event='inc', action='x = x + 1'))
+
+        evaluator_klass = partial(code.PythonEvaluator, memoize_guards=True)
+        interpreter = Interpreter(statechart, evaluator_klass=evaluator_klass, initial_context={'x': 0})
+        interpreter.execute()
+        return interpreter
+
+    def test_idle(self, interpreter, mocker):
+        spy = mocker.spy(interpreter._evaluator, '_evaluate_condition')
+
+        interpreter.execute_once()
+        guards = [call[0][0] for call in spy.call_args_list]
+        assert guards == ['time > 20']
+
+    def test_context(self, interpreter):
+        interpreter.queue('inc', 'inc').execute()
+        assert 'a1' in interpreter.configuration
+
+        interpreter.queue('inc').execute()
+        assert 'b1' in interpreter.configuration
+        assert 'b2' in interpreter.configuration
+
+    def test_time(self, interpreter):
+        interpreter.clock.time = 9
+        interpreter.execute()
+        assert 'a2' in interpreter.configuration
+
+        interpreter.clock.time = 10
+        interpreter.execute()
+        assert 'b2' in interpreter.configuration
+        assert 'a3' in interpreter.configuration
+
+        interpreter.clock.time = 21
+        interpreter.execute()
+        assert 'b3' in interpreter.configuration
+
+    def test_fork(self, interpreter):
+        fork = interpreter.fork()
+        fork.queue('inc', 'inc', 'inc').execute()
+
+        assert 'b1' in fork.configuration
+        assert 'a1' in interpreter.configuration
+
+    def test_restore(self, interpreter):
+        snapshot = interpreter._evaluator.snapshot()
+        snapshot['context']['x'] = 3
+        interpreter._evaluator.restore(snapshot)
+
+        interpreter.execute()
+        assert 'b1' in interpreter.configuration
+
+
+class TestBytecodeCache:
+    @pytest.fixture
+    def cache(self, tmpdir):
+        yield code.set_bytecode_cache(str(tmpdir))
+        code.set_bytecode_cache(None)
+
+    @pytest.fixture
+    def statechart(self):
+        statechart = Statechart('cached', preamble='x = 1')
+        statechart.add_state(CompoundState('root', initial='s1'), None)
+        statechart.add_state(BasicState('s1', on_entry='x += 1'), 'root')
+        statechart.add_state(BasicState('s2'), 'root')
+        statechart.add_transition(Transition('s1', 's2', guard='x > 1', action='y = 2'))
+        return statechart
+
+    def test_store(self, cache, statechart, tmpdir):
+        interpreter = Interpreter(statechart)
+        assert len(tmpdir.listdir()) == 1
+        assert cache.get('x > 1', 'eval') is not None
+        assert cache.get('x += 1', 'exec') is not None
+
+        interpreter.execute()
+        assert interpreter.configuration == ['root', 's2']
+        assert interpreter.context['y'] == 2
+
+    def test_load(self, cache, statechart, tmpdir, mocker):
+        Interpreter(statechart)
+
+        other = code.BytecodeCache(str(tmpdir))
+        mocker.patch.object(code.cache, 'compile', side_effect=AssertionError, create=True)
+        other.load([('x > 1', 'eval'), ('x += 1', 'exec'), ('x = 1', 'exec'), ('y = 2', 'exec')])
+        assert other.get('x > 1', 'eval') is not None
+        assert other.get('x = 2', 'exec') is None
+
+    def test_corrupted_file(self, cache, statechart, tmpdir):
+        Interpreter(statechart)
+        for path in tmpdir.listdir():
+            path.write_binary(b'corrupted')
+
+        other = code.BytecodeCache(str(tmpdir))
+        other.load([('x > 1', 'eval')])
+        assert other.get('x > 1', 'eval') is not None
+
+    def test_syntax_error(self, cache, statechart):
+        statechart.state_for('s2').on_entry = 'invalid code ('
+        interpreter = Interpreter(statechart)
+
+        with pytest.raises(SyntaxError):
+            interpreter.execute()
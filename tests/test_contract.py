@@ -2,8 +2,9 @@ import pytest
 
 from sismic.exceptions import (InvariantError, PostconditionError,
                                PreconditionError)
-from sismic.interpreter import Interpreter, Event
-from sismic.model import StateMixin, Transition
+from sismic.interpreter import ContractPolicy, Interpreter, Event
+from sismic.io import import_from_yaml
+from sismic.model import MacroStep, StateMixin, Transition
 
 
 def test_no_error(elevator):
@@ -43,6 +44,18 @@ def test_state_invariant(elevator):
     assert isinstance(e.value.obj, StateMixin)
 
 
+def test_state_invariant_fast(elevator):
+    elevator.statechart.state_for('movingUp').invariants.append('False')
+    elevator.queue('floorSelected', floor=4)
+
+    with pytest.raises(InvariantError) as e:
+        while elevator.execute_once_fast():
+            pass
+
+    assert isinstance(e.value.obj, StateMixin)
+    assert isinstance(e.value.step, MacroStep)
+
+
 def test_transition_precondition(elevator):
     transitions = elevator.statechart.transitions_from('floorSelecting')
     transitions[0].preconditions.append('False')
@@ -71,3 +84,99 @@ def test_do_not_raise(elevator):
     transitions[0].postconditions.append('False')
 
     elevator.queue('floorSelected', floor=4).execute()
+
+
+class TestContractPolicy:
+    @pytest.fixture()
+    def statechart(self):
+        return import_from_yaml(filepath='docs/examples/elevator/elevator_contract.yaml')
+
+    def run(self, statechart, policy):
+        interpreter = Interpreter(statechart, contract_policy=policy)
+        interpreter.queue('floorSelected', floor=4).execute()
+        interpreter.queue('floorSelected', floor=1).execute()
+        interpreter.clock.time += 20
+        interpreter.execute()
+        return interpreter
+
+    def test_default(self, statechart):
+        policy = ContractPolicy()
+        self.run(statechart, policy)
+
+        assert policy.checked > 0
+        assert policy.skipped == 0
+
+        policy.reset_counters()
+        assert policy.checked == policy.skipped == 0
+
+    def test_default_raises(self, statechart):
+        statechart.state_for('movingUp').invariants.append('False')
+
+        with pytest.raises(InvariantError):
+            self.run(statechart, ContractPolicy())
+
+    def test_states(self, statechart):
+        statechart.state_for('movingUp').invariants.append('False')
+        policy = ContractPolicy(states=['moving'], transitions=[])
+        self.run(statechart, policy)
+
+        assert policy.checked > 0
+        assert policy.skipped > 0
+
+    def test_transitions(self, statechart):
+        transition = statechart.transitions_from('floorSelecting')[0]
+        transition.postconditions.append('False')
+
+        with pytest.raises(PostconditionError):
+            self.run(statechart, ContractPolicy(states=[], transitions=[transition]))
+
+    def test_every(self, statechart):
+        statechart.state_for('movingUp').invariants.append('False')
+        policy = ContractPolicy(every=1000)
+        self.run(statechart, policy)
+
+        assert policy.checked > 0
+        assert policy.skipped > 0
+
+    def test_probability(self, statechart):
+        statechart.state_for('movingUp').invariants.append('False')
+        policy = ContractPolicy(probability=0)
+        self.run(statechart, policy)
+
+        assert policy.checked == 0
+        assert policy.skipped > 0
+
+    @pytest.mark.parametrize('seed', range(20))
+    def test_sampled_old(self, statechart, seed):
+        # Postconditions relying on __old__ must hold even if preconditions were skipped
+        policy = ContractPolicy(probability=0.5, seed=seed)
+        self.run(statechart, policy)
+
+        assert policy.checked > 0
+        assert policy.skipped > 0
+
+    def test_max_rate(self, statechart):
+        now = [0]
+        policy = ContractPolicy(max_rate=2, timer=lambda: now[0])
+        interpreter = self.run(statechart, policy)
+
+        assert policy.checked == 2
+
+        now[0] = 1
+        interpreter.queue('floorSelected', floor=4).execute()
+        assert policy.checked == 4
+
+    def test_fast(self, statechart):
+        statechart.state_for('movingUp').invariants.append('False')
+        policy = ContractPolicy(states=['moving'])
+        interpreter = Interpreter(statechart, contract_policy=policy)
+        interpreter.queue('floorSelected', floor=4)
+        while interpreter.execute_once_fast():
+            pass
+
+        assert policy.checked > 0
+
+    @pytest.mark.parametrize('parameters', [{'every': 0}, {'probability': 2}, {'max_rate': 0}])
+    def test_invalid_parameters(self, parameters):
+        with pytest.raises(ValueError):
+            ContractPolicy(**parameters)
@@ -1,3 +1,4 @@
+import json
 import pytest
 import pickle
 
@@ -5,10 +6,11 @@ from collections import Counter
 
 from sismic.exceptions import ExecutionError, NonDeterminismError, ConflictingTransitionsError
 from sismic.code import DummyEvaluator
-from sismic.interpreter import Interpreter, Event, InternalEvent
+from sismic.interpreter import ContractPolicy, Interpreter, Event, InternalEvent
 from sismic.helpers import coverage_from_trace, log_trace, run_in_background
-from sismic.model import Transition, MacroStep, MicroStep, MetaEvent
+from sismic.model import BasicState, CompoundState, Statechart, Transition, MacroStep, MicroStep, MetaEvent
 from sismic import testing
+from sismic.io import import_from_yaml
 
 
 class TestInterpreterWithSimple:
@@ -57,6 +59,25 @@ class TestInterpreterWithSimple:
         assert interpreter._select_event(consume=True) == Event('e7')
         assert interpreter._select_event(consume=True) == Event('e8')
 
+    def test_queue_order(self, interpreter):
+        interpreter.queue(Event('e1', delay=2), Event('e2', delay=1), Event('e3', delay=2), Event('e4', delay=1))
+        interpreter._queue_event(InternalEvent('e5', delay=2))
+        interpreter._queue_event(InternalEvent('e6', delay=1))
+
+        assert [e.name for _, e in interpreter._external_queue] == ['e2', 'e4', 'e1', 'e3']
+        assert [e.name for _, e in interpreter._internal_queue] == ['e6', 'e5']
+
+        assert interpreter._select_event(consume=True) is None
+        interpreter.clock.time = 2
+        interpreter._time = 2
+
+        names = []
+        event = interpreter._select_event(consume=True)
+        while event is not None:
+            names.append(event.name)
+            event = interpreter._select_event(consume=True)
+        assert names == ['e6', 'e5', 'e2', 'e4', 'e1', 'e3']
+
     def test_simple_configuration(self, interpreter):
         assert interpreter.execute_once() is None  # Should do nothing!
 
@@ -67,6 +88,55 @@ class TestInterpreterWithSimple:
         interpreter.execute_once()
         assert interpreter.configuration == ['root', 's3']
 
+    def test_configuration_key(self, interpreter):
+        key = interpreter.configuration_key
+        assert key == frozenset(['root', 's1'])
+        assert interpreter.configuration_key is key
+
+        interpreter.queue('goto s2').execute_once()
+        assert interpreter.configuration_key == frozenset(['root', 's2'])
+        assert {key: 1, interpreter.configuration_key: 2}[key] == 1
+
+    def test_selection_plans(self, interpreter):
+        interpreter.queue('goto s2').execute_once()
+        assert len(interpreter._selection_plans) == 1
+        plan = interpreter._selection_plan_for('goto s2', interpreter._configuration)
+        assert interpreter._selection_plan_for('goto s2', interpreter._configuration) is plan
+
+        # Bounded cache
+        interpreter._selection_plans_size = 1
+        interpreter._selection_plan_for('goto final', interpreter._configuration)
+        assert list(interpreter._selection_plans) == [(interpreter.configuration_key, 'goto final', True, True)]
+
+        # Plans are cleared when statechart changes
+        interpreter.statechart.remove_transition(interpreter.statechart.transitions_from('s2')[0])
+        interpreter._selection_plan_for(None, interpreter._configuration)
+        assert list(interpreter._selection_plans) == [(interpreter.configuration_key, None, True, True)]
+
+    def test_changed_event(self, interpreter):
+        transition = interpreter.statechart.transitions_from('s1')[0]
+        interpreter._selection_plan_for('goto s2', interpreter._configuration)
+
+        transition.event = 'next'
+        interpreter.queue('goto s2').execute_once()
+        assert interpreter.configuration == ['root', 's1']
+        interpreter.queue('next').execute_once()
+        assert interpreter.configuration == ['root', 's2']
+
+    def test_changed_initial(self):
+        statechart = Statechart('initial')
+        statechart.add_state(CompoundState('root', initial='s1'), None)
+        statechart.add_state(CompoundState('s1'), 'root')
+        statechart.add_state(BasicState('s2'), 's1')
+        statechart.add_transition(Transition('s1', 's1', event='reset'))
+        interpreter = Interpreter(statechart, evaluator_klass=DummyEvaluator)
+        interpreter.execute()
+        assert interpreter.configuration == ['root', 's1']
+
+        statechart.state_for('s1').initial = 's2'
+        interpreter.queue('reset').execute()
+        assert interpreter.configuration == ['root', 's1', 's2']
+
     def test_simple_entered(self, interpreter):
         interpreter.queue('goto s2')
         assert interpreter.execute_once().entered_states == ['s2']
@@ -292,6 +362,19 @@ class TestInterpreterWithInfinite:
         # x is incremented in s1.on_entry
         assert interpreter.context['x'] == 2
 
+    def test_iter_execute(self, interpreter):
+        steps = interpreter.iter_execute()
+        assert interpreter.configuration == ['root', 's1']
+        assert isinstance(next(steps), MacroStep)
+        assert interpreter.configuration == ['root', 's2']
+
+        assert len(list(interpreter.iter_execute(max_steps=2))) == 2
+        assert interpreter.context['x'] == 2
+
+        assert list(interpreter.iter_execute(max_time=0)) == []
+        assert len(list(interpreter.iter_execute(max_time=60))) > 0
+        assert interpreter.final
+
     def test_auto_stop(self, interpreter):
         interpreter.execute()
 
@@ -346,6 +429,21 @@ class TestInterpreterWithParallel:
         with pytest.raises(ConflictingTransitionsError):
             interpreter.execute_once()
 
+    def test_reenter_active_parallel_state(self, interpreter):
+        interpreter.queue('nextA', 'reset1', 'nextB').execute()
+        assert interpreter.configuration == ['root', 's1', 'p1', 'p2', 'b2', 'initial1']
+
+        # b2 -> c1 enters p1, that is still active
+        step = interpreter.queue('conflict2').execute_once()
+        assert step.entered_states == ['p1', 'c1']
+
+        assert interpreter.configuration == ['root', 's1', 'p1', 'c1', 'initial1']
+        assert interpreter.configuration_key == frozenset(interpreter.configuration)
+
+        # initial1 is exited, and p1 is kept once in the configuration
+        interpreter.queue('nextA').execute()
+        assert interpreter.configuration == ['root', 's1', 'p1', 'a1', 'c1']
+
 
 class TestInterpreterWithNestedParallel:
     common_states = ['root', 's1', 'p1', 'p2', 'r1', 'r2', 'r3', 'r4']
@@ -370,6 +468,26 @@ class TestInterpreterWithNestedParallel:
         assert step.entered_states == ['j1', 'j2', 'j3', 'j4']
         assert [t.source for t in step.transitions] == ['i1', 'i2', 'i3', 'i4']
 
+    def test_stabilization_steps(self, nested_parallel_statechart):
+        interpreter = Interpreter(nested_parallel_statechart, evaluator_klass=DummyEvaluator)
+        interpreter._apply_step(MicroStep(entered_states=['root']))
+
+        step = interpreter._create_stabilization_step(interpreter._configuration)
+        while step is not None:
+            assert repr(step) == repr(interpreter._create_stabilization_step(set(interpreter._configuration)))
+            interpreter._apply_step(step)
+            step = interpreter._create_stabilization_step(interpreter._configuration)
+
+        assert interpreter._create_stabilization_step(set(interpreter._configuration)) is None
+        assert interpreter.configuration == self.common_states + ['i1', 'i2', 'i3', 'i4']
+
+    def test_independent_transitions(self, interpreter):
+        transitions = [t for t in interpreter.statechart.transitions if t.source in ['i1', 'i2', 'i3', 'i4']]
+        assert len(transitions) == 4
+        assert interpreter._are_independent(transitions)
+        assert not interpreter._are_independent(transitions[:1] * 2)
+        assert set(interpreter._scope_depths) == {id(t) for t in transitions}
+
     def test_partial_parallel_order(self, interpreter):
         interpreter.queue('next', 'click')
         interpreter.execute_once()
@@ -443,6 +561,14 @@ class TestTransitionPriority:
         interpreter.execute_once()
         assert interpreter.configuration == ['root', 'b']
                 
+    def test_changed_priority(self, interpreter):
+        interpreter._selection_plan_for(None, interpreter._configuration)
+
+        transition = next(t for t in interpreter.statechart.transitions_from('a') if t.target == 'c')
+        transition.priority = 2
+        interpreter.execute_once()
+        assert interpreter.configuration == ['root', 'c']
+
     def test_eventless_first(self, interpreter):
         interpreter.execute_once()
         interpreter.queue('e')
@@ -601,6 +727,212 @@ class TestInterpreterBinding:
         assert i2._select_event(consume=False) is None
 
 
+class TestListeners:
+    @pytest.fixture()
+    def interpreter(self, simple_statechart):
+        return Interpreter(simple_statechart, evaluator_klass=DummyEvaluator)
+
+    def test_subscription(self, interpreter):
+        all_events, entered_events = [], []
+        interpreter.attach(all_events.append)
+        interpreter.attach(entered_events.append, names=['state entered'])
+
+        interpreter.execute_once()
+        assert len(all_events) > len(entered_events) > 0
+        assert [e.state for e in entered_events] == [e.state for e in all_events if e.name == 'state entered']
+
+        interpreter.detach(all_events.append)
+        interpreter._raise_event(MetaEvent('state entered', state='x'))
+        interpreter._raise_event(MetaEvent('test'))
+        assert entered_events[-1].state == 'x'
+        assert all_events[-1].name == 'step ended'
+
+    def test_no_listener(self, interpreter, mocker):
+        mocker.patch('sismic.interpreter.default.MetaEvent', side_effect=AssertionError)
+        assert interpreter._listeners_for('state entered') == []
+        interpreter.execute_once()
+
+    def test_order(self, interpreter):
+        events = []
+        interpreter.attach(lambda e: events.append(1), names=['step started'])
+        interpreter.attach(lambda e: events.append(2))
+        interpreter.attach(lambda e: events.append(3), names=['step started', 'step ended'])
+        interpreter._raise_event(MetaEvent('step started'))
+        assert events == [1, 2, 3]
+
+
+def test_execute_once_fast(microwave):
+    events = ['door_opened', 'item_placed', 'door_closed', 'timer_inc', 'timer_inc', 'cooking_start', 'timer_tick']
+    other = Interpreter(microwave.statechart)
+
+    for event in events:
+        microwave.queue(event)
+        other.queue(event)
+
+        while True:
+            step = microwave.execute_once()
+            assert other.execute_once_fast() == (step is not None)
+            assert other.configuration == microwave.configuration
+            if step is None:
+                break
+
+    assert other.context == microwave.context
+
+
+def test_execute_once_fast_without_macro_step(microwave, mocker):
+    mocker.patch('sismic.interpreter.default.MacroStep', side_effect=AssertionError)
+    microwave.queue('door_opened', 'item_placed', 'door_closed', 'timer_inc', 'cooking_start')
+
+    while microwave.execute_once_fast():
+        pass
+    assert 'cooking mode' in microwave.configuration
+
+
+class TestSnapshot:
+    def test_restore(self, microwave):
+        microwave.queue('door_opened', 'item_placed', 'door_closed', 'timer_inc', 'timer_inc', 'cooking_start')
+        microwave.queue('timer_tick', delay=5)
+        microwave.execute()
+
+        snapshot = json.loads(json.dumps(microwave.snapshot()))
+        restored = Interpreter.restore(microwave.statechart, snapshot)
+
+        assert restored.time == microwave.time
+        assert restored.configuration == microwave.configuration
+        assert restored.context == microwave.context
+        assert restored.snapshot() == snapshot
+
+        for interpreter in [microwave, restored]:
+            interpreter.clock.time = 10
+            interpreter.queue('timer_tick', 'door_opened')
+        assert [str(s) for s in restored.execute()] == [str(s) for s in microwave.execute()]
+        assert restored.configuration == microwave.configuration
+        assert restored.context == microwave.context
+
+    def test_restore_queues(self, simple_statechart):
+        interpreter = Interpreter(simple_statechart, evaluator_klass=DummyEvaluator)
+        interpreter._raise_event(InternalEvent('goto s2', x=1))
+        interpreter.queue('goto final', Event('goto s3', delay=1))
+        snapshot = interpreter.snapshot()
+        assert not snapshot['initialized']
+
+        restored = Interpreter.restore(simple_statechart, snapshot, evaluator_klass=DummyEvaluator)
+        assert list(restored._internal_queue) == list(interpreter._internal_queue)
+        assert list(restored._external_queue) == list(interpreter._external_queue)
+        assert isinstance(restored._select_event(), InternalEvent)
+
+        restored.execute()
+        interpreter.execute()
+        assert restored.configuration == interpreter.configuration
+
+    def test_restore_isolation(self, simple_statechart):
+        interpreter = Interpreter(simple_statechart, initial_context={'x': 1, 'items': [1]})
+        interpreter.queue('goto s2', items=[1])
+        snapshot = interpreter.snapshot()
+
+        # The snapshot is not affected by the execution
+        interpreter._evaluator._execute_code('x = 2\nitems.append(2)')
+        interpreter._external_queue.first()[1].data['items'].append(2)
+        assert snapshot['evaluator']['context']['x'] == 1
+        assert snapshot['evaluator']['context']['items'] == [1]
+        assert snapshot['external queue'][0][3]['items'] == [1]
+
+        # Restored interpreters are independent, from each other and from the snapshot
+        restored = Interpreter.restore(simple_statechart, snapshot)
+        other = Interpreter.restore(simple_statechart, snapshot)
+        assert restored.context['items'] is not snapshot['evaluator']['context']['items']
+        assert restored.context['items'] is not other.context['items']
+
+        restored._evaluator._execute_code('items.append(3)')
+        restored._external_queue.first()[1].data['items'].append(3)
+        assert other.context['items'] == [1]
+        assert other._external_queue.first()[1].data['items'] == [1]
+        assert snapshot['evaluator']['context']['items'] == [1]
+        assert interpreter.context['items'] == [1, 2]
+
+    def test_invalid_snapshot(self, simple_statechart, microwave):
+        snapshot = microwave.snapshot()
+        with pytest.raises(ValueError):
+            Interpreter.restore(simple_statechart, snapshot)
+
+        snapshot['version'] = 0
+        with pytest.raises(ValueError):
+            Interpreter.restore(microwave.statechart, snapshot)
+
+
+class TestFork:
+    def test_fork(self, microwave):
+        microwave.queue('door_opened', 'item_placed', 'door_closed', 'timer_inc').execute()
+        fork = microwave.fork()
+
+        assert fork.configuration == microwave.configuration
+        assert fork.context == microwave.context
+        assert fork.statechart is microwave.statechart
+
+        fork.queue('cooking_start').execute()
+        assert fork.configuration != microwave.configuration
+        assert 'cooking mode' in fork.configuration
+        assert microwave._select_event() is None
+
+        microwave.queue('cooking_start').execute()
+        assert fork.configuration == microwave.configuration
+
+    def test_fork_context(self, simple_statechart):
+        interpreter = Interpreter(simple_statechart, initial_context={'x': 1, 'items': [1]})
+        fork = interpreter.fork()
+        fork._evaluator._execute_code('x = 2\nitems.append(2)')
+
+        assert fork.context['x'] == 2 and fork.context['items'] == [1, 2]
+        assert interpreter.context['x'] == 1 and interpreter.context['items'] == [1]
+
+    def test_fork_shallow(self, simple_statechart):
+        interpreter = Interpreter(simple_statechart, initial_context={'x': 1, 'items': [1]})
+        fork = interpreter.fork(shallow=True)
+        assert fork.context['items'] is interpreter.context['items']
+
+        fork._evaluator._execute_code('x = 2\nitems.append(2)')
+        assert fork.context['x'] == 2 and interpreter.context['x'] == 1
+        assert interpreter.context['items'] == [1, 2]
+
+    def test_fork_isolation(self, simple_statechart):
+        policy = ContractPolicy(probability=0.5, seed=1)
+        interpreter = Interpreter(simple_statechart, initial_context={'items': [1]}, contract_policy=policy)
+        interpreter.execute_once()
+        fork = interpreter.fork()
+
+        # Changes made in place by the current interpreter are not visible in the fork
+        interpreter._evaluator._execute_code('items.append(2)')
+        assert fork.context['items'] == [1]
+
+        for name in ['_selection_plans', '_preorder', '_scope_depths', '_unstable_states', '_contract_policy']:
+            assert getattr(fork, name) is not getattr(interpreter, name)
+        assert fork._contract_policy.checked == policy.checked
+
+        interpreter.queue('goto s2').execute()
+        assert fork._selection_plans.keys() != interpreter._selection_plans.keys()
+        assert fork._contract_policy._random is not policy._random
+        assert fork._contract_policy._random.random() == policy._random.random()
+
+    def test_fork_bind(self, microwave):
+        other = Interpreter(microwave.statechart)
+        microwave.bind(other)
+        property_listener = microwave.bind_property_statechart(
+            import_from_yaml(filepath='docs/examples/microwave/heating_off_property.yaml'))
+
+        fork = microwave.fork()
+        assert fork._listeners == fork._evaluator_listeners
+
+        fork = microwave.fork(bind=True)
+        assert len(fork._listeners) == len(microwave._listeners)
+        forked_listener = fork._listeners[-1]
+        assert forked_listener._interpreter is not property_listener._interpreter
+        assert forked_listener._interpreter.clock.time == fork.time
+
+        fork.queue('door_opened').execute()
+        assert other._select_event() == Event('lamp_switch_on')
+        assert forked_listener._interpreter.configuration != []
+
+
 def test_interpreter_is_serialisable(microwave):
     microwave.queue(
         'door_opened',
@@ -689,4 +1021,51 @@ class TestEventQueue:
         assert event == Event('test3', delay=2)
         
         
-    
\ No newline at end of file
+    
+
+class TestNextDeadline:
+    @pytest.fixture()
+    def interpreter(self, timer_statechart):
+        return Interpreter(timer_statechart)
+
+    def test_not_initialized(self, interpreter):
+        assert interpreter.next_deadline() == interpreter.time
+
+    def test_time_guards(self, interpreter):
+        interpreter.execute()
+        assert interpreter.next_deadline() == 3
+
+        interpreter.clock.time = 3
+        interpreter.execute()
+        assert interpreter.configuration == ['root', 's2']
+        assert interpreter.next_deadline() == 5
+
+        interpreter.clock.time = 5
+        interpreter.execute()
+        assert interpreter.configuration == ['root', 's3']
+        assert interpreter.next_deadline() == 7
+
+        interpreter.clock.time = 7
+        interpreter.execute()
+        assert interpreter.final
+        assert interpreter.next_deadline() is None
+
+    def test_delayed_events(self, interpreter):
+        interpreter.execute()
+        interpreter.queue(Event('test', delay=1))
+        assert interpreter.next_deadline() == 1
+
+        interpreter._raise_event(InternalEvent('test', delay=2))
+        assert interpreter.next_deadline() == 1
+
+    def test_unknown_time_dependency(self, interpreter):
+        interpreter.statechart.transitions_from('s1')[0].guard = 'time > 4'
+        interpreter.execute()
+        interpreter.clock.time = 1
+        interpreter.execute()
+        assert interpreter.next_deadline() == 1
+
+    def test_no_time_dependency(self, interpreter):
+        interpreter.statechart.transitions_from('s1')[0].guard = 'False'
+        interpreter.execute()
+        assert interpreter.next_deadline() is None
@@ -1,8 +1,17 @@
+import io
 import pytest
+import re
+import schema
 
-from sismic.model import Statechart
+from copy import deepcopy
+from ruamel.yaml import YAML
+
+from sismic.model import BasicState, CompoundState, Statechart, Transition
 from sismic.exceptions import StatechartError
-from sismic.io import import_from_yaml, export_to_yaml, export_to_plantuml
+from sismic.io import (import_from_yaml, export_to_yaml, import_from_json, export_to_json, import_from_binary,
+                       export_to_binary, export_to_plantuml, set_yaml_cache, StatechartCache)
+from sismic.io.datadict import export_to_dict
+from sismic.io.yaml import SCHEMA, _validate
 
 
 def compare_statecharts(s1, s2):
@@ -29,6 +38,12 @@ def test_yaml_parser_types_handling(data):
     assert isinstance(item, str)
 
 
+def export_to_yaml_text(data):
+    stream = io.StringIO()
+    YAML(typ='safe', pure=True).dump(data, stream)
+    return stream.getvalue()
+
+
 def test_import_from_yaml_args():
     with pytest.raises(TypeError):
         import_from_yaml()
@@ -94,6 +109,135 @@ class TestImportFromYaml:
         assert 'root cannot declare both a "states" and a "parallel states" property' in str(e.value)
 
 
+class TestValidator:
+    @pytest.fixture
+    def document(self):
+        return {'statechart': {'name': 'test', 'preamble': 1, 'root state': {
+            'name': 'root', 'initial': 's1', 'contract': [{'always': True}],
+            'states': [
+                {'name': 's1', 'on entry': None, 'transitions': [{'target': 's2', 'priority': '3'}]},
+                {'name': 2, 'type': 'final', 'transitions': [{'event': 'e', 'priority': 'low'}]},
+            ]
+        }}}
+
+    def test_same_as_schema(self, document):
+        expected = schema.Schema(SCHEMA.statechart).validate(deepcopy(document))
+        _validate(document)
+        assert document == expected
+
+    def test_example(self, example_from_docs):
+        data = export_to_dict(example_from_docs)
+        expected = schema.Schema(SCHEMA.statechart).validate(deepcopy(data))
+        _validate(data)
+        assert data == expected
+
+    @pytest.mark.parametrize('path, value', [
+        (['foo'], 1),
+        (['statechart', 'foo'], 1),
+        (['statechart', 'root state', 'type'], 'history'),
+        (['statechart', 'root state', 'contract'], [{}]),
+        (['statechart', 'root state', 'contract'], [{'during': 'x'}]),
+        (['statechart', 'root state', 'states'], {'name': 's1'}),
+        (['statechart', 'root state', 'states', 0, 'transitions'], [{'priority': 'medium'}]),
+        (['statechart', 'root state', 'states', 1, 'transitions', 0, 'foo'], 1),
+    ])
+    def test_invalid(self, document, path, value):
+        obj = document
+        for key in path[:-1]:
+            obj = obj[key]
+        obj[path[-1]] = value
+        original = deepcopy(document)
+
+        with pytest.raises(ValueError):
+            _validate(document)
+        assert document == original
+
+        with pytest.raises(StatechartError) as e:
+            import_from_yaml(export_to_yaml_text(document))
+        assert str(e.value) == 'YAML validation failed'
+        assert isinstance(e.value.__cause__, schema.SchemaError)
+
+    @pytest.mark.parametrize('key', ['name', 'root state'])
+    def test_missing(self, document, key):
+        del document['statechart'][key]
+        with pytest.raises(ValueError):
+            _validate(document)
+
+
+class TestStatechartCache:
+    @pytest.fixture
+    def text(self):
+        with open('docs/examples/elevator/elevator.yaml') as f:
+            return f.read()
+
+    @pytest.fixture
+    def cache(self):
+        cache = StatechartCache(maxsize=2)
+        set_yaml_cache(cache)
+        yield cache
+        set_yaml_cache(StatechartCache())
+
+    def test_hit(self, cache, text, mocker):
+        first = import_from_yaml(text)
+        assert (cache.hits, cache.misses) == (0, 1)
+
+        mocker.patch('sismic.io.yaml.import_from_dict', side_effect=AssertionError)
+        second = import_from_yaml(text)
+        assert (cache.hits, cache.misses) == (1, 1)
+
+        assert second is not first
+        compare_statecharts(first, second)
+
+    def test_copies(self, cache, text):
+        import_from_yaml(text).remove_state('doorsOpen')
+        assert 'doorsOpen' in import_from_yaml(text).states
+
+    def test_options(self, cache, text):
+        import_from_yaml(text)
+        import_from_yaml(text, ignore_validation=True)
+        assert cache.misses == 2
+
+    def test_errors_are_not_cached(self, cache):
+        with pytest.raises(StatechartError):
+            import_from_yaml('statechart:\n  name: test')
+        assert len(cache) == 0
+
+    def test_eviction(self, cache, text):
+        import_from_yaml(text)
+        import_from_yaml(text + '\n# 1')
+        import_from_yaml(text + '\n# 2')
+        assert len(cache) == 2
+
+        import_from_yaml(text)
+        assert cache.misses == 4
+
+    def test_directory(self, text, tmpdir):
+        set_yaml_cache(StatechartCache(directory=str(tmpdir)))
+        try:
+            first = import_from_yaml(text)
+            assert len(tmpdir.listdir()) == 1
+
+            cache = StatechartCache(directory=str(tmpdir))
+            set_yaml_cache(cache)
+            compare_statecharts(first, import_from_yaml(text))
+            assert cache.hits == 1
+
+            tmpdir.listdir()[0].write_binary(b'corrupted')
+            cache = StatechartCache(directory=str(tmpdir))
+            set_yaml_cache(cache)
+            compare_statecharts(first, import_from_yaml(text))
+            assert cache.misses == 1
+        finally:
+            set_yaml_cache(StatechartCache())
+
+    def test_disabled(self, text):
+        set_yaml_cache(None)
+        try:
+            assert import_from_yaml(text) is not None
+        finally:
+            set_yaml_cache(StatechartCache())
+
+
 class TestExportToYaml:
     def test_export_example_from_tests(self, example_from_tests):
         assert len(export_to_yaml(example_from_tests)) > 0
@@ -114,6 +258,119 @@ class TestExportToYaml:
         compare_statecharts(example_from_docs, import_from_yaml(export_to_yaml(example_from_docs)))
 
 
+class TestJSON:
+    def test_identity_for_example_from_tests(self, example_from_tests):
+        compare_statecharts(example_from_tests, import_from_json(export_to_json(example_from_tests)))
+
+    def test_identity_for_example_from_docs(self, example_from_docs):
+        compare_statecharts(example_from_docs, import_from_json(export_to_json(example_from_docs)))
+
+    def test_filepath(self, elevator, tmpdir):
+        filepath = str(tmpdir.join('elevator.json'))
+        export_to_json(elevator.statechart, filepath, indent=2)
+        compare_statecharts(elevator.statechart, import_from_json(filepath=filepath))
+
+    def test_args(self):
+        with pytest.raises(TypeError):
+            import_from_json()
+        with pytest.raises(TypeError):
+            import_from_json('A', filepath='B')
+
+    def test_invalid(self):
+        with pytest.raises(StatechartError, match='Unable to load given JSON'):
+            import_from_json('{"statechart": ')
+        with pytest.raises(StatechartError, match='JSON validation failed'):
+            import_from_json('{"statechart": {"name": "test"}}')
+
+
+class TestBinary:
+    def attributes(self, element):
+        # Change counters are specific to each statechart, see Statechart._check_attributes
+        return {key: value for key, value in element.__dict__.items() if key != '_counters'}
+
+    def compare(self, s1, s2):
+        compare_statecharts(s1, s2)
+        assert s1.transitions == s2.transitions
+        for name in s1.states:
+            state_1, state_2 = s1.state_for(name), s2.state_for(name)
+            assert type(state_1) is type(state_2)
+            assert self.attributes(state_1) == self.attributes(state_2)
+        for transition_1, transition_2 in zip(s1.transitions, s2.transitions):
+            assert self.attributes(transition_1) == self.attributes(transition_2)
+
+    def test_identity_for_example_from_tests(self, example_from_tests):
+        self.compare(example_from_tests, import_from_binary(export_to_binary(example_from_tests)))
+
+    def test_identity_for_example_from_docs(self, example_from_docs):
+        self.compare(example_from_docs, import_from_binary(export_to_binary(example_from_docs)))
+
+    def test_filepath(self, elevator, tmpdir):
+        filepath = str(tmpdir.join('elevator.bin'))
+        export_to_binary(elevator.statechart, filepath)
+        self.compare(elevator.statechart, import_from_binary(filepath=filepath))
+
+    def test_hierarchy(self, elevator):
+        statechart = import_from_binary(export_to_binary(elevator.statechart))
+        for name in statechart.states:
+            assert statechart.children_for(name) == elevator.statechart.children_for(name)
+            assert statechart.descendants_for(name) == elevator.statechart.descendants_for(name)
+        for event in statechart.events_for():
+            for name in statechart.states:
+                assert statechart._transitions_for(name, event) == elevator.statechart._transitions_for(name, event)
+
+    def test_interned_strings(self):
+        statechart = Statechart('test')
+        statechart.add_state(CompoundState('root', initial='s1'), None)
+        statechart.add_state(BasicState('s1'), 'root')
+        for i in range(10):
+            statechart.add_transition(Transition('s1', 's1', event='event', guard='x > 0'))
+
+        data = export_to_binary(statechart)
+        assert data.count(b'x > 0') == data.count(b'event') == 1
+        assert len(import_from_binary(data).transitions) == 10
+
+    @pytest.mark.parametrize('priority', [2 ** 31, -2 ** 31 - 1, 1.5, 'high'])
+    def test_invalid_priority(self, priority):
+        statechart = Statechart('test')
+        statechart.add_state(BasicState('root'), None)
+        transition = Transition('root', 'root', priority=priority)
+        statechart.add_transition(transition)
+
+        with pytest.raises(StatechartError, match='Cannot export {}'.format(re.escape(str(transition)))):
+            export_to_binary(statechart)
+
+    def test_priority_range(self):
+        statechart = Statechart('test')
+        statechart.add_state(BasicState('root'), None)
+        for priority in [2 ** 31 - 1, -2 ** 31]:
+            statechart.add_transition(Transition('root', 'root', event=str(priority), priority=priority))
+
+        imported = import_from_binary(export_to_binary(statechart))
+        assert [t.priority for t in imported.transitions] == [2 ** 31 - 1, -2 ** 31]
+
+    def test_args(self):
+        with pytest.raises(TypeError):
+            import_from_binary()
+        with pytest.raises(TypeError):
+            import_from_binary(b'A', filepath='B')
+
+    @pytest.mark.parametrize('change', [
+        lambda data: data[:len(data) // 2],
+        lambda data: b'NOTSISMI' + data[8:],
+        lambda data: data[:8] + b'\xff' + data[9:],
+    ])
+    def test_invalid(self, elevator, change):
+        data = change(export_to_binary(elevator.statechart))
+        with pytest.raises(StatechartError, match='Unable to load given binary statechart'):
+            import_from_binary(data)
+
+    def test_empty_file(self, tmpdir):
+        filepath = tmpdir.join('empty.bin')
+        filepath.write_binary(b'')
+        with pytest.raises(StatechartError):
+            import_from_binary(filepath=str(filepath))
+
+
 class TestExportToPlantUML:
     def test_export_example_from_tests(self, example_from_tests):
         export = export_to_plantuml(
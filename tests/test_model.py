@@ -1,8 +1,11 @@
 import pytest
 
+from copy import deepcopy
+
 from sismic.exceptions import StatechartError
-from sismic.model import Statechart, Transition, CompoundState, BasicState
-from sismic.interpreter import Event
+from sismic.model import (Statechart, StatechartBuilder, Transition, CompoundState, BasicState, OrthogonalState,
+                          ShallowHistoryState)
+from sismic.interpreter import Event, Interpreter
 
 
 class TestEvents:
@@ -75,6 +78,40 @@ class TestStatechartTraveral:
         assert sorted(composite_statechart.leaf_for(['s1', 's1b1', 's2'])) == ['s1b1', 's2']
         assert sorted(composite_statechart.leaf_for(['s1', 's1b', 's1b1'])) == ['s1b1']
 
+    def test_root(self, composite_statechart):
+        assert composite_statechart.root == 'root'
+
+        composite_statechart.rename_state('root', 'new root')
+        assert composite_statechart.root == 'new root'
+
+        composite_statechart.remove_state('new root')
+        assert composite_statechart.root is None
+
+    def test_hierarchy_after_changes(self, composite_statechart):
+        # Populate caches
+        assert composite_statechart.ancestors_for('s1b1') == ['s1b', 's1', 'root']
+        assert composite_statechart.depth_for('s1b1') == 4
+        assert set(composite_statechart.descendants_for('s1')) == {'s1a', 's1b', 's1b1', 's1b2'}
+        assert composite_statechart.least_common_ancestor('s1b1', 's2') == 'root'
+
+        composite_statechart.move_state('s1b1', 's1')
+        assert composite_statechart.ancestors_for('s1b1') == ['s1', 'root']
+        assert composite_statechart.depth_for('s1b1') == 3
+        assert set(composite_statechart.descendants_for('s1b')) == {'s1b2'}
+        assert composite_statechart.least_common_ancestor('s1b1', 's1b2') == 's1'
+
+        composite_statechart.rename_state('s1', 'x')
+        assert composite_statechart.ancestors_for('s1b1') == ['x', 'root']
+        assert composite_statechart.least_common_ancestor('s1b1', 's1b2') == 'x'
+
+        composite_statechart.add_state(BasicState('s1b3'), 's1b')
+        assert composite_statechart.depth_for('s1b3') == 4
+        assert set(composite_statechart.descendants_for('x')) == {'s1a', 's1b', 's1b1', 's1b2', 's1b3'}
+        assert sorted(composite_statechart.leaf_for(['x', 's1b', 's1b3'])) == ['s1b3']
+
+        composite_statechart.remove_state('s1b')
+        assert set(composite_statechart.descendants_for('x')) == {'s1a', 's1b1'}
+
     def test_events_for(self, composite_statechart):
         assert set(composite_statechart.events_for()) == {'click', 'close', 'validate'}
         assert set(composite_statechart.events_for('s1b1')) == {'validate'}
@@ -282,6 +319,77 @@ class TestTransition:
 
         internal_statechart.validate()
 
+    def test_transition_index(self, internal_statechart):
+        assert len(internal_statechart._transitions_for('active', 'next')) == 1
+        assert len(internal_statechart._transitions_for('active', 'not_next')) == 1
+        assert internal_statechart._transitions_for('active', None) == []
+        assert len(internal_statechart._transitions_for('s1', None)) == 1
+        assert internal_statechart._transitions_for('s1', 'next') == []
+        assert internal_statechart._transitions_for('unknown', 'next') == []
+
+    def test_transition_index_is_maintained(self, internal_statechart):
+        tr = next(t for t in internal_statechart.transitions if t.source == 's1')
+
+        internal_statechart.rotate_transition(tr, new_source='active')
+        assert internal_statechart._transitions_for('s1', None) == []
+        assert internal_statechart._transitions_for('active', None) == [tr]
+
+        internal_statechart.rename_state('active', 'new active')
+        assert internal_statechart._transitions_for('active', None) == []
+        assert internal_statechart._transitions_for('new active', None) == [tr]
+        assert len(internal_statechart._transitions_for('new active', 'next')) == 1
+
+        internal_statechart.remove_transition(tr)
+        assert internal_statechart._transitions_for('new active', None) == []
+
+        new_tr = Transition('s1', event='next')
+        internal_statechart.add_transition(new_tr)
+        assert internal_statechart._transitions_for('s1', 'next') == [new_tr]
+
+    def test_transition_index_follows_attributes(self, internal_statechart):
+        tr = next(t for t in internal_statechart.transitions if t.source == 's1')
+        version = internal_statechart._version
+
+        tr.event = 'other'
+        assert internal_statechart._transitions_for('s1', None) == []
+        assert internal_statechart._transitions_for('s1', 'other') == [tr]
+        assert internal_statechart._version > version
+
+        version = internal_statechart._version
+        tr.priority = Transition.HIGH_PRIORITY
+        internal_statechart._check_attributes()
+        assert internal_statechart._version > version
+
+        internal_statechart.remove_transition(tr)
+        assert internal_statechart._transitions_for('s1', 'other') == []
+
+        internal_statechart.remove_state('s1')
+        assert internal_statechart._transitions_for('s1', 'next') == []
+
+    def test_attributes_are_tracked_per_statechart(self, internal_statechart):
+        other = deepcopy(internal_statechart)
+        tr = next(t for t in internal_statechart.transitions if t.source == 's1')
+        other_tr = next(t for t in other.transitions if t.source == 's1')
+        version, other_version = internal_statechart._version, other._version
+
+        # Changing an element does not invalidate the other statecharts
+        tr.event = 'other'
+        other._check_attributes()
+        assert other._version == other_version
+        assert other._transitions_for('s1', 'other') == []
+
+        other_tr.priority = Transition.HIGH_PRIORITY
+        other._check_attributes()
+        assert other._version > other_version
+
+        # Removed elements are not tracked anymore
+        internal_statechart.remove_transition(tr)
+        internal_statechart._check_attributes()
+        version = internal_statechart._version
+        tr.event = 'next'
+        internal_statechart._check_attributes()
+        assert internal_statechart._version == version
+
 
 class TestStatechartStates:
     def test_remove_existing_state(self, internal_statechart):
@@ -574,3 +682,134 @@ class TestCopyFromStatechart:
         with pytest.raises(StatechartError) as e:
             composite_statechart.copy_from_statechart(modified_simple_statechart, source='sc1_root', replace='s1a')
         assert 'already exists' in str(e.value)
+
+
+class TestStatechartBuilder:
+    @pytest.fixture
+    def builder(self):
+        builder = StatechartBuilder('test', preamble='x = 1')
+        builder.add_states([
+            (BasicState('s1'), 'root'),
+            (CompoundState('root', initial='s1'), None),
+            (ShallowHistoryState('h'), 'root'),
+            (OrthogonalState('p'), 'root'),
+            (BasicState('p1'), 'p'),
+        ])
+        builder.add_transitions([
+            Transition('s1', 'p', event='e'),
+            Transition('p1', guard='x > 0'),
+        ])
+        return builder
+
+    def test_build(self, builder):
+        statechart = builder.build()
+
+        assert statechart.root == 'root'
+        assert statechart.preamble == 'x = 1'
+        assert statechart.children_for('root') == ['s1', 'h', 'p']
+        assert statechart.descendants_for('root') == ['s1', 'h', 'p', 'p1']
+        assert statechart.ancestors_for('p1') == ['p', 'root']
+        assert statechart.transitions_from('s1') == [Transition('s1', 'p', event='e')]
+        assert statechart._transitions_for('p1', None) == [Transition('p1', guard='x > 0')]
+        assert statechart.validate()
+
+    @pytest.mark.parametrize('reverse', [False, True])
+    def test_same_as_statechart(self, composite_statechart, reverse):
+        names = [composite_statechart.root] + composite_statechart.descendants_for(composite_statechart.root)
+        if reverse:
+            names.reverse()
+
+        builder = StatechartBuilder(composite_statechart.name)
+        builder.add_states((composite_statechart.state_for(name), composite_statechart.parent_for(name))
+                           for name in names)
+        builder.add_transitions(composite_statechart.transitions)
+        statechart = builder.build()
+
+        for name in composite_statechart.states:
+            children = composite_statechart.children_for(name)
+            assert statechart.parent_for(name) == composite_statechart.parent_for(name)
+            assert statechart.children_for(name) == (list(reversed(children)) if reverse else children)
+            assert statechart.ancestors_for(name) == composite_statechart.ancestors_for(name)
+            assert statechart.depth_for(name) == composite_statechart.depth_for(name)
+            assert set(statechart.descendants_for(name)) == set(composite_statechart.descendants_for(name))
+        assert statechart.transitions == composite_statechart.transitions
+
+    def test_not_frozen(self, builder):
+        statechart = builder.build(frozen=False)
+        assert not statechart.frozen
+
+        statechart.add_state(BasicState('s2'), 'root')
+        assert statechart.descendants_for('root') == ['s1', 'h', 'p', 's2', 'p1']
+
+    @pytest.mark.parametrize('state, parent, message', [
+        (BasicState('s1'), 'root', 'already exists'),
+        (BasicState('s2'), None, 'Root already defined'),
+        (BasicState('s2'), 'unknown', 'does not exist'),
+        (BasicState('s2'), 's1', 'cannot be used as a parent'),
+        (ShallowHistoryState('h2'), 'p', 'cannot be used as a parent'),
+    ])
+    def test_invalid_state(self, builder, state, parent, message):
+        builder.add_state(state, parent)
+        with pytest.raises(StatechartError, match=message):
+            builder.build()
+
+    def test_unreachable_states(self, builder):
+        builder.add_states([(CompoundState('a'), 'b'), (CompoundState('b'), 'a')])
+        with pytest.raises(StatechartError, match='a, b are not descendants'):
+            builder.build()
+
+    @pytest.mark.parametrize('transition, message', [
+        (Transition('unknown', 's1'), 'Unknown source state'),
+        (Transition('h', 's1'), 'Cannot add'),
+        (Transition('s1', 'unknown'), 'Unknown target state'),
+    ])
+    def test_invalid_transition(self, builder, transition, message):
+        builder.add_transition(transition)
+        with pytest.raises(StatechartError, match=message):
+            builder.build()
+
+
+class TestFrozenStatechart:
+    @pytest.fixture
+    def statechart(self, composite_statechart):
+        composite_statechart.freeze()
+        return composite_statechart
+
+    @pytest.mark.parametrize('mutation', [
+        lambda sc: sc.add_state(BasicState('new'), 's1'),
+        lambda sc: sc.remove_state('s1'),
+        lambda sc: sc.rename_state('s1', 'new'),
+        lambda sc: sc.move_state('s1a', 's2'),
+        lambda sc: sc.add_transition(Transition('s1', 's2')),
+        lambda sc: sc.remove_transition(sc.transitions[0]),
+        lambda sc: sc.rotate_transition(sc.transitions[0], new_target=None),
+    ])
+    def test_mutations(self, statechart, mutation):
+        states, transitions = statechart.states, statechart.transitions
+        with pytest.raises(StatechartError, match='frozen'):
+            mutation(statechart)
+        assert statechart.states == states
+        assert statechart.transitions == transitions
+
+    def test_precomputed_hierarchy(self, statechart):
+        assert set(statechart._descendants_cache) == set(statechart.states)
+        assert set(statechart._ancestors_cache) == set(statechart.states)
+        for name in statechart.states:
+            assert list(statechart._descendants(name)) == statechart.descendants_for(name)
+
+    def test_thaw(self, statechart):
+        copy = statechart.thaw()
+        copy.remove_state('s1')
+
+        assert statechart.frozen and not copy.frozen
+        assert 's1' in statechart.states
+
+    def test_copy_from_frozen(self, statechart, simple_statechart):
+        simple_statechart.copy_from_statechart(statechart, source='s1', replace='s1',
+                                               renaming_func=lambda s: 'copy_' + s)
+        assert 'copy_s1a' in simple_statechart.states
+
+    def test_execution(self, statechart):
+        interpreter = Interpreter(statechart)
+        interpreter.execute()
+        assert len(interpreter.configuration) > 0